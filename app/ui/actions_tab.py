@@ -1,53 +1,142 @@
-from PyQt6.QtCore import QFile, pyqtSignal, QDir, QSize
+from PyQt6.QtCore import QDir, QEvent, QFile, QRect, QSize, Qt, pyqtSignal
 from PyQt6.QtGui import QIcon, QPixmap
-from PyQt6.QtWidgets import QWidget, QHBoxLayout, QPushButton
+from PyQt6.QtWidgets import (
+    QApplication,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionButton,
+    QToolTip,
+)
 
+from app.ui.vault_table_model import VaultTableModel
+
+
+class ActionsDelegate(QStyledItemDelegate):
+    """Paints the View/Edit/Delete buttons of every row in the Actions column.
+
+    A single delegate serves the whole table, so no widgets are created per
+    row and only the visible cells are ever painted. Signals carry the
+    database id of the clicked entry.
+    """
 
-class ActionsTab(QWidget):
     view_clicked = pyqtSignal(int)
     edit_clicked = pyqtSignal(int)
     delete_clicked = pyqtSignal(int)
 
-    def __init__(self, row, parent=None):
+    BUTTON_NAMES = ("View", "Edit", "Delete")
+    BUTTON_SIZE = 25
+    BUTTON_SPACING = 2
+    ICON_SIZE = QSize(18, 18)
+
+    _icons = None
+
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.row = row
-        self.setup()
-
-    def setup(self):
-        layout = QHBoxLayout()
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(2)
-
-        button_data = [
-            ("View", self.on_view_clicked),
-            ("Edit", self.on_edit_clicked),
-            ("Delete", self.on_delete_clicked),
-        ]
+        self._pressed = None
+
+    @classmethod
+    def icons(cls):
+        """Load the button icons from disk once and share them"""
+        if cls._icons is None:
+            cls._icons = {}
+            for button_name in cls.BUTTON_NAMES:
+                icon_path = QDir.current().filePath(
+                    f"images/{button_name.lower()}_icon.png"
+                )
+                if QFile.exists(icon_path):
+                    cls._icons[button_name] = QIcon(QPixmap(icon_path))
+                else:
+                    print(f"Warning: Icon file not found: {icon_path}")
+                    cls._icons[button_name] = QIcon()
+        return cls._icons
+
+    def buttons_width(self):
+        return (
+            len(self.BUTTON_NAMES) * self.BUTTON_SIZE
+            + (len(self.BUTTON_NAMES) - 1) * self.BUTTON_SPACING
+        )
+
+    def sizeHint(self, option, index):
+        return QSize(self.buttons_width(), self.BUTTON_SIZE)
 
-        for button_name, click_handler in button_data:
-            btn = QPushButton()
-            icon_path = QDir.current().filePath(
-                f"images/{button_name.lower()}_icon.png"
+    def button_rects(self, cell_rect):
+        """Return the rectangle of each button, centered inside the cell"""
+        left = cell_rect.x() + (cell_rect.width() - self.buttons_width()) // 2
+        top = cell_rect.y() + (cell_rect.height() - self.BUTTON_SIZE) // 2
+        return [
+            QRect(
+                left + i * (self.BUTTON_SIZE + self.BUTTON_SPACING),
+                top,
+                self.BUTTON_SIZE,
+                self.BUTTON_SIZE,
             )
-            if QFile.exists(icon_path):
-                pixmap = QPixmap(icon_path)
-                btn.setIcon(QIcon(pixmap))
+            for i in range(len(self.BUTTON_NAMES))
+        ]
+
+    def button_at(self, cell_rect, pos):
+        for button_index, rect in enumerate(self.button_rects(cell_rect)):
+            if rect.contains(pos):
+                return button_index
+        return None
+
+    def paint(self, painter, option, index):
+        style = (
+            option.widget.style() if option.widget else QApplication.style()
+        )
+        icons = self.icons()
+        entry_id = index.data(VaultTableModel.EntryIdRole)
+
+        for button_index, rect in enumerate(self.button_rects(option.rect)):
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.icon = icons[self.BUTTON_NAMES[button_index]]
+            button.iconSize = self.ICON_SIZE
+            button.state = QStyle.StateFlag.State_Enabled
+            if self._pressed == (entry_id, button_index):
+                button.state |= QStyle.StateFlag.State_Sunken
             else:
-                print(f"Warning: Icon file not found: {icon_path}")
+                button.state |= QStyle.StateFlag.State_Raised
+            style.drawControl(
+                QStyle.ControlElement.CE_PushButton, button, painter, option.widget
+            )
 
-            btn.setIconSize(QSize(18, 18))
-            btn.setFixedSize(25, 25)
-            btn.setToolTip(button_name)
-            btn.clicked.connect(click_handler)
-            layout.addWidget(btn)
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (
+            QEvent.Type.MouseButtonPress,
+            QEvent.Type.MouseButtonRelease,
+        ):
+            return super().editorEvent(event, model, option, index)
+        if event.button() != Qt.MouseButton.LeftButton:
+            return False
 
-        self.setLayout(layout)
+        entry_id = index.data(VaultTableModel.EntryIdRole)
+        button_index = self.button_at(option.rect, event.position().toPoint())
 
-    def on_view_clicked(self):
-        self.view_clicked.emit(self.row)
+        if option.widget:
+            option.widget.viewport().update(option.rect)
 
-    def on_edit_clicked(self):
-        self.edit_clicked.emit(self.row)
+        if event.type() == QEvent.Type.MouseButtonPress:
+            self._pressed = (
+                (entry_id, button_index) if button_index is not None else None
+            )
+            return button_index is not None
+
+        pressed, self._pressed = self._pressed, None
+        if pressed is None or pressed != (entry_id, button_index):
+            return pressed is not None
+
+        signal = (self.view_clicked, self.edit_clicked, self.delete_clicked)[
+            button_index
+        ]
+        signal.emit(entry_id)
+        return True
 
-    def on_delete_clicked(self):
-        self.delete_clicked.emit(self.row)
+    def helpEvent(self, event, view, option, index):
+        if event.type() == QEvent.Type.ToolTip:
+            button_index = self.button_at(option.rect, event.pos())
+            if button_index is not None:
+                QToolTip.showText(
+                    event.globalPos(), self.BUTTON_NAMES[button_index], view
+                )
+                return True
+        return super().helpEvent(event, view, option, index)
@@ -0,0 +1,54 @@
+from PyQt6.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QLabel,
+    QPushButton,
+    QScrollArea,
+    QWidget,
+)
+
+
+class BreachedPasswordsDialog(QDialog):
+    def __init__(self, breached, parent=None):
+        super().__init__(parent)
+        self.breached = breached
+        self.init_ui()
+
+    def init_ui(self):
+        self.setWindowTitle("Breached Passwords")
+        self.setMinimumWidth(400)
+        self.setMinimumHeight(300)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        summary = QLabel(
+            f"{len(self.breached)} entries use a password that appeared in a data "
+            "breach. Change these passwords first."
+        )
+        summary.setWordWrap(True)
+        layout.addWidget(summary)
+
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll_content = QWidget(scroll)
+        scroll_layout = QVBoxLayout(scroll_content)
+
+        for entry in self.breached:
+            times = "once" if entry["count"] == 1 else f"{entry['count']:,} times"
+            scroll_layout.addWidget(QLabel(f"Website: {entry['website']}"))
+            scroll_layout.addWidget(QLabel(f"Username: {entry['username']}"))
+            scroll_layout.addWidget(QLabel(f"Seen in breaches {times}"))
+            scroll_layout.addWidget(QLabel(""))  # Spacer
+
+        scroll_content.setLayout(scroll_layout)
+        scroll.setWidget(scroll_content)
+
+        layout.addWidget(scroll)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
@@ -1,5 +1,4 @@
 from PyQt6.QtWidgets import (
-    QDialog,
     QLineEdit,
     QLabel,
     QPushButton,
@@ -7,11 +6,12 @@ from PyQt6.QtWidgets import (
     QGridLayout,
 )
 
+from app.ui.key_derivation_dialog import KeyDerivationDialog
 
-class CreatePasswordDialog(QDialog):
+
+class CreatePasswordDialog(KeyDerivationDialog):
     def __init__(self, password_manager, parent=None):
-        super().__init__(parent)
-        self.password_manager = password_manager
+        super().__init__(password_manager, parent)
         self.setWindowTitle("Create Master Password")
         self.setFixedSize(450, 150)
         self.setup_ui()
@@ -44,5 +44,13 @@ class CreatePasswordDialog(QDialog):
                 self, "Error", "Password must be at least 8 characters long"
             )
         else:
-            self.password_manager.set_password(password)
-            self.accept()
+            # Calibration and derivation run on a worker; saving is quick
+            def created(credentials):
+                self.password_manager.store_password(*credentials)
+                self.accept()
+
+            self.run_derivation(
+                lambda db_manager: self.password_manager.derive_new_key(password),
+                "Protecting master password...",
+                created,
+            )
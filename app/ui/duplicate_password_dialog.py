@@ -9,9 +9,10 @@ from PyQt6.QtWidgets import (
 
 
 class DuplicatePasswordsDialog(QDialog):
-    def __init__(self, duplicates):
+    def __init__(self, duplicates, similar=()):
         super().__init__()
         self.duplicates = duplicates
+        self.similar = similar
         self.init_ui()
 
     def init_ui(self):
@@ -37,6 +38,23 @@ class DuplicatePasswordsDialog(QDialog):
             scroll_layout.addWidget(websites_label)
             scroll_layout.addWidget(QLabel(""))  # Spacer
 
+        if self.similar:
+            heading = QLabel("<b>Similar passwords</b>")
+            scroll_layout.addWidget(heading)
+            for number, cluster in enumerate(self.similar, 1):
+                total = sum(item["count"] for item in cluster)
+                scroll_layout.addWidget(
+                    QLabel(f"Group {number}: {len(cluster)} variants, {total} entries")
+                )
+                for item in cluster:
+                    scroll_layout.addWidget(
+                        QLabel(
+                            f"    {item['password']} ({item['count']}x): "
+                            + ", ".join(item["websites"])
+                        )
+                    )
+                scroll_layout.addWidget(QLabel(""))  # Spacer
+
         scroll_content.setLayout(scroll_layout)
         scroll.setWidget(scroll_content)
 
@@ -7,11 +7,12 @@ from PyQt6.QtWidgets import (
     QMessageBox,
     QGridLayout,
 )
-from app.utils.database_manager import DatabaseManager
 from app.utils.password_strength_checker import check_password_strength
 
 
 class EditPassword(QDialog):
+    STRENGTH_DEBOUNCE_MS = 150
+
     def __init__(self, row, parent=None):
         super().__init__(parent)
         self.row = row
@@ -31,7 +32,11 @@ class EditPassword(QDialog):
         self.password_input.setEchoMode(QLineEdit.EchoMode.Password)
         self.password_confirm_input.setEchoMode(QLineEdit.EchoMode.Password)
 
-        self.password_input.textChanged.connect(self.check_password)
+        self.strength_timer = QTimer(self)
+        self.strength_timer.setSingleShot(True)
+        self.strength_timer.setInterval(self.STRENGTH_DEBOUNCE_MS)
+        self.strength_timer.timeout.connect(self.check_password)
+        self.password_input.textChanged.connect(lambda: self.strength_timer.start())
         self.password_strength_label = QLabel()
 
         self.confirm_button = QPushButton("Confirm")
@@ -70,6 +75,19 @@ class EditPassword(QDialog):
                 if reply == QMessageBox.StandardButton.No:
                     return
 
+            if self.db_manager and self.db_manager.is_password_previously_used(
+                self.row, password
+            ):
+                reply = QMessageBox.question(
+                    self,
+                    "Password Reused",
+                    "This password has been used for this entry before. "
+                    "Do you want to continue?",
+                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                )
+                if reply == QMessageBox.StandardButton.No:
+                    return
+
             if self.db_manager and self.db_manager.edit_login_password(self.row, password):
                 self.confirm_button.setText("Success")
                 QTimer.singleShot(2000, self.close)
@@ -0,0 +1,63 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QDialog, QMessageBox, QProgressDialog
+
+from app.utils.async_database import AsyncDatabaseManager
+
+
+class KeyDerivationDialog(QDialog):
+    """Base for dialogs that derive the master key.
+
+    Derivation is slow on purpose, so it runs on a worker of async_db while
+    a progress dialog shows; the dialog keeps painting instead of hanging.
+    Without async_db the dialog runs its own until it closes.
+    """
+
+    def __init__(self, password_manager, parent=None, async_db=None):
+        super().__init__(parent)
+        self.password_manager = password_manager
+        self._owns_async_db = async_db is None
+        self.async_db = async_db or AsyncDatabaseManager(
+            password_manager.db_manager, self
+        )
+
+    def run_derivation(self, function, label, on_finished, on_progress=None):
+        """Run function(db_manager, ...) on a worker and pass its result to on_finished.
+
+        Like AsyncDatabaseManager.submit, function gets progress_callback and
+        is_cancelled if it accepts them. on_progress is called with the
+        progress dialog followed by the progress arguments.
+        """
+        progress = QProgressDialog(label, "Cancel", 0, 0, self)
+        progress.setWindowTitle(self.windowTitle())
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(300)
+        self.setEnabled(False)
+
+        future = self.async_db.submit(function)
+        progress.canceled.connect(future.cancel)
+        if on_progress:
+            future.progress.connect(lambda done: on_progress(progress, *done))
+
+        def finished(result):
+            progress.close()
+            self.setEnabled(True)
+            on_finished(result)
+
+        def failed(error):
+            progress.close()
+            self.setEnabled(True)
+            QMessageBox.critical(self, "Error", f"An error occurred: {str(error)}")
+
+        def cancelled():
+            progress.close()
+            self.setEnabled(True)
+
+        future.finished.connect(finished)
+        future.failed.connect(failed)
+        future.cancelled.connect(cancelled)
+        return future
+
+    def done(self, result):
+        if self._owns_async_db:
+            self.async_db.shutdown()
+        super().done(result)
@@ -1,5 +1,4 @@
 from PyQt6.QtWidgets import (
-    QDialog,
     QLineEdit,
     QLabel,
     QPushButton,
@@ -7,11 +6,12 @@ from PyQt6.QtWidgets import (
     QGridLayout,
 )
 
+from app.ui.key_derivation_dialog import KeyDerivationDialog
 
-class LoginDialog(QDialog):
+
+class LoginDialog(KeyDerivationDialog):
     def __init__(self, password_manager, parent=None):
-        super().__init__(parent)
-        self.password_manager = password_manager
+        super().__init__(password_manager, parent)
         self.setWindowTitle("Login")
         self.setFixedSize(450, 100)
         self.setup_ui()
@@ -31,7 +31,15 @@ class LoginDialog(QDialog):
 
     def try_login(self):
         password = self.password_input.text()
-        if self.password_manager.check_password(password):
+
+        def unlock(db_manager, is_cancelled):
+            return self.password_manager.unlock(password, is_cancelled, db_manager)
+
+        def unlocked(key):
+            if key is None:
+                QMessageBox.warning(self, "Login Failed", "Invalid password")
+                return
+            self.password_manager.use_key(key)
             self.accept()
-        else:
-            QMessageBox.warning(self, "Login Failed", "Invalid password")
+
+        self.run_derivation(unlock, "Unlocking vault...", unlocked)
@@ -1,3 +1,6 @@
+import datetime
+import os
+
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtWidgets import (
     QVBoxLayout,
@@ -5,39 +8,63 @@ from PyQt6.QtWidgets import (
     QMainWindow,
     QLineEdit,
     QPushButton,
-    QTableWidget,
+    QTableView,
     QHeaderView,
     QMenuBar,
     QMessageBox,
-    QTableWidgetItem,
     QApplication,
     QHBoxLayout,
     QMenu,
+    QProgressDialog,
+    QFileDialog,
 )
 
-from app.ui.about_dialog import AboutDialog
-from app.ui.actions_tab import ActionsTab
-from app.ui.duplicate_password_dialog import DuplicatePasswordsDialog
-from app.ui.edit_password_dialog import EditPassword
-from app.ui.new_entry_dialog import NewEntryDialog
-from app.ui.password_generator_dialog import PasswordGenerationDialog
-from app.ui.password_strength_checker_dialog import PasswordStrengthCheckerDialog
-from app.ui.reset_password_dialog import ResetPasswordDialog
-from app.ui.user_guide_dialog import UserGuideDialog
+from app.ui.actions_tab import ActionsDelegate
+from app.ui.vault_table_model import VaultTableModel
 from app.utils.actions import Actions
+from app.utils.async_database import AsyncDatabaseManager
+from app.utils.breach_checker import DEFAULT_CORPUS, CorpusError
 from app.utils.database_manager import DatabaseManager
-from app.utils.master_login import MasterLogin
 from app.utils.observer import DatabaseObserver, DatabaseEvent
+from app.utils import startup_trace
+from app.utils.vault_search import VaultSearcher
 
 
 class PasswordManager(QMainWindow):
+    # Batches larger than this reload the table instead of applying each row
+    BATCH_RELOAD_THRESHOLD = 200
+
     def __init__(self, db_manager=None):
         super().__init__()
         self.db_manager = db_manager if db_manager else DatabaseManager()
+        # Bulk operations run here so the window keeps responding
+        self.async_db = AsyncDatabaseManager(self.db_manager, self)
+        self._pending_load = None
+        self._missed_events = []
         self.actions = Actions(self, self.db_manager)
+        self._initial_load_scheduled = False
         self.setup_main_window()
-        self.setup_menu_bar()
-        self.db_manager.attach(self)  # Register as observer
+        self.db_manager.attach(self, [  # Register as observer
+            DatabaseEvent.ENTRY_ADDED,
+            DatabaseEvent.ENTRY_MODIFIED,
+            DatabaseEvent.ENTRY_DELETED,
+            DatabaseEvent.DATABASE_IMPORTED,
+            DatabaseEvent.DATABASE_RESTORED,
+        ])
+
+        # Expired plaintext passwords are dropped even when nobody reads them
+        self.cache_purge_timer = QTimer(self)
+        self.cache_purge_timer.timeout.connect(
+            self.db_manager.password_cache.purge_expired
+        )
+        self.cache_purge_timer.start(30000)
+
+        # Snapshots only store what changed, so frequent ones stay cheap
+        self.snapshot_timer = QTimer(self)
+        self.snapshot_timer.timeout.connect(self.take_snapshot)
+        snapshot_minutes = self.db_manager.snapshot_interval_minutes()
+        if snapshot_minutes > 0:
+            self.snapshot_timer.start(snapshot_minutes * 60000)
 
     def initialize_ui(self):
         self.setWindowTitle("PyQt Password Manager")
@@ -50,7 +77,6 @@ class PasswordManager(QMainWindow):
         main_layout = QVBoxLayout()
         main_layout.addLayout(self.create_top_bar())
         main_layout.addWidget(self.create_table_section())
-        self.update_table_with_entries()
         central_widget = QWidget()
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
@@ -67,6 +93,7 @@ class PasswordManager(QMainWindow):
         file_menu.addSeparator()
         file_menu.addAction(self.actions.backup_database_action)
         file_menu.addAction(self.actions.restore_database_action)
+        file_menu.addAction(self.actions.restore_snapshot_action)
         file_menu.addSeparator()
         file_menu.addAction(self.actions.exit_action)
 
@@ -84,11 +111,14 @@ class PasswordManager(QMainWindow):
         tool_menu = menubar.addMenu("Tools")
         tool_menu.addAction(self.actions.password_strength_check_action)
         tool_menu.addAction(self.actions.duplicate_password_finder_action)
+        tool_menu.addAction(self.actions.breach_scan_action)
+        tool_menu.addAction(self.actions.security_audit_action)
         tool_menu.addAction(self.actions.generate_password_action)
 
         # Settings menu
         settings_menu = menubar.addMenu("Settings")
         settings_menu.addAction(self.actions.password_reset_action)
+        settings_menu.addAction(self.actions.rotate_data_key_action)
         settings_menu.addAction(self.actions.user_guide_action)
         settings_menu.addAction(self.actions.about_action)
 
@@ -96,7 +126,8 @@ class PasswordManager(QMainWindow):
     def create_top_bar(self):
         layout = QHBoxLayout()
 
-        self.search_input = QLineEdit("Search for a specific login or username")
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search for a specific login or username")
         self.search_input.textChanged.connect(self.filter_passwords)
         self.create_new_entry_button = QPushButton("+")
         self.create_new_entry_button.clicked.connect(self.on_new_entry_clicked)
@@ -108,64 +139,141 @@ class PasswordManager(QMainWindow):
 
     # Create the section for displaying saved password entries in a table
     def create_table_section(self):
-        self.entry_table = QTableWidget()
-        self.entry_table.setColumnCount(4)
+        self.entry_model = VaultTableModel(self.db_manager.get_password, self)
+        self.searcher = VaultSearcher(
+            self.db_manager.db_name, self.db_manager.profile, self
+        )
+        self.searcher.results_ready.connect(self.entry_model.set_id_filter)
+
+        self.entry_table = QTableView()
+        self.entry_table.setModel(self.entry_model)
         self.entry_table.horizontalHeader().setSectionResizeMode(
             QHeaderView.ResizeMode.Stretch
         )
-        self.entry_table.setHorizontalHeaderLabels(
-            ["Website", "Username/Email", "Password", "Actions"]
-        )
-        self.entry_table.setSelectionMode(QTableWidget.SelectionMode.NoSelection)
-        self.entry_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        # Fixed row heights keep the view from measuring every row
+        vertical_header = self.entry_table.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(ActionsDelegate.BUTTON_SIZE + 5)
+        self.entry_table.setSelectionMode(QTableView.SelectionMode.NoSelection)
+        self.entry_table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
         self.entry_table.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.entry_table.setWordWrap(False)
+
+        self.actions_delegate = ActionsDelegate(self.entry_table)
+        self.actions_delegate.view_clicked.connect(self.on_view_clicked)
+        self.actions_delegate.edit_clicked.connect(self.on_edit_clicked)
+        self.actions_delegate.delete_clicked.connect(self.on_delete_clicked)
+        self.entry_table.setItemDelegateForColumn(
+            VaultTableModel.ACTIONS_COLUMN, self.actions_delegate
+        )
 
         # double click
-        self.entry_table.itemDoubleClicked.connect(self.on_double_click)
+        self.entry_table.doubleClicked.connect(self.on_double_click)
 
         return self.entry_table
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._initial_load_scheduled:
+            # Paint the empty window first, then load the entries
+            self._initial_load_scheduled = True
+            QTimer.singleShot(0, self._load_initial_entries)
+
+    def _load_initial_entries(self):
+        startup_trace.mark("first paint")
+        self.update_table_with_entries()
+        self._upgrade_vault()
+        if self.snapshot_timer.isActive():
+            self.take_snapshot()
+
+    def _upgrade_vault(self):
+        """Start the background upgrades an opened or restored vault may need"""
+        # Vaults from before the binary token format are converted quietly
+        self.async_db.migrate_legacy_tokens().failed.connect(
+            lambda error: print(f"Could not convert stored passwords: {str(error)}")
+        )
+        if self.db_manager.data_key_rotation_due():
+            future = self.async_db.rotate_data_key()
+            future.finished.connect(lambda _: self.db_manager.refresh_data_key())
+            future.failed.connect(
+                lambda error: print(f"Could not rotate the vault key: {str(error)}")
+            )
+
     """ Table Management Methods """
 
     def filter_passwords(self):
-        search_text = self.search_input.text().lower()
-        for row in range(self.entry_table.rowCount()):
-            match = False
-            for column in range(self.entry_table.columnCount()):
-                item = self.entry_table.item(row, column)
-                if item and search_text in item.text().lower():
-                    match = True
-                    break
-            self.entry_table.setRowHidden(row, not match)
+        self.searcher.search(self.search_input.text())
 
     def update_table_with_entries(self, entries=None):
         if entries is None:
-            entries = self.db_manager.load_table()
-
-        self.entry_table.setRowCount(0)
-        self.entry_table.setRowCount(len(entries))
-        self.id_map = {}
-
-        is_visible = self.actions.show_hide_passwords_action.isChecked()
-
-        for row, entry in enumerate(entries):
-            self.id_map[row] = entry["id"]
-            self.entry_table.setItem(row, 0, QTableWidgetItem(entry["website"]))
-            self.entry_table.setItem(row, 1, QTableWidgetItem(entry["username"]))
+            self.reload_entries(self.async_db.load_table())
+            return
+
+        self.entry_model.set_entries(entries)
+        self.searcher.refresh()
+
+    def reload_entries(self, future):
+        """Show the entries future loads in the background once it finishes.
+
+        Rows changed while it runs are applied again on top of its result,
+        which may have been read before they were committed.
+        """
+        self._pending_load = future
+        self._missed_events = []
+        future.finished.connect(lambda entries: self._entries_loaded(future, entries))
+        future.failed.connect(
+            lambda error: print(f"Could not load entries: {str(error)}")
+        )
 
-            if is_visible:
-                self.entry_table.setItem(row, 2, QTableWidgetItem(entry["password"]))
+    def _entries_loaded(self, future, entries):
+        if future is not self._pending_load:
+            return  # A newer load replaced this one
+        self._pending_load = None
+        self.update_table_with_entries(entries)
+        missed, self._missed_events = self._missed_events, []
+        for event, data in missed:
+            self.update(event, data)
+        startup_trace.finish("entries loaded")
+
+    def run_in_background(self, future, title, label, on_finished, on_progress=None,
+                          cancelled_message=None, on_failed=None):
+        """Show a cancellable progress dialog until future ends.
+
+        The dialog is window modal, so the window keeps painting but no
+        conflicting operation can be started meanwhile. on_progress is called
+        with the dialog followed by the operation's progress arguments.
+        """
+        progress = QProgressDialog(label, "Cancel", 0, 0, self)
+        progress.setWindowTitle(title)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(500)
+        progress.canceled.connect(future.cancel)
+        if on_progress:
+            future.progress.connect(lambda done: on_progress(progress, *done))
+
+        def finished(result):
+            progress.close()
+            on_finished(result)
+
+        def failed(error):
+            progress.close()
+            if on_failed and on_failed(error):
+                return
+            if isinstance(error, PermissionError):
+                message = "Permission denied. The file may be open in another program."
             else:
-                self.entry_table.setItem(
-                    row, 2, QTableWidgetItem("*" * len(entry["password"]))
-                )
+                message = f"An error occurred: {str(error)}"
+            QMessageBox.critical(self, f"{title} Failed", message)
 
-            actions_tab = ActionsTab(row)
-            actions_tab.view_clicked.connect(self.on_view_clicked)
-            actions_tab.edit_clicked.connect(self.on_edit_clicked)
-            actions_tab.delete_clicked.connect(self.on_delete_clicked)
+        def cancelled():
+            progress.close()
+            if cancelled_message:
+                QMessageBox.warning(self, f"{title} Cancelled", cancelled_message)
 
-            self.entry_table.setCellWidget(row, 3, actions_tab)
+        future.finished.connect(finished)
+        future.failed.connect(failed)
+        future.cancelled.connect(cancelled)
+        return future
 
     def toggle_password_visibility(self, checked=None):
         is_visible = checked if checked is not None else self.actions.show_hide_passwords_action.isChecked()
@@ -175,42 +283,181 @@ class PasswordManager(QMainWindow):
         else:
             self.actions.show_hide_passwords_action.setText("Show Passwords")
 
-        for row in range(self.entry_table.rowCount()):
-            password_item = self.entry_table.item(row, 2)
-            if password_item:
-                password_id = self.id_map.get(row)
-                if password_id is not None:
-                    if is_visible:
-                        actual_password = self.db_manager.get_password(password_id)
-                        password_item.setText(actual_password)
-                    else:
-                        password_item.setText("*" * len(password_item.text()))
+        self.entry_model.set_passwords_visible(is_visible)
 
     def sort_by_website(self):
-        sorted_entries = self.db_manager.sort_by_website()
-        self.update_table_with_entries(sorted_entries)
+        self.reload_entries(self.async_db.sort_by_website())
 
     def sort_by_username(self):
-        sorted_entries = self.db_manager.sort_by_username()
-        self.update_table_with_entries(sorted_entries)
+        self.reload_entries(self.async_db.sort_by_username())
+
+    """ File Methods """
+
+    def export_passwords(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export File",
+            "",
+            "CSV Files (*.csv *.csv.gz *.csv.xz);;"
+            "JSON Files (*.json *.json.gz *.json.xz);;"
+            "XML Files (*.xml *.xml.gz *.xml.xz)",
+        )
+        if not file_path:
+            QMessageBox.warning(
+                self, "Export Cancelled", "Export was cancelled by the user."
+            )
+            return
+
+        self.run_in_background(
+            self.async_db.export_to_file(file_path),
+            "Export",
+            "Exporting passwords...",
+            lambda _: QMessageBox.information(
+                self, "Export Success", f"Data exported successfully to {file_path}"
+            ),
+            lambda progress, exported: progress.setLabelText(
+                f"Exported {exported} entries..."
+            ),
+            "Export was cancelled by the user.",
+        )
+
+    def import_passwords(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Import File",
+            "",
+            "CSV Files (*.csv);;JSON Files (*.json);;XML Files (*.xml)",
+        )
+        if not file_path:
+            return
+
+        self.run_in_background(
+            self.async_db.import_file(file_path),
+            "Import",
+            "Importing passwords...",
+            lambda imported: QMessageBox.information(
+                self, "Import Success", f"{imported} entries imported successfully"
+            ),
+            lambda progress, imported: progress.setLabelText(
+                f"Imported {imported} entries..."
+            ),
+            "Import was cancelled. No entries were added.",
+        )
+
+    def backup_database(self):
+        backup_dir = QFileDialog.getExistingDirectory(self, "Select Backup Directory")
+        if not backup_dir:
+            return
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_path = os.path.join(backup_dir, f"password_backup_{timestamp}.db")
+        self.run_in_background(
+            self.async_db.backup_to_file(backup_path),
+            "Backup",
+            "Backing up the database...",
+            lambda _: QMessageBox.information(
+                self, "Backup Success", f"Database backed up to {backup_path}"
+            ),
+            cancelled_message="No backup was written.",
+        )
+
+    def restore_database(self):
+        backup_file, _ = QFileDialog.getOpenFileName(
+            self, "Select Backup File", "", "Database Files (*.db)"
+        )
+        if not backup_file:
+            return
+        reply = QMessageBox.question(
+            self,
+            "Restore Database",
+            "Replace every stored entry with the contents of the backup?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        def report_progress(progress, copied, total):
+            progress.setMaximum(total)
+            progress.setValue(copied)
+            progress.setLabelText(f"Copied {copied} of {total} pages...")
+
+        self.run_in_background(
+            self.async_db.prepare_restore(backup_file),
+            "Restore",
+            "Verifying the backup...",
+            self._replace_database,
+            report_progress,
+            "The database was not changed.",
+        )
+
+    def restore_snapshot(self):
+        from app.ui.snapshot_dialog import SnapshotDialog
+
+        snapshots = self.db_manager.list_snapshots()
+        if not snapshots:
+            QMessageBox.information(
+                self, "Restore Snapshot", "No snapshots have been taken yet."
+            )
+            return
+        dialog = SnapshotDialog(snapshots, self)
+        if not dialog.exec():
+            return
+
+        def report_progress(progress, restored, total):
+            progress.setMaximum(total)
+            progress.setValue(restored)
+            progress.setLabelText(f"Restored {restored} of {total} entries...")
+
+        self.run_in_background(
+            self.async_db.prepare_snapshot_restore(dialog.selected_snapshot()),
+            "Restore",
+            "Rebuilding the snapshot...",
+            self._replace_database,
+            report_progress,
+            "The database was not changed.",
+        )
+
+    def _replace_database(self, restored_path):
+        """Swap in a vault a worker prepared and verified.
+
+        Only the final rename runs on this thread, once no worker or
+        search holds the vault open.
+        """
+        self.async_db.close_connections()
+        self.searcher.close_connections()
+        try:
+            self.db_manager.replace_database(restored_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Restore Failed", f"An error occurred: {str(e)}")
+            return
+        self._upgrade_vault()
+        QMessageBox.information(
+            self, "Restore Success", "Database restored successfully"
+        )
+
+    def take_snapshot(self):
+        """Snapshot the vault in the background; an unchanged vault adds nothing"""
+        self.async_db.create_snapshot().failed.connect(
+            lambda error: print(f"Could not snapshot the vault: {str(error)}")
+        )
 
     """ Entry Management Methods """
 
     def on_new_entry_clicked(self):
+        from app.ui.new_entry_dialog import NewEntryDialog
+
         dialog = NewEntryDialog(self)
-        if dialog.exec():
-            self.update_table_with_entries()
+        dialog.exec()
 
     # Open a dialog to edit an existing password entry.
-    def on_edit_clicked(self, row):
-        db_id = self.id_map[row]
+    def on_edit_clicked(self, db_id):
+        from app.ui.edit_password_dialog import EditPassword
+
         dialog = EditPassword(db_id, self)  # Pass self as parent
-        if dialog.exec():
-            self.update_table_with_entries()
+        dialog.exec()
 
     # Delete a password entry after user confirmation.
-    def on_delete_clicked(self, row):
-        db_id = self.id_map[row]
+    def on_delete_clicked(self, db_id):
         reply = QMessageBox.question(
             self,
             "Confirm Deletion",
@@ -220,32 +467,30 @@ class PasswordManager(QMainWindow):
         )
         if reply == QMessageBox.StandardButton.Yes:
             if self.db_manager.delete_login(db_id):
-                self.update_table_with_entries()  # Changed from update_table
                 QMessageBox.information(self, "Success", "Entry deleted successfully.")
             else:
                 QMessageBox.warning(self, "Error", "Failed to delete entry.")
 
     # Display the password in plain text temporarily when view action is clicked.
-    def on_view_clicked(self, row):
-        db_id = self.id_map[row]
+    def on_view_clicked(self, db_id):
         password = self.db_manager.get_password(db_id)
         if password:
-            self.entry_table.setItem(row, 2, QTableWidgetItem(password))
-            QTimer.singleShot(5000, lambda r=row: self.mask_password(r))
+            self.entry_model.reveal_password(db_id, password)
+            QTimer.singleShot(5000, lambda i=db_id: self.mask_password(i))
 
             # QMessageBox.information(self, "View Password", f"Password: {password}")
         else:
             QMessageBox.warning(self, "Error", "Failed to retrieve password.")
 
     # Mask the displayed password after a delay.
-    def mask_password(self, row):
-        item = self.entry_table.item(row, 2)
-        if item:
-            item.setText("*" * 12)
+    def mask_password(self, db_id):
+        self.entry_model.mask_password(db_id)
 
     # Copy the unencrypted password to clipboard on double-click.
-    def on_double_click(self, item):
-        db_id = self.id_map.get(item.row())
+    def on_double_click(self, index):
+        if index.column() == VaultTableModel.ACTIONS_COLUMN:
+            return
+        db_id = index.data(VaultTableModel.EntryIdRole)
 
         if db_id is not None:
             unencrypted_password = self.db_manager.get_password(db_id)
@@ -257,54 +502,198 @@ class PasswordManager(QMainWindow):
     """ Dialog Methods"""
 
     def show_duplicate_passwords(self):
-        duplicates = self.db_manager.find_duplicate_passwords()
-        if duplicates:
-            dialog = DuplicatePasswordsDialog(duplicates)
-            dialog.exec()
-        else:
+        def show(result):
+            duplicates, similar = result
+            if duplicates or similar:
+                from app.ui.duplicate_password_dialog import DuplicatePasswordsDialog
+
+                dialog = DuplicatePasswordsDialog(duplicates, similar)
+                dialog.exec()
+            else:
+                QMessageBox.information(
+                    self, "No Duplicates", "No duplicate or similar passwords found."
+                )
+
+        self.run_in_background(
+            self.async_db.submit("find_reused_passwords"),
+            "Duplicate Password Finder",
+            "Indexing passwords...",
+            show,
+            lambda progress, indexed: progress.setLabelText(
+                f"Indexed {indexed} entries..."
+            ),
+        )
+
+    def show_breached_passwords(self):
+        def show(breached):
+            if breached:
+                from app.ui.breached_password_dialog import BreachedPasswordsDialog
+
+                dialog = BreachedPasswordsDialog(breached, self)
+                dialog.exec()
+            else:
+                QMessageBox.information(
+                    self, "No Breached Passwords", "No password was found in the corpus."
+                )
+
+        def no_corpus(error):
+            if not isinstance(error, CorpusError):
+                return False
             QMessageBox.information(
-                self, "No Duplicates", "No duplicate passwords found."
+                self,
+                "No Breach Corpus",
+                f"{str(error)}. Convert a Pwned Passwords dump with "
+                "'python -m app.utils.breach_checker convert' and save it "
+                f"as {DEFAULT_CORPUS}.",
             )
+            return True
+
+        self.run_in_background(
+            self.async_db.find_breached_passwords(),
+            "Breached Password Scan",
+            "Checking passwords...",
+            show,
+            lambda progress, checked: progress.setLabelText(
+                f"Checked {checked} entries..."
+            ),
+            on_failed=no_corpus,
+        )
+
+    def show_security_audit(self):
+        def show(report):
+            if report:
+                from app.ui.security_audit_dialog import SecurityAuditDialog
+
+                dialog = SecurityAuditDialog(report, self)
+                dialog.exec()
+            else:
+                QMessageBox.information(
+                    self, "Security Audit",
+                    "No weak, breached, reused or old passwords found."
+                )
+
+        def report_progress(progress, scored, total):
+            progress.setMaximum(total)
+            progress.setValue(scored)
+            progress.setLabelText(f"Scored {scored} of {total} changed entries...")
+
+        self.run_in_background(
+            self.async_db.audit_vault(),
+            "Security Audit",
+            "Auditing passwords...",
+            show,
+            report_progress,
+        )
 
-    
     def show_about_dialog(self):
+        from app.ui.about_dialog import AboutDialog
+
         dialog = AboutDialog(self)
         dialog.exec()
 
     def show_user_guide(self):
+        from app.ui.user_guide_dialog import UserGuideDialog
+
         dialog = UserGuideDialog(self)
         dialog.exec()
 
     # Open password generator dialog
     def open_password_generator(self):
+        from app.ui.password_generator_dialog import PasswordGenerationDialog
+
         dialog = PasswordGenerationDialog(self)
         dialog.exec()
 
     # Open dialog for master password reset
     def on_open_password_reset_clicked(self):
+        from app.ui.reset_password_dialog import ResetPasswordDialog
+        from app.utils.master_login import MasterLogin
+
         # Create MasterLogin instance with the current db_manager
         master_login = MasterLogin()
         master_login.set_db_manager(self.db_manager)  # Set the existing db_manager
-        dialog = ResetPasswordDialog(master_login, self)
+        dialog = ResetPasswordDialog(master_login, self, self.async_db)
         
         if dialog.exec():
             # Refresh the table after successful password reset
             self.update_table_with_entries()
 
+    def rotate_data_key(self):
+        """Re-encrypt every entry under a new vault key"""
+        reply = QMessageBox.question(
+            self,
+            "Rotate Vault Key",
+            "Re-encrypt all stored passwords under a new vault key?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        def rotated(stats):
+            self.db_manager.refresh_data_key()
+            QMessageBox.information(
+                self,
+                "Rotate Vault Key",
+                f"Re-encrypted {stats['rows']} passwords under a new vault key.",
+            )
+
+        def report_progress(progress, done, total, rows_per_second):
+            progress.setMaximum(total)
+            progress.setValue(done)
+            progress.setLabelText(
+                f"Re-encrypted {done} of {total} entries "
+                f"({rows_per_second:.0f} entries/s)"
+            )
+
+        self.run_in_background(
+            self.async_db.rotate_data_key(),
+            "Rotate Vault Key",
+            "Re-encrypting stored passwords...",
+            rotated,
+            report_progress,
+            "The vault key was not changed.",
+        )
+
     def show_password_strength_checker(self):
+        from app.ui.password_strength_checker_dialog import PasswordStrengthCheckerDialog
+
         dialog = PasswordStrengthCheckerDialog(self)
         dialog.exec()
 
     def update(self, event: DatabaseEvent, data: dict) -> None:
         """Handle database change notifications"""
-        if event in [DatabaseEvent.ENTRY_ADDED, DatabaseEvent.ENTRY_MODIFIED, 
-                    DatabaseEvent.ENTRY_DELETED]:
+        if self._pending_load is not None and event in (
+            DatabaseEvent.ENTRY_ADDED,
+            DatabaseEvent.ENTRY_MODIFIED,
+            DatabaseEvent.ENTRY_DELETED,
+        ):
+            self._missed_events.append((event, data))
+        # Single-entry events carry the entry, so only that row is touched
+        if event == DatabaseEvent.ENTRY_ADDED:
+            self.entry_model.add_entry(data)
+            self.searcher.refresh()
+        elif event == DatabaseEvent.ENTRY_MODIFIED:
+            self.entry_model.update_entry(data)
+            self.searcher.refresh()
+        elif event == DatabaseEvent.ENTRY_DELETED:
+            self.entry_model.remove_entry(data["id"])
+        elif event in (
+            DatabaseEvent.DATABASE_IMPORTED,
+            DatabaseEvent.DATABASE_RESTORED,
+        ):
             self.update_table_with_entries()
-        elif event == DatabaseEvent.DATABASE_ENCRYPTED:
-            self.update_table_with_entries()
-            QMessageBox.information(self, "Success", "Database has been re-encrypted")
+        elif event == DatabaseEvent.BATCH:
+            events = data["events"]
+            if len(events) > self.BATCH_RELOAD_THRESHOLD:
+                self.update_table_with_entries()
+            else:
+                for batched, batched_data in events:
+                    self.update(batched, batched_data)
 
     def closeEvent(self, event):
         """Clean up observer when window closes"""
         self.db_manager.detach(self)
+        self.async_db.shutdown()
+        self.searcher.shutdown()
+        self.db_manager.lock()
         super().closeEvent(event)
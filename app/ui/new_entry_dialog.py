@@ -1,6 +1,4 @@
-import string
 import time
-import random
 
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtWidgets import (
@@ -19,10 +17,13 @@ from PyQt6.QtWidgets import (
 )
 
 from app.utils.database_manager import DatabaseManager
+from app.utils.password_generator import generate_password
 from app.utils.password_strength_checker import check_password_strength
 
 
 class NewEntryDialog(QDialog):
+    STRENGTH_DEBOUNCE_MS = 150
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent = parent
@@ -39,7 +40,11 @@ class NewEntryDialog(QDialog):
         self.entry_url = QLineEdit()
         self.entry_username = QLineEdit()
         self.entry_password = QLineEdit()
-        self.entry_password.textChanged.connect(self.check_password)
+        self.strength_timer = QTimer(self)
+        self.strength_timer.setSingleShot(True)
+        self.strength_timer.setInterval(self.STRENGTH_DEBOUNCE_MS)
+        self.strength_timer.timeout.connect(self.check_password)
+        self.entry_password.textChanged.connect(lambda: self.strength_timer.start())
 
         form_layout.addRow("Website/URL:", self.entry_url)
         form_layout.addRow("Username/Email:", self.entry_username)
@@ -48,6 +53,10 @@ class NewEntryDialog(QDialog):
         self.password_strength_label = QLabel()
         form_layout.addRow("Password Strength:", self.password_strength_label)
 
+        self.password_reuse_label = QLabel()
+        self.password_reuse_label.setStyleSheet("color: orange;")
+        form_layout.addRow("", self.password_reuse_label)
+
         self.password_generation_section = self.create_password_generation_section()
 
         btn_layout = QHBoxLayout()
@@ -109,40 +118,14 @@ class NewEntryDialog(QDialog):
         self.char_length_label.setText(f"Password Length: {value}")
 
     def generate_password(self):
-        password_length = self.char_length.value()
-
-        char_sets = [string.ascii_lowercase]
-        required_chars = []
-
-        if self.alpha_char.checkState() == Qt.CheckState.Checked:
-            char_sets.append(string.ascii_uppercase)
-            required_chars.append(random.choice(string.ascii_uppercase))
-
-        if self.numerical_char.checkState() == Qt.CheckState.Checked:
-            char_sets.append(string.digits)
-            required_chars.append(random.choice(string.digits))
-
-        if self.special_char.checkState() == Qt.CheckState.Checked:
-            char_sets.append(string.punctuation)
-            required_chars.append(random.choice(string.punctuation))
-
-        # Combine all sets
-        all_chars = "".join(char_sets)
-
-        # Generate the main part of the password
-        main_password = "".join(
-            random.choice(all_chars)
-            for _ in range(password_length - len(required_chars))
+        password = generate_password(
+            self.char_length.value(),
+            uppercase=self.alpha_char.isChecked(),
+            digits=self.numerical_char.isChecked(),
+            symbols=self.special_char.isChecked(),
         )
-
-        # Combine and shuffle password
-        passw = "".join(required_chars + list(main_password))
-        passw_list = list(passw)
-        random.shuffle(passw_list)
-        final_password = "".join(passw_list)
-
-        self.password_field.setText(final_password)
-        self.entry_password.setText(final_password)
+        self.password_field.setText(password)
+        self.entry_password.setText(password)
 
     def check_password(self):
         password = self.entry_password.text()
@@ -151,6 +134,17 @@ class NewEntryDialog(QDialog):
         self.password_strength_label.setStyleSheet(
             f"color: {color}; font-weight: bold;"
         )
+        self.check_password_reuse(password)
+
+    def check_password_reuse(self, password):
+        uses = self.db_manager.count_password_uses(password) if password else 0
+        if uses:
+            entries = "entry" if uses == 1 else "entries"
+            self.password_reuse_label.setText(
+                f"This password is already used by {uses} other {entries}"
+            )
+        else:
+            self.password_reuse_label.clear()
 
     def save_new_entry(self):
         url = self.entry_url.text().strip()
@@ -182,8 +176,7 @@ class NewEntryDialog(QDialog):
                 QMessageBox.information(
                     self, "Success", "Password entry saved successfully."
                 )
-                self.close()
-                self.parent.update_table_with_entries()
+                self.accept()
             else:
                 QMessageBox.warning(
                     self,
@@ -1,7 +1,7 @@
-import string
-import random
 from PyQt6.QtWidgets import (
+    QComboBox,
     QDialog,
+    QFileDialog,
     QGroupBox,
     QGridLayout,
     QLineEdit,
@@ -9,12 +9,20 @@ from PyQt6.QtWidgets import (
     QCheckBox,
     QSlider,
     QLabel,
+    QSpinBox,
     QVBoxLayout,
-    QMessageBox,
 )
-from PyQt6.QtCore import Qt
-
-from app.utils.database_manager import DatabaseManager
+from PyQt6.QtCore import Qt, QSettings
+
+from app.utils.passphrase import (
+    SEPARATORS,
+    Wordlist,
+    WordlistError,
+    find_wordlist,
+    generate_passphrase,
+    passphrase_entropy,
+)
+from app.utils.password_generator import generate_password
 
 
 class PasswordGenerationDialog(QDialog):
@@ -22,10 +30,18 @@ class PasswordGenerationDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle("Password Generation")
         self.setModal(True)
+        self.settings = (
+            parent.db_manager.settings
+            if parent is not None and hasattr(parent, "db_manager")
+            else QSettings("YourCompany", "YourApp")
+        )
+        self.wordlist = None
 
         main_layout = QVBoxLayout()
         main_layout.addWidget(self.create_password_generation_section())
+        main_layout.addWidget(self.create_passphrase_section())
         self.setLayout(main_layout)
+        self.update_mode()
 
     def create_password_generation_section(self):
         group_box = QGroupBox("Password Generation")
@@ -40,6 +56,10 @@ class PasswordGenerationDialog(QDialog):
         self.generate_password_btn = QPushButton("Generate Password")
         self.generate_password_btn.clicked.connect(self.generate_password)
 
+        self.mode = QComboBox()
+        self.mode.addItems(["Characters", "Passphrase"])
+        self.mode.currentIndexChanged.connect(self.update_mode)
+
         # Character options
         self.alpha_char = QCheckBox("Include Capital Letters (A-Z)")
         self.numerical_char = QCheckBox("Include Numbers (0-9)")
@@ -55,68 +75,139 @@ class PasswordGenerationDialog(QDialog):
         # Layout
         layout.addWidget(self.password_field, 0, 0, 1, 2)
         layout.addWidget(self.generate_password_btn, 0, 2)
+        layout.addWidget(QLabel("Mode:"), 1, 0)
+        layout.addWidget(self.mode, 1, 1, 1, 2)
+
+        self.character_options = QGroupBox("Characters")
+        options_layout = QGridLayout()
+        options_layout.addWidget(self.alpha_char, 0, 0, 1, 1, Qt.AlignmentFlag.AlignLeft)
+        options_layout.addWidget(
+            self.numerical_char, 1, 0, 1, 1, Qt.AlignmentFlag.AlignLeft
+        )
+        options_layout.addWidget(self.special_char, 2, 0, 1, 1, Qt.AlignmentFlag.AlignLeft)
 
-        layout.addWidget(self.alpha_char, 1, 0, 1, 1, Qt.AlignmentFlag.AlignLeft)
-        layout.addWidget(self.numerical_char, 2, 0, 1, 1, Qt.AlignmentFlag.AlignLeft)
-        layout.addWidget(self.special_char, 3, 0, 1, 1, Qt.AlignmentFlag.AlignLeft)
-
-        layout.addWidget(self.char_length, 1, 1, 2, 2)
-        layout.addWidget(
-            self.char_length_label, 3, 1, 1, 2, Qt.AlignmentFlag.AlignCenter
+        options_layout.addWidget(self.char_length, 0, 1, 2, 2)
+        options_layout.addWidget(
+            self.char_length_label, 2, 1, 1, 2, Qt.AlignmentFlag.AlignCenter
         )
+        self.character_options.setLayout(options_layout)
+        layout.addWidget(self.character_options, 2, 0, 1, 3)
 
         group_box.setLayout(layout)
         return group_box
 
-    def generate_password(self, login_id=None):
-        password_length = self.char_length.value()
-
-        char_sets = [string.ascii_lowercase]
-        required_chars = []
-
-        if self.alpha_char.checkState() == Qt.CheckState.Checked:
-            char_sets.append(string.ascii_uppercase)
-            required_chars.append(random.choice(string.ascii_uppercase))
-
-        if self.numerical_char.checkState() == Qt.CheckState.Checked:
-            char_sets.append(string.digits)
-            required_chars.append(random.choice(string.digits))
-
-        if self.special_char.checkState() == Qt.CheckState.Checked:
-            char_sets.append(string.punctuation)
-            required_chars.append(random.choice(string.punctuation))
-
-        # Combine all sets
-        all_chars = "".join(char_sets)
+    def create_passphrase_section(self):
+        self.passphrase_options = QGroupBox("Passphrase")
+        layout = QGridLayout()
 
-        max_attempts = 100  # Prevent infinite loop
-        for _ in range(max_attempts):
-            # Generate the main part of the password
-            main_password = "".join(
-                random.choice(all_chars)
-                for _ in range(password_length - len(required_chars))
+        self.word_count = QSpinBox()
+        self.word_count.setRange(3, 12)
+        self.word_count.setValue(6)
+        self.word_count.valueChanged.connect(self.update_entropy)
+
+        self.separator = QComboBox()
+        self.separator.addItems(SEPARATORS)
+        self.separator.currentIndexChanged.connect(self.update_entropy)
+
+        self.wordlist_label = QLabel()
+        self.wordlist_label.setWordWrap(True)
+        choose_wordlist_btn = QPushButton("Wordlist...")
+        choose_wordlist_btn.clicked.connect(self.choose_wordlist)
+
+        self.entropy_label = QLabel()
+
+        layout.addWidget(QLabel("Words:"), 0, 0)
+        layout.addWidget(self.word_count, 0, 1)
+        layout.addWidget(QLabel("Separator:"), 1, 0)
+        layout.addWidget(self.separator, 1, 1)
+        layout.addWidget(self.wordlist_label, 2, 0, 1, 2)
+        layout.addWidget(choose_wordlist_btn, 2, 2)
+        layout.addWidget(self.entropy_label, 3, 0, 1, 3)
+
+        self.passphrase_options.setLayout(layout)
+        return self.passphrase_options
+
+    def is_passphrase_mode(self):
+        return self.mode.currentText() == "Passphrase"
+
+    def update_mode(self):
+        passphrase = self.is_passphrase_mode()
+        self.character_options.setVisible(not passphrase)
+        self.passphrase_options.setVisible(passphrase)
+        if passphrase and self.wordlist is None:
+            self.open_wordlist(find_wordlist(self.settings))
+        self.update_entropy()
+
+    def open_wordlist(self, path):
+        if self.wordlist is not None:
+            self.wordlist.close()
+            self.wordlist = None
+        if path is None:
+            self.wordlist_label.setText(
+                "No wordlist found. Choose one to generate passphrases."
             )
-
-            # Combine and shuffle password
-            passw = "".join(required_chars + list(main_password))
-            passw_list = list(passw)
-            random.shuffle(passw_list)
-            final_password = "".join(passw_list)
-
-            # Check if the password has been used before
-            if login_id is None or not DatabaseManager().is_password_previously_used(
-                login_id, final_password
-            ):
-                self.password_field.setText(final_password)
-                return final_password
-
-        # couldn't generate a unique password
-        QMessageBox.warning(
-            self,
-            "Password Generation Failed",
-            "Unable to generate a unique password. Please try again or adjust the settings.",
+        else:
+            try:
+                self.wordlist = Wordlist(path)
+                self.wordlist_label.setText(
+                    f"{path} ({len(self.wordlist):,} words)"
+                )
+            except (OSError, WordlistError) as e:
+                print(f"Could not open wordlist {path}: {str(e)}")
+                self.wordlist_label.setText(f"Could not open {path}")
+        if self.is_passphrase_mode():
+            self.generate_password_btn.setEnabled(self.wordlist is not None)
+
+    def choose_wordlist(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Choose Wordlist", "", "Text Files (*.txt);;All Files (*)"
         )
-        return None
+        if path:
+            self.open_wordlist(path)
+            if self.wordlist is not None:
+                self.settings.setValue("passphrase/wordlist", path)
+            self.update_entropy()
+
+    def selected_separators(self):
+        return SEPARATORS[self.separator.currentText()]
+
+    def update_entropy(self):
+        if not self.is_passphrase_mode():
+            self.generate_password_btn.setEnabled(True)
+            return
+        self.generate_password_btn.setEnabled(self.wordlist is not None)
+        if self.wordlist is None:
+            self.entropy_label.clear()
+            return
+        bits = passphrase_entropy(
+            len(self.wordlist), self.word_count.value(), self.selected_separators()
+        )
+        self.entropy_label.setText(f"Entropy: {bits:.1f} bits")
+
+    def generate_password(self):
+        if self.is_passphrase_mode():
+            if self.wordlist is None:
+                return None
+            password = generate_passphrase(
+                self.wordlist, self.word_count.value(), self.selected_separators()
+            )
+            self.password_field.setText(password)
+            return password
+
+        password = generate_password(
+            self.char_length.value(),
+            uppercase=self.alpha_char.isChecked(),
+            digits=self.numerical_char.isChecked(),
+            symbols=self.special_char.isChecked(),
+        )
+        self.password_field.setText(password)
+        return password
 
     def update_password_length(self, value):
         self.char_length_label.setText(f"Password Length: {value}")
+
+    def done(self, result):
+        if self.wordlist is not None:
+            self.wordlist.close()
+            self.wordlist = None
+        super().done(result)
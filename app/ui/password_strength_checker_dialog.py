@@ -6,11 +6,16 @@ from PyQt6.QtWidgets import (
     QPushButton,
     QGridLayout,
 )
-from PyQt6.QtCore import Qt
-import re
+from PyQt6.QtCore import Qt, QTimer
+
+from app.utils.password_strength_checker import check_password_strength
 
 
 class PasswordStrengthCheckerDialog(QDialog):
+    # Scoring a long password takes a few milliseconds, so it waits for a
+    # pause in typing
+    STRENGTH_DEBOUNCE_MS = 150
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.init_ui()
@@ -31,6 +36,11 @@ class PasswordStrengthCheckerDialog(QDialog):
 
         self.check_button = QPushButton("Check Strength", self)
         self.check_button.clicked.connect(self.check_password_strength)
+        self.strength_timer = QTimer(self)
+        self.strength_timer.setSingleShot(True)
+        self.strength_timer.setInterval(self.STRENGTH_DEBOUNCE_MS)
+        self.strength_timer.timeout.connect(self.check_password_strength)
+        self.password_input.textChanged.connect(lambda: self.strength_timer.start())
 
         self.result_label = QLabel(self)
         self.result_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -46,67 +56,7 @@ class PasswordStrengthCheckerDialog(QDialog):
         layout.addWidget(self.feedback_label, 3, 0, 1, 2)  # Added feedback label
 
     def check_password_strength(self):
-        password = self.password_input.text()
-
-        # Initialize score
-        score = 0
-        feedback = []
-
-        # Check length
-        if len(password) < 8:
-            feedback.append("Password is too short")
-        elif len(password) >= 12:
-            score += 2
-            feedback.append("Good length")
-        else:
-            score += 1
-
-        # Check for uppercase letters
-        if re.search(r"[A-Z]", password):
-            score += 1
-        else:
-            feedback.append("Add uppercase letters")
-
-        # Check for lowercase letters
-        if re.search(r"[a-z]", password):
-            score += 1
-        else:
-            feedback.append("Add lowercase letters")
-
-        # Check for numbers
-        if re.search(r"\d", password):
-            score += 1
-        else:
-            feedback.append("Add numbers")
-
-        # Check for special characters
-        if re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
-            score += 1
-        else:
-            feedback.append("Add special characters")
-
-        # Check for repeating characters
-        if re.search(r"(.)\1\1", password):
-            score -= 1
-            feedback.append("Avoid repeating characters")
-
-        # Determine strength based on score
-        if score < 2:
-            strength = "Very Weak"
-            color = "red"
-        elif score < 4:
-            strength = "Weak"
-            color = "orange"
-        elif score < 6:
-            strength = "Medium"
-            color = "yellow"
-        elif score < 8:
-            strength = "Strong"
-            color = "lightgreen"
-        else:
-            strength = "Very Strong"
-            color = "green"
-
+        strength, color, feedback = check_password_strength(self.password_input.text())
         feedback_str = ", ".join(feedback) if feedback else "Excellent password!"
 
         self.result_label.setText(f"{strength}")
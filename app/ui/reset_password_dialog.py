@@ -1,5 +1,5 @@
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import (
-    QDialog,
     QLineEdit,
     QLabel,
     QPushButton,
@@ -7,13 +7,15 @@ from PyQt6.QtWidgets import (
     QGridLayout,
 )
 
+from app.ui.key_derivation_dialog import KeyDerivationDialog
 from app.utils.password_strength_checker import check_password_strength
 
 
-class ResetPasswordDialog(QDialog):
-    def __init__(self, password_manager, parent=None):
-        super().__init__(parent)
-        self.password_manager = password_manager
+class ResetPasswordDialog(KeyDerivationDialog):
+    STRENGTH_DEBOUNCE_MS = 150
+
+    def __init__(self, password_manager, parent=None, async_db=None):
+        super().__init__(password_manager, parent, async_db)
         self.setWindowTitle("Reset Master Password")
         self.setFixedSize(450, 200)
         self.setup_ui()
@@ -31,7 +33,11 @@ class ResetPasswordDialog(QDialog):
         self.new_password_input.setEchoMode(QLineEdit.EchoMode.Password)
         self.new_password_confirm_input.setEchoMode(QLineEdit.EchoMode.Password)
 
-        self.new_password_input.textChanged.connect(self.check_password)
+        self.strength_timer = QTimer(self)
+        self.strength_timer.setSingleShot(True)
+        self.strength_timer.setInterval(self.STRENGTH_DEBOUNCE_MS)
+        self.strength_timer.timeout.connect(self.check_password)
+        self.new_password_input.textChanged.connect(lambda: self.strength_timer.start())
         self.password_strength_label = QLabel()
 
         self.create_button = QPushButton("Reset Password")
@@ -62,27 +68,36 @@ class ResetPasswordDialog(QDialog):
         new_password = self.new_password_input.text()
         new_confirm = self.new_password_confirm_input.text()
 
-        if not self.password_manager.check_password(old_password):
-            QMessageBox.warning(self, "Error", "Original password is incorrect")
-        elif new_password != new_confirm:
-            QMessageBox.warning(self, "Error", "Passwords do not match")
-        elif len(new_password) < 8:
-            QMessageBox.warning(self, "Error", "Password must be at least 8 characters long")
-        else:
-            try:
-                if self.password_manager.password_reset(old_password, new_password):
-                    QMessageBox.information(self, "Success", 
-                        "Password reset successfully. All stored passwords have been re-encrypted.")
-                    self.accept()
-                else:
-                    QMessageBox.critical(self, "Error", 
-                        "Failed to reset password. Your original password remains unchanged.")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", 
-                    f"An error occurred during password reset: {str(e)}\n"
-                    "Your original password remains unchanged.")
-
         # Clear input fields for security
         self.old_password_input.clear()
         self.new_password_input.clear()
         self.new_password_confirm_input.clear()
+
+        if new_password != new_confirm:
+            QMessageBox.warning(self, "Error", "Passwords do not match")
+            return
+        if len(new_password) < 8:
+            QMessageBox.warning(self, "Error", "Password must be at least 8 characters long")
+            return
+
+        def reset(db_manager):
+            """Return (old password verified, new key or None)"""
+            if not self.password_manager.check_password(old_password):
+                return False, None
+            return True, self.password_manager.change_password(
+                new_password, db_manager
+            )
+
+        def finished(result):
+            verified, new_key = result
+            if not verified:
+                QMessageBox.warning(self, "Error", "Original password is incorrect")
+            elif new_key is None:
+                QMessageBox.critical(self, "Error", 
+                    "Failed to reset password. Your original password remains unchanged.")
+            else:
+                self.password_manager.use_key(new_key)
+                QMessageBox.information(self, "Success", "Password reset successfully.")
+                self.accept()
+
+        self.run_derivation(reset, "Changing master password...", finished)
@@ -0,0 +1,81 @@
+from PyQt6.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+)
+
+
+class SecurityAuditDialog(QDialog):
+    COLUMNS = ["Website", "Username", "Issues", "Strength", "Breached", "Used By", "Age (days)"]
+
+    def __init__(self, report, parent=None):
+        super().__init__(parent)
+        self.report = report
+        self.init_ui()
+
+    def init_ui(self):
+        self.setWindowTitle("Security Audit")
+        self.setMinimumWidth(750)
+        self.setMinimumHeight(400)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        counts = {}
+        for entry in self.report:
+            for issue in entry["issues"]:
+                counts[issue] = counts.get(issue, 0) + 1
+        summary = ", ".join(f"{count} {issue.lower()}" for issue, count in counts.items())
+        layout.addWidget(
+            QLabel(f"{len(self.report)} entries need attention: {summary}")
+        )
+
+        self.table = QTableWidget(len(self.report), len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Stretch
+        )
+
+        for row, entry in enumerate(self.report):
+            strength = self.item(entry["strength"], entry["score"])
+            strength.setToolTip("\n".join(entry["feedback"]))
+            items = [
+                self.item(entry["website"]),
+                self.item(entry["username"]),
+                self.item(", ".join(entry["issues"]), len(entry["issues"])),
+                strength,
+                self.item(f"{entry['breached']:,}" if entry["breached"] else "", entry["breached"]),
+                self.item(str(entry["uses"]), entry["uses"]),
+                self.item(str(entry["age_days"]), entry["age_days"]),
+            ]
+            for column, item in enumerate(items):
+                self.table.setItem(row, column, item)
+
+        # Enabled after filling, otherwise rows move while they are inserted
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
+
+    def item(self, text, sort_value=None):
+        item = SortableItem(text)
+        item.sort_value = sort_value if sort_value is not None else text.lower()
+        return item
+
+
+class SortableItem(QTableWidgetItem):
+    """Sorts by a separate value so numbers and strengths sort naturally"""
+
+    def __lt__(self, other):
+        return self.sort_value < other.sort_value
@@ -0,0 +1,67 @@
+import datetime
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (
+    QDialog,
+    QHBoxLayout,
+    QVBoxLayout,
+    QLabel,
+    QListWidget,
+    QListWidgetItem,
+    QPushButton,
+)
+
+
+class SnapshotDialog(QDialog):
+    def __init__(self, snapshots, parent=None):
+        super().__init__(parent)
+        self.snapshots = snapshots
+        self.init_ui()
+
+    def init_ui(self):
+        self.setWindowTitle("Restore Snapshot")
+        self.setMinimumWidth(400)
+        self.setMinimumHeight(300)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        summary = QLabel(
+            "Choose the snapshot to restore. Every entry is replaced by the "
+            "entries it holds."
+        )
+        summary.setWordWrap(True)
+        layout.addWidget(summary)
+
+        self.snapshot_list = QListWidget()
+        for snapshot in self.snapshots:
+            created = datetime.datetime.fromisoformat(snapshot["created"]).astimezone()
+            item = QListWidgetItem(
+                f"{created:%Y-%m-%d %H:%M}    {snapshot['entries']} entries"
+            )
+            item.setData(Qt.ItemDataRole.UserRole, snapshot["id"])
+            self.snapshot_list.addItem(item)
+        self.snapshot_list.itemSelectionChanged.connect(self.selection_changed)
+        self.snapshot_list.itemDoubleClicked.connect(self.accept)
+        layout.addWidget(self.snapshot_list)
+
+        buttons = QHBoxLayout()
+        self.restore_button = QPushButton("Restore")
+        self.restore_button.setEnabled(False)
+        self.restore_button.clicked.connect(self.accept)
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(self.reject)
+        buttons.addWidget(self.restore_button)
+        buttons.addWidget(cancel_button)
+        layout.addLayout(buttons)
+
+        self.setLayout(layout)
+
+    def selection_changed(self):
+        self.restore_button.setEnabled(bool(self.snapshot_list.selectedItems()))
+
+    def selected_snapshot(self):
+        """Return the id of the chosen snapshot"""
+        items = self.snapshot_list.selectedItems()
+        return items[0].data(Qt.ItemDataRole.UserRole) if items else None
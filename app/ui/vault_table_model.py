@@ -0,0 +1,223 @@
+from bisect import bisect_left
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+
+class VaultTableModel(QAbstractTableModel):
+    """Table model exposing vault entries to a QTableView"""
+
+    EntryIdRole = Qt.ItemDataRole.UserRole + 1
+
+    WEBSITE_COLUMN = 0
+    USERNAME_COLUMN = 1
+    PASSWORD_COLUMN = 2
+    ACTIONS_COLUMN = 3
+
+    HEADERS = ["Website", "Username/Email", "Password", "Actions"]
+    PASSWORD_MASK = "*" * 12
+
+    def __init__(self, password_provider, parent=None):
+        super().__init__(parent)
+        # Called with an entry id; only invoked for cells that are painted
+        self._password_provider = password_provider
+        self._entries = []
+        # Ascending sort key of each entry in _entries, and each id's key.
+        # Keys never change once given out, so rows can be found by bisection
+        # and removing an entry does not renumber the ones after it.
+        self._keys = []
+        self._order = {}
+        self._next_key = 0
+        # Entries currently shown and their keys; _entries and _keys
+        # themselves when no filter is set
+        self._rows = []
+        self._row_keys = []
+        self._id_filter = None
+        self._revealed = {}
+        self._passwords_visible = False
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (
+            orientation == Qt.Orientation.Horizontal
+            and role == Qt.ItemDataRole.DisplayRole
+        ):
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        entry = self._rows[index.row()]
+        column = index.column()
+
+        if role == self.EntryIdRole:
+            return entry["id"]
+
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        if column == self.WEBSITE_COLUMN:
+            return entry["website"]
+        if column == self.USERNAME_COLUMN:
+            return entry["username"]
+        if column == self.PASSWORD_COLUMN:
+            return self._password_text(entry)
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled
+
+    def _password_text(self, entry):
+        if entry["id"] in self._revealed:
+            return self._revealed[entry["id"]]
+        if self._passwords_visible:
+            try:
+                return self._password_provider(entry["id"]) or ""
+            except Exception as e:
+                print(f"Error decrypting entry {entry['id']}: {str(e)}")
+        return self.PASSWORD_MASK
+
+    """ Entry Management Methods """
+
+    def set_entries(self, entries):
+        """Replace all entries in a single model reset"""
+        self.beginResetModel()
+        self._entries = list(entries)
+        self._keys = list(range(len(self._entries)))
+        self._order = {
+            entry["id"]: key for key, entry in zip(self._keys, self._entries)
+        }
+        self._next_key = len(self._entries)
+        self._rows, self._row_keys = self._filtered_rows()
+        self._revealed = {}
+        self.endResetModel()
+
+    def add_entry(self, entry):
+        """Append a single entry.
+
+        While a filter is set the entry is only shown once the filter is
+        updated to include it. An entry that is already shown is updated.
+        """
+        if entry["id"] in self._order:
+            self.update_entry(entry)
+            return
+        key = self._next_key
+        self._next_key += 1
+        self._order[entry["id"]] = key
+        if self._id_filter is None:
+            row = len(self._rows)
+            self.beginInsertRows(QModelIndex(), row, row)
+        self._entries.append(entry)
+        self._keys.append(key)
+        if self._id_filter is None:
+            self.endInsertRows()
+
+    def update_entry(self, entry):
+        """Replace the metadata of an existing entry in place"""
+        key = self._order.get(entry["id"])
+        if key is None:
+            return
+        self._entries[self._find(self._keys, key)] = entry
+        self._revealed.pop(entry["id"], None)
+        row = self._find(self._row_keys, key)
+        if row >= 0:
+            self._rows[row] = entry
+            self.dataChanged.emit(
+                self.index(row, 0),
+                self.index(row, self.columnCount() - 1),
+                [Qt.ItemDataRole.DisplayRole],
+            )
+
+    def remove_entry(self, entry_id):
+        key = self._order.pop(entry_id, None)
+        if key is None:
+            return
+        self._revealed.pop(entry_id, None)
+        row = self._find(self._row_keys, key)
+        if row >= 0:
+            self.beginRemoveRows(QModelIndex(), row, row)
+        position = self._find(self._keys, key)
+        del self._entries[position]
+        del self._keys[position]
+        if self._id_filter is not None and row >= 0:
+            del self._rows[row]
+            del self._row_keys[row]
+        if row >= 0:
+            self.endRemoveRows()
+
+    @staticmethod
+    def _find(keys, key):
+        position = bisect_left(keys, key)
+        if position < len(keys) and keys[position] == key:
+            return position
+        return -1
+
+    def set_id_filter(self, ids):
+        """Show only the entries whose id is in ids, or every entry for None.
+
+        The cost is proportional to the number of matches, not the vault size.
+        """
+        self.beginResetModel()
+        self._id_filter = ids
+        self._rows, self._row_keys = self._filtered_rows()
+        self.endResetModel()
+
+    def _filtered_rows(self):
+        if self._id_filter is None:
+            return self._entries, self._keys
+        keys = sorted(
+            self._order[entry_id]
+            for entry_id in self._id_filter
+            if entry_id in self._order
+        )
+        return [self._entries[self._find(self._keys, key)] for key in keys], keys
+
+    def entry_id(self, row):
+        return self._rows[row]["id"]
+
+    def row_for_id(self, entry_id):
+        key = self._order.get(entry_id)
+        if key is None:
+            return -1
+        return self._find(self._row_keys, key)
+
+    """ Password Visibility Methods """
+
+    def set_passwords_visible(self, visible):
+        self._passwords_visible = visible
+        self._password_column_changed()
+
+    def reveal_password(self, entry_id, password):
+        """Show the plain password of a single entry until masked again"""
+        self._revealed[entry_id] = password
+        self._row_changed(entry_id)
+
+    def mask_password(self, entry_id):
+        if self._revealed.pop(entry_id, None) is not None:
+            self._row_changed(entry_id)
+
+    def _row_changed(self, entry_id):
+        row = self.row_for_id(entry_id)
+        if row >= 0:
+            index = self.index(row, self.PASSWORD_COLUMN)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+
+    def _password_column_changed(self):
+        if self._rows:
+            self.dataChanged.emit(
+                self.index(0, self.PASSWORD_COLUMN),
+                self.index(len(self._rows) - 1, self.PASSWORD_COLUMN),
+                [Qt.ItemDataRole.DisplayRole],
+            )
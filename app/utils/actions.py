@@ -22,6 +22,9 @@ class Actions:
         self.restore_database_action = self.create_action(
             "Restore Database", self.restore_database
         )
+        self.restore_snapshot_action = self.create_action(
+            "Restore Snapshot", self.restore_snapshot
+        )
         self.exit_action = self.create_action("Exit", self.parent.close)
 
         # View menu actions
@@ -43,6 +46,12 @@ class Actions:
         self.duplicate_password_finder_action = self.create_action(
             "Duplicate Password Finder", self.show_duplicate_passwords
         )
+        self.breach_scan_action = self.create_action(
+            "Breached Password Scan", self.show_breached_passwords
+        )
+        self.security_audit_action = self.create_action(
+            "Security Audit", self.show_security_audit
+        )
         self.password_history_action = self.create_action(
             "Password History", self.show_password_history
         )
@@ -54,6 +63,9 @@ class Actions:
         self.password_reset_action = self.create_action(
             "Reset Master Password", self.on_open_password_reset_clicked
         )
+        self.rotate_data_key_action = self.create_action(
+            "Rotate Vault Key", self.rotate_data_key
+        )
         self.user_guide_action = self.create_action(
             "User Guide", self.show_user_guide
         )
@@ -67,16 +79,19 @@ class Actions:
         return action
 
     def import_passwords(self):
-        self.db_manager.import_data()
+        self.parent.import_passwords()
 
     def export_passwords(self):
-        self.db_manager.export_data()
+        self.parent.export_passwords()
 
     def backup_database(self):
-        self.db_manager.backup_database()
+        self.parent.backup_database()
 
     def restore_database(self):
-        self.db_manager.restore_database()
+        self.parent.restore_database()
+
+    def restore_snapshot(self):
+        self.parent.restore_snapshot()
 
     def toggle_password_visibility(self, checked):
         self.parent.toggle_password_visibility(checked)
@@ -96,6 +111,12 @@ class Actions:
     def show_duplicate_passwords(self):
         self.parent.show_duplicate_passwords()
 
+    def show_breached_passwords(self):
+        self.parent.show_breached_passwords()
+
+    def show_security_audit(self):
+        self.parent.show_security_audit()
+
     def show_password_history(self):
         self.parent.show_password_history()
 
@@ -105,6 +126,9 @@ class Actions:
     def on_open_password_reset_clicked(self):
         self.parent.on_open_password_reset_clicked()
 
+    def rotate_data_key(self):
+        self.parent.rotate_data_key()
+
     def show_user_guide(self):
         self.parent.show_user_guide()
 
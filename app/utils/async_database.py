@@ -0,0 +1,318 @@
+"""Run DatabaseManager operations on background threads.
+
+AsyncDatabaseManager wraps the GUI thread's DatabaseManager. Each pool
+thread gets its own worker DatabaseManager on its own QSqlDatabase
+connection, sharing the owner's key and plaintext caches, so long
+operations never block the event loop. Every call returns a
+DatabaseFuture whose signals are delivered on the GUI thread, and events
+a worker emits are forwarded to the owner's observers through a queued
+connection.
+"""
+import inspect
+import threading
+
+from PyQt6.QtCore import (
+    QObject,
+    QRunnable,
+    QThreadPool,
+    QTimer,
+    Qt,
+    pyqtSignal,
+    pyqtSlot,
+)
+from PyQt6.QtSql import QSqlDatabase
+
+from app.utils.database_manager import DatabaseManager
+from app.utils.errors import OperationCancelled
+
+
+class DatabaseFuture(QObject):
+    """Result of a background operation.
+
+    progress carries the arguments the operation passed to its progress
+    callback as a tuple. Exactly one of finished, failed or cancelled is
+    emitted when the operation ends. The operation only starts once control
+    returns to the event loop (or result() is called), so signals connected
+    right after submit() never miss its end.
+    """
+
+    progress = pyqtSignal(tuple)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cancel_requested = threading.Event()
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+        self._start = None
+        self._start_lock = threading.Lock()
+        # Guards _running and _done, so only the first outcome is reported
+        self._state_lock = threading.Lock()
+        self._running = False
+
+    def cancel(self):
+        """Ask the operation to stop at its next checkpoint"""
+        self._cancel_requested.set()
+
+    def is_cancelled(self):
+        return self._cancel_requested.is_set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """Block until the operation ends and return its result or raise its error"""
+        self._ensure_started()
+        if not self._done.wait(timeout):
+            raise TimeoutError("Operation did not finish in time")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _ensure_started(self):
+        with self._start_lock:
+            start, self._start = self._start, None
+        if start is not None:
+            start()
+
+    def _begin(self):
+        """Mark the job as running; False if the future already ended"""
+        with self._state_lock:
+            if self._done.is_set():
+                return False
+            self._running = True
+            return True
+
+    def _abandon(self):
+        """End the future as cancelled if its job has not started"""
+        with self._state_lock:
+            if self._running or self._done.is_set():
+                return
+        self._set_error(OperationCancelled())
+
+    def _set_result(self, result):
+        with self._state_lock:
+            if self._done.is_set():
+                return
+            self._result = result
+            self._done.set()
+        self.finished.emit(result)
+
+    def _set_error(self, error):
+        with self._state_lock:
+            if self._done.is_set():
+                return
+            self._error = error
+            self._done.set()
+        if isinstance(error, OperationCancelled):
+            self.cancelled.emit()
+        else:
+            self.failed.emit(error)
+
+
+class _DatabaseJob(QRunnable):
+    def __init__(self, owner, future, operation, args, kwargs):
+        super().__init__()
+        self.owner = owner
+        self.future = future
+        self.operation = operation
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        future = self.future
+        if not future._begin():
+            return
+        try:
+            if future.is_cancelled():
+                raise OperationCancelled()
+            db_manager = self.owner._worker_manager()
+            if isinstance(self.operation, str):
+                function = getattr(db_manager, self.operation)
+                args = self.args
+            else:
+                function = self.operation
+                args = (db_manager, *self.args)
+            kwargs = dict(self.kwargs)
+            parameters = inspect.signature(function).parameters
+            if "progress_callback" in parameters:
+                kwargs["progress_callback"] = lambda *done: future.progress.emit(done)
+            if "is_cancelled" in parameters:
+                kwargs["is_cancelled"] = future.is_cancelled
+            result = function(*args, **kwargs)
+        except BaseException as e:
+            future._set_error(e)
+        else:
+            future._set_result(result)
+
+
+class _CloseJob(QRunnable):
+    """Close the worker connection of the pool thread that runs it"""
+
+    def __init__(self, owner, barrier):
+        super().__init__()
+        self.owner = owner
+        self.barrier = barrier
+
+    def run(self):
+        try:
+            # Every pool thread has to take one of these jobs before any
+            # can pass, so each thread closes its own connection
+            self.barrier.wait(self.owner.CLOSE_TIMEOUT_SECONDS)
+        except threading.BrokenBarrierError:
+            pass
+        self.owner._close_worker(threading.get_ident())
+
+
+class _EventForwarder(QObject):
+    """Observer of the worker managers that re-emits their events on the GUI thread"""
+
+    forwarded = pyqtSignal(object, object)
+
+    def update(self, event, data):
+        self.forwarded.emit(event, data)
+
+
+class AsyncDatabaseManager(QObject):
+    """Background facade over a DatabaseManager"""
+
+    MAX_THREADS = 2
+    CLOSE_TIMEOUT_SECONDS = 5
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        # Pool thread id -> its worker DatabaseManager. Not a threading.local:
+        # Python forgets those when a Qt thread leaves each job.
+        self._workers = {}
+        self._futures = set()
+
+        # Long-lived threads keep their connections open between jobs
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(self.MAX_THREADS)
+        self._pool.setExpiryTimeout(-1)
+
+        self._forwarder = _EventForwarder(self)
+        self._forwarder.forwarded.connect(
+            self._deliver_event, Qt.ConnectionType.QueuedConnection
+        )
+
+    def submit(self, operation, *args, **kwargs):
+        """Run operation in the pool and return its DatabaseFuture.
+
+        operation is the name of a DatabaseManager method, or a function
+        called with the worker's DatabaseManager followed by args. Either
+        gets progress_callback and is_cancelled if it accepts them.
+        """
+        future = DatabaseFuture(self)
+        self._futures.add(future)
+        future.finished.connect(lambda _: self._futures.discard(future))
+        future.failed.connect(lambda _: self._futures.discard(future))
+        future.cancelled.connect(lambda: self._futures.discard(future))
+        job = _DatabaseJob(self, future, operation, args, kwargs)
+        future._start = lambda: self._pool.start(job)
+        # Started from the event loop, after the caller connected its slots
+        QTimer.singleShot(0, future._ensure_started)
+        return future
+
+    def load_table(self):
+        return self.submit("load_table")
+
+    def sort_by_website(self):
+        return self.submit("sort_by_website")
+
+    def sort_by_username(self):
+        return self.submit("sort_by_username")
+
+    def export_to_file(self, file_path):
+        return self.submit("export_to_file", file_path)
+
+    def import_file(self, file_path):
+        return self.submit("import_file", file_path)
+
+    def backup_to_file(self, file_path):
+        return self.submit("backup_to_file", file_path)
+
+    def prepare_restore(self, backup_path):
+        return self.submit("prepare_restore", backup_path)
+
+    def create_snapshot(self):
+        return self.submit("create_snapshot")
+
+    def prepare_snapshot_restore(self, snapshot_id):
+        return self.submit("prepare_snapshot_restore", snapshot_id)
+
+    def find_duplicate_passwords(self):
+        return self.submit("find_duplicate_passwords")
+
+    def find_similar_passwords(self, max_distance=None):
+        return self.submit("find_similar_passwords", max_distance)
+
+    def find_breached_passwords(self):
+        return self.submit("find_breached_passwords")
+
+    def audit_vault(self):
+        return self.submit("audit_vault")
+
+    def migrate_legacy_tokens(self):
+        return self.submit("migrate_legacy_tokens")
+
+    def rotate_data_key(self):
+        return self.submit("rotate_data_key")
+
+    def _worker_manager(self):
+        """Return the calling pool thread's DatabaseManager, keyed like the owner"""
+        thread = threading.get_ident()
+        db_manager = self._workers.get(thread)
+        if db_manager is None:
+            db_manager = DatabaseManager(owner=self.db_manager)
+            db_manager.attach(self._forwarder)
+            self._workers[thread] = db_manager
+        db_manager.adopt_key(self.db_manager.key)
+        return db_manager
+
+    @pyqtSlot(object, object)
+    def _deliver_event(self, event, data):
+        self.db_manager.notify(event, data)
+
+    def close_connections(self):
+        """Cancel every pending operation, wait for the rest and close the worker connections.
+
+        Later jobs open new connections, e.g. to a restored vault file.
+        """
+        for future in list(self._futures):
+            future.cancel()
+            # Jobs still queued are dropped below and would never report
+            future._abandon()
+        self._pool.clear()
+
+        # Queued behind the running jobs: waitForDone ends the pool threads,
+        # and a connection has to be closed by the thread that opened it
+        if self._workers:
+            threads = self._pool.maxThreadCount()
+            barrier = threading.Barrier(threads)
+            for _ in range(threads):
+                self._pool.start(_CloseJob(self, barrier))
+        self._pool.waitForDone()
+        # A later pool thread may get a finished thread's id, and would be
+        # handed that thread's connection by name
+        for thread in list(self._workers):
+            print("Closing a worker connection outside its thread")
+            self._close_worker(thread)
+
+    def _close_worker(self, thread):
+        worker = self._workers.pop(thread, None)
+        if worker is None:
+            return
+        name = worker.db.connectionName()
+        worker._close_connection()
+        # removeDatabase warns while any QSqlDatabase still refers to it
+        worker.db = None
+        QSqlDatabase.removeDatabase(name)
+
+    def shutdown(self):
+        """Cancel every pending operation and wait for the pool to stop"""
+        self.close_connections()
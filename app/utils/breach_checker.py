@@ -0,0 +1,318 @@
+"""Offline lookups in a breached-password corpus.
+
+The corpus is a sorted binary file of (possibly truncated) SHA-1 hashes,
+each followed by how often the password was seen. It is memory-mapped and
+searched by interpolation, which takes a handful of page reads because
+SHA-1 values are uniformly distributed, so even a multi-gigabyte corpus is
+never loaded into memory.
+
+Convert a "SHA1:COUNT" text dump, such as the Pwned Passwords download, with:
+
+    python -m app.utils.breach_checker convert pwned-passwords.txt corpus.bin
+"""
+import argparse
+import getpass
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "breach",
+    "pwned-passwords.bin",
+)
+
+CORPUS_MAGIC = b"PWHASH01"
+# magic, hash bytes per record, record count
+CORPUS_HEADER = struct.Struct("<8sIQ")
+COUNT = struct.Struct(">I")
+MAX_COUNT = 2**32 - 1
+DEFAULT_HASH_BYTES = 20
+# Records sorted in memory per run of the external sort
+SORT_RUN_RECORDS = 4_000_000
+# Interpolation steps before falling back to bisection
+INTERPOLATION_STEPS = 8
+
+
+class CorpusError(Exception):
+    """Raised when a corpus file is missing or malformed"""
+
+
+def password_hash(password):
+    return hashlib.sha1(password.encode("utf-8")).digest()
+
+
+class BreachCorpus:
+    """Read-only view of a converted breach corpus"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise CorpusError(f"{path} is empty")
+        if len(self._map) < CORPUS_HEADER.size:
+            self.close()
+            raise CorpusError(f"{path} is not a breach corpus")
+        magic, self.hash_bytes, self.count = CORPUS_HEADER.unpack_from(self._map, 0)
+        self.record_size = self.hash_bytes + COUNT.size
+        self._prefix = min(self.hash_bytes, 8)
+        if (
+            magic != CORPUS_MAGIC
+            or not 4 <= self.hash_bytes <= 20
+            or len(self._map) != CORPUS_HEADER.size + self.count * self.record_size
+        ):
+            self.close()
+            raise CorpusError(f"{path} is not a breach corpus")
+
+    def _key(self, index):
+        offset = CORPUS_HEADER.size + index * self.record_size
+        return self._map[offset:offset + self.hash_bytes]
+
+    def _position(self, index):
+        """Numeric value of the leading hash bytes of record index"""
+        offset = CORPUS_HEADER.size + index * self.record_size
+        return int.from_bytes(self._map[offset:offset + self._prefix], "big")
+
+    def lookup_hash(self, digest):
+        """Return how often the SHA-1 digest was seen, 0 when it is not listed"""
+        key = digest[:self.hash_bytes]
+        target = int.from_bytes(key[:self._prefix], "big")
+        low, high = 0, self.count - 1
+        steps = 0
+        while low <= high:
+            if steps < INTERPOLATION_STEPS:
+                low_value, high_value = self._position(low), self._position(high)
+                if target < low_value or target > high_value:
+                    return 0
+                if high_value == low_value:
+                    middle = low
+                else:
+                    middle = low + (target - low_value) * (high - low) // (
+                        high_value - low_value
+                    )
+                steps += 1
+            else:
+                middle = (low + high) // 2
+            found = self._key(middle)
+            if found == key:
+                offset = CORPUS_HEADER.size + middle * self.record_size + self.hash_bytes
+                return COUNT.unpack_from(self._map, offset)[0]
+            if found < key:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return 0
+
+    def lookup(self, password):
+        return self.lookup_hash(password_hash(password))
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Guards the three below; default_corpus is called from the GUI thread
+# and from worker threads at once
+_default_corpus_lock = threading.Lock()
+_default_corpus = None
+_default_corpus_path = None
+_default_corpus_error = None
+
+
+def corpus_path(settings=None):
+    if settings is None:
+        # Imported here so worker processes can use this module without Qt
+        from PyQt6.QtCore import QSettings
+
+        settings = QSettings("YourCompany", "YourApp")
+    return settings.value("breach/corpus") or DEFAULT_CORPUS
+
+
+def corpus_signature(path):
+    """Return a string that changes whenever the corpus file at path changes"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "none"
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def default_corpus():
+    """Return the configured corpus, or None when there is none.
+
+    Raises CorpusError if the configured file cannot be opened. A corpus
+    replaced after the setting changed is not closed, since another
+    thread may still be searching it; it is unmapped once nothing uses it.
+    """
+    global _default_corpus, _default_corpus_path, _default_corpus_error
+    path = corpus_path()
+    with _default_corpus_lock:
+        if path != _default_corpus_path:
+            _default_corpus = None
+            _default_corpus_error = None
+            _default_corpus_path = path
+            if os.path.isfile(path):
+                try:
+                    _default_corpus = BreachCorpus(path)
+                except (OSError, CorpusError) as e:
+                    _default_corpus_error = (
+                        f"Could not open breach corpus {path}: {str(e)}"
+                    )
+        corpus, error = _default_corpus, _default_corpus_error
+    if error is not None:
+        raise CorpusError(error)
+    return corpus
+
+
+def breach_count(password):
+    """Return how often password appears in the default corpus (0 if unknown)"""
+    try:
+        corpus = default_corpus()
+    except CorpusError:
+        return 0
+    if corpus is None or not password:
+        return 0
+    return corpus.lookup(password)
+
+
+def _parse_line(line, plaintext):
+    line = line.rstrip("\r\n")
+    if not line:
+        return None
+    if plaintext:
+        return password_hash(line), 1
+    digest, _, count = line.partition(":")
+    try:
+        return bytes.fromhex(digest.strip()), int(count or 1)
+    except ValueError:
+        return None
+
+
+def _write_run(records, directory):
+    records.sort()
+    run = tempfile.NamedTemporaryFile(dir=directory, suffix=".run", delete=False)
+    with run:
+        for key, count in records:
+            run.write(key + COUNT.pack(count))
+    return run.name
+
+
+def _read_run(path, hash_bytes):
+    record_size = hash_bytes + COUNT.size
+    with open(path, "rb") as run:
+        while True:
+            record = run.read(record_size)
+            if not record:
+                return
+            yield record[:hash_bytes], COUNT.unpack(record[hash_bytes:])[0]
+
+
+def convert(source, destination, hash_bytes=DEFAULT_HASH_BYTES, plaintext=False,
+            progress=None):
+    """Convert a text dump into a corpus file and return its record count.
+
+    Lines are "SHA1HEX[:COUNT]", or one password per line with plaintext.
+    The dump does not need to be sorted: sorted runs are spilled to
+    temporary files and merged, so memory use stays bounded.
+    """
+    if not 4 <= hash_bytes <= 20:
+        raise ValueError("hash_bytes must be between 4 and 20")
+    directory = os.path.dirname(os.path.abspath(destination))
+    runs = []
+    try:
+        records = []
+        with open(source, encoding="utf-8", errors="replace") as dump:
+            for line in dump:
+                parsed = _parse_line(line, plaintext)
+                if parsed is None or len(parsed[0]) != 20:
+                    continue
+                records.append((parsed[0][:hash_bytes], min(parsed[1], MAX_COUNT)))
+                if len(records) >= SORT_RUN_RECORDS:
+                    runs.append(_write_run(records, directory))
+                    records = []
+                    if progress:
+                        progress(len(runs) * SORT_RUN_RECORDS)
+        if records:
+            runs.append(_write_run(records, directory))
+        del records
+
+        written = 0
+        temporary = f"{destination}.tmp"
+        with open(temporary, "wb") as output:
+            output.write(CORPUS_HEADER.pack(CORPUS_MAGIC, hash_bytes, 0))
+            previous, total = None, 0
+            merged = heapq.merge(*(_read_run(run, hash_bytes) for run in runs))
+            for key, count in merged:
+                # Truncated or repeated hashes collapse into one record
+                if key == previous:
+                    total = min(total + count, MAX_COUNT)
+                    continue
+                if previous is not None:
+                    output.write(previous + COUNT.pack(total))
+                    written += 1
+                previous, total = key, count
+            if previous is not None:
+                output.write(previous + COUNT.pack(total))
+                written += 1
+            output.seek(0)
+            output.write(CORPUS_HEADER.pack(CORPUS_MAGIC, hash_bytes, written))
+        os.replace(temporary, destination)
+        return written
+    finally:
+        for run in runs:
+            os.remove(run)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser("convert", help="convert a text dump")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("destination")
+    convert_parser.add_argument(
+        "--hash-bytes", type=int, default=DEFAULT_HASH_BYTES,
+        help="keep only this many leading bytes of each SHA-1 (4-20)",
+    )
+    convert_parser.add_argument(
+        "--plaintext", action="store_true",
+        help="the dump holds one plaintext password per line",
+    )
+
+    check_parser = commands.add_parser("check", help="look up a password")
+    check_parser.add_argument("corpus")
+
+    args = parser.parse_args(argv)
+    if args.command == "convert":
+        written = convert(
+            args.source, args.destination, args.hash_bytes, args.plaintext,
+            lambda read: print(f"Sorted {read} hashes...", file=sys.stderr),
+        )
+        print(f"Wrote {written} hashes to {args.destination}")
+    else:
+        with BreachCorpus(args.corpus) as corpus:
+            count = corpus.lookup(getpass.getpass("Password: "))
+        print(f"Seen {count} times" if count else "Not found")
+
+
+if __name__ == "__main__":
+    main()
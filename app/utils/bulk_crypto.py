@@ -0,0 +1,165 @@
+"""Batch encryption helpers that run inside worker processes.
+
+Everything here must stay importable without Qt: worker processes are
+started with the "spawn" method and only import this module.
+"""
+import hashlib
+import hmac
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+from cryptography.fernet import InvalidToken
+
+from app.utils.vault_cipher import VaultCipher, is_legacy_token
+
+
+def fingerprint_key(key):
+    """Derive the key for password fingerprints from the vault key"""
+    return hmac.new(key, b"password-manager fingerprint key", hashlib.sha256).digest()
+
+
+def password_fingerprint(fp_key, password):
+    """Keyed fingerprint that is equal for equal passwords and reveals nothing else"""
+    return hmac.new(fp_key, password.encode(), hashlib.sha256).hexdigest()
+
+
+def encrypt_passwords(key, passwords):
+    """Return an (encrypted_password, fingerprint) pair for every password"""
+    cipher = VaultCipher(key)
+    fp_key = fingerprint_key(key)
+    return [
+        (cipher.encrypt(password), password_fingerprint(fp_key, password))
+        for password in passwords
+    ]
+
+
+def decrypt_tokens(key, tokens):
+    cipher = VaultCipher(key)
+    return [cipher.decrypt(token) for token in tokens]
+
+
+def fingerprint_tokens(key, tokens):
+    """Return the fingerprint of each token, or None if it does not decrypt"""
+    cipher = VaultCipher(key)
+    fp_key = fingerprint_key(key)
+    fingerprints = []
+    for token in tokens:
+        try:
+            password = cipher.decrypt(token)
+        except InvalidToken:
+            fingerprints.append(None)
+            continue
+        fingerprints.append(password_fingerprint(fp_key, password))
+    return fingerprints
+
+
+def breach_hashes(key, tokens):
+    """Return the SHA-1 digest of each decrypted token, or None if it does not decrypt"""
+    cipher = VaultCipher(key)
+    digests = []
+    for token in tokens:
+        try:
+            password = cipher.decrypt(token)
+        except InvalidToken:
+            digests.append(None)
+            continue
+        digests.append(hashlib.sha1(password.encode()).digest())
+    return digests
+
+
+def reencrypt_tokens(keys, tokens):
+    """Return an (encrypted_password, fingerprint) pair under the new key for every token"""
+    old_key, new_key = keys
+    old_cipher = VaultCipher(old_key)
+    return encrypt_passwords(new_key, [old_cipher.decrypt(token) for token in tokens])
+
+
+def reencrypt_history_tokens(keys, tokens):
+    """Like reencrypt_tokens, but yields (None, None) for tokens that do not decrypt"""
+    old_key, new_key = keys
+    old_cipher = VaultCipher(old_key)
+    new_cipher = VaultCipher(new_key)
+    fp_key = fingerprint_key(new_key)
+    results = []
+    for token in tokens:
+        try:
+            password = old_cipher.decrypt(token)
+        except InvalidToken:
+            results.append((None, None))
+            continue
+        results.append(
+            (new_cipher.encrypt(password), password_fingerprint(fp_key, password))
+        )
+    return results
+
+
+def upgrade_tokens(key, tokens):
+    """Return each legacy token in the binary format, or None if it does not decrypt"""
+    cipher = VaultCipher(key)
+    upgraded = []
+    for token in tokens:
+        if not is_legacy_token(token):
+            upgraded.append(None)
+            continue
+        try:
+            upgraded.append(cipher.encrypt(cipher.decrypt(token)))
+        except InvalidToken:
+            upgraded.append(None)
+    return upgraded
+
+
+def default_worker_count():
+    return os.cpu_count() or 1
+
+
+def create_process_pool(max_workers=None):
+    """Create a process pool that is safe to start from a Qt application"""
+    return ProcessPoolExecutor(
+        max_workers=max_workers or default_worker_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def chunked(iterable, size):
+    """Yield successive lists of at most size items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_batches(function, key, batches, select):
+    """Apply function(key, select(batch)) to each batch, yielding (batch, result).
+
+    Results come back in input order. A single batch is handled in-process;
+    otherwise batches are spread over a process pool with a bounded number
+    in flight, so memory stays proportional to the batch size.
+    """
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        return
+    second = next(batches, None)
+    if second is None:
+        yield first, function(key, select(first))
+        return
+
+    workers = default_worker_count()
+    pool = create_process_pool(workers)
+    pending = deque()
+    try:
+        for batch in chain([first, second], batches):
+            pending.append((batch, pool.submit(function, key, select(batch))))
+            if len(pending) >= workers * 2:
+                done, future = pending.popleft()
+                yield done, future.result()
+        while pending:
+            done, future = pending.popleft()
+            yield done, future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
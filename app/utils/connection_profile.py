@@ -0,0 +1,67 @@
+import threading
+
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+
+class ConnectionProfile:
+    """SQLite pragmas applied to every connection opened on the vault.
+
+    Each value can be overridden through QSettings under "database/<name>".
+    """
+
+    DEFAULTS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,  # negative values are KiB, so 16 MiB
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    }
+
+    def __init__(self, **overrides):
+        unknown = set(overrides) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown connection settings: {', '.join(sorted(unknown))}")
+        self.values = {**self.DEFAULTS, **overrides}
+
+    @classmethod
+    def from_settings(cls, settings):
+        overrides = {}
+        for name, default in cls.DEFAULTS.items():
+            value = settings.value(f"database/{name}")
+            if value is not None:
+                overrides[name] = type(default)(value)
+        return cls(**overrides)
+
+    def pragmas(self):
+        return [f"PRAGMA {name} = {value}" for name, value in self.values.items()]
+
+    def apply(self, db):
+        """Run every pragma on db and return the ones that failed"""
+        failed = []
+        query = QSqlQuery(db)
+        for pragma in self.pragmas():
+            if not query.exec(pragma):
+                failed.append(f"{pragma}: {query.lastError().text()}")
+            query.finish()
+        return failed
+
+
+def thread_connection(db_name, profile, prefix="worker"):
+    """Return a connection owned by the calling thread, opening it on first use.
+
+    Qt connections may only be used from the thread that created them, so
+    background jobs call this instead of sharing the GUI thread's connection.
+    """
+    name = f"{prefix}-{threading.get_ident()}"
+    if QSqlDatabase.contains(name):
+        db = QSqlDatabase.database(name)
+        if db.isOpen():
+            return db
+    else:
+        db = QSqlDatabase.addDatabase("QSQLITE", name)
+        db.setDatabaseName(db_name)
+    if not db.open():
+        raise RuntimeError(f"Could not open database: {db.lastError().text()}")
+    for error in profile.apply(db):
+        print(f"Could not apply connection setting {error}")
+    return db
@@ -1,50 +1,411 @@
-import csv
-import datetime
-import json
 import os
-import shutil
-import xml.etree.ElementTree as ET
 from PyQt6.QtCore import QSettings
-from PyQt6.QtWidgets import QMessageBox, QFileDialog
+from PyQt6.QtWidgets import QMessageBox
 import base64
-from cryptography.fernet import Fernet
+import json
 from PyQt6.QtSql import QSqlQuery, QSqlDatabase
+from cryptography.fernet import InvalidToken
+from app.utils import vault_backup
+from app.utils.breach_checker import CorpusError, corpus_path, default_corpus
+from app.utils.bulk_crypto import (
+    breach_hashes,
+    decrypt_tokens,
+    encrypt_passwords,
+    fingerprint_key,
+    fingerprint_tokens,
+    map_batches,
+    password_fingerprint,
+)
+from app.utils.connection_profile import ConnectionProfile, thread_connection
+from app.utils.errors import OperationCancelled
+from app.utils.export_writers import (
+    export_format,
+    open_export_file,
+    write_csv,
+    write_json,
+    write_xml,
+)
+from app.utils.import_readers import (
+    iter_csv_batches,
+    iter_json_batches,
+    iter_xml_batches,
+)
 from app.utils.observer import DatabaseSubject, DatabaseEvent
+from app.utils.password_strength_checker import clear_strength_cache
+from app.utils.plaintext_cache import PlaintextCache
+from app.utils.reencryption import (
+    ReencryptionEngine,
+    StaleRowsError,
+    key_check,
+    rewrite_lock,
+)
+from app.utils.schema import migrate
+from app.utils.security_audit import SecurityAudit
+from app.utils.similarity import SimilarityIndex
+from app.utils.snapshots import SnapshotStore
+from app.utils.token_migration import TokenMigration
+from app.utils.vault_backup import BackupError
+from app.utils.vault_cipher import (
+    VaultCipher,
+    from_column,
+    to_column,
+    unwrap_key,
+    wrap_key,
+)
 
 
 class DatabaseManager(DatabaseSubject):
-    def __init__(self):
+    PASSWORD_CACHE_SIZE = 256
+    PASSWORD_CACHE_TTL = 120  # seconds
+    IMPORT_BATCH_SIZE = 2000
+    EXPORT_CHUNK_SIZE = 2000
+    HISTORY_MAX_ENTRIES = 10  # per entry, overridable via "history/max_entries_per_login"
+    HISTORY_MAX_AGE_DAYS = 365  # 0 keeps history forever, see "history/max_age_days"
+    AUDIT_MAX_AGE_DAYS = 365  # passwords older than this are reported, "audit/max_age_days"
+    SIMILARITY_MAX_DISTANCE = 2  # edits between similar passwords, "duplicates/max_distance"
+    DATA_KEY_MAX_AGE_DAYS = 365  # 0 only rotates on request, see "keys/rotation_days"
+    ROTATION_ATTEMPTS = 3
+    SNAPSHOT_INTERVAL_MINUTES = 60  # 0 disables, see "snapshots/interval_minutes"
+
+    def __init__(self, owner=None):
+        """Open the vault, or with owner, a worker view of the same vault.
+
+        A worker view belongs to one background thread and has its own
+        connection, but shares owner's plaintext caches; see
+        app/utils/async_database.py.
+        """
         super().__init__()  # Initialize the DatabaseSubject first
+        self.settings = QSettings("YourCompany", "YourApp")
+        self._statements = {}
+        self.cipher = None
+        self.key = None  # the data key, which encrypts the entries
+        self.master_key = None  # derived from the master password, wraps the data key
+        self.fingerprint_key = None
+        self._fingerprints_ready = False
+        self._owner = owner
+
+        if owner is not None:
+            self.db_name = owner.db_name
+            self.profile = owner.profile
+            self.password_cache = owner.password_cache
+            self.similarity_index = owner.similarity_index
+            self.db = thread_connection(self.db_name, self.profile, "db-worker")
+            return
+
         self.db_name = "password.db"
+        self.profile = ConnectionProfile.from_settings(self.settings)
+        self.password_cache = PlaintextCache(
+            self.PASSWORD_CACHE_SIZE, self.PASSWORD_CACHE_TTL
+        )
+        # Filled on first use and kept until the vault is locked
+        self.similarity_index = SimilarityIndex()
         self.db = QSqlDatabase.addDatabase("QSQLITE")
         self.db.setDatabaseName(self.db_name)
-        if not self.db.open():
+        if not self._open_connection():
             QMessageBox.critical(None, "Database Error", "Could not open database")
-            return
 
-        self.settings = QSettings("YourCompany", "YourApp")
+    def create_table(self):
+        """Bring the schema up to date, see app/utils/schema.py"""
+        self._statements.clear()
+        migrate(self.db)
+
+    def _open_connection(self):
+        """Open the connection and apply the connection profile and schema"""
+        if not self.db.open():
+            return False
+        for error in self.profile.apply(self.db):
+            print(f"Could not apply connection setting {error}")
         self.create_table()
-        self.cipher = None
+        self.prune_password_history()
+        self.similarity_index.reset()
+        return True
 
-    def create_table(self):
-        query = QSqlQuery()
-        # Create logins table only
-        query.exec(
-            """
-            CREATE TABLE IF NOT EXISTS logins (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                website TEXT NOT NULL,
-                username TEXT NOT NULL,
-                encrypted_password TEXT NOT NULL
+    def _close_connection(self):
+        # Prepared statements must not outlive the connection they belong to
+        self._statements.clear()
+        if self.db.isOpen():
+            self.db.close()
+
+    def _run(self, sql, *values):
+        """Execute sql through a prepared statement that is reused across calls.
+
+        Returns (success, query). Read results before running the same sql again.
+        """
+        query = self._statements.get(sql)
+        if query is None:
+            query = QSqlQuery(self.db)
+            if not query.prepare(sql):
+                return False, query
+            self._statements[sql] = query
+        else:
+            query.finish()
+        for position, value in enumerate(values):
+            query.bindValue(position, value)
+        return query.exec(), query
+
+    def _fetch_one(self, sql, *values):
+        """Return the first row of sql as a tuple, or None.
+
+        The statement is finished at once: while any statement is active the
+        connection keeps its read snapshot and misses what workers commit.
+        """
+        success, query = self._run(sql, *values)
+        row = None
+        if success and query.next():
+            row = tuple(query.value(i) for i in range(query.record().count()))
+        query.finish()
+        return row
+
+    def unlock(self, master_key):
+        """Unwrap the data key with master_key and start using it.
+
+        A new vault gets a random data key. Vaults from before envelope
+        encryption used the master key itself as the data key; it is kept
+        and wrapped, so no entry changes, and data_key_rotation_due() reports it.
+        Raises InvalidToken if master_key does not open the vault.
+        """
+        data_key = self._unwrap_data_key(master_key)
+        self.master_key = master_key
+        if data_key != self.key:
+            self.set_encryption_key(data_key)
+
+    def can_unlock(self, master_key):
+        """Return True if master_key opens the vault"""
+        return self._opens(
+            master_key, self.get_meta("wrapped_data_key"), self.get_meta("key_check")
+        )
+
+    @staticmethod
+    def _opens(master_key, wrapped, stored_key_check):
+        if wrapped is None:
+            return stored_key_check in (None, key_check(master_key))
+        try:
+            unwrap_key(master_key, wrapped)
+        except InvalidToken:
+            return False
+        return True
+
+    def _unwrap_data_key(self, master_key):
+        wrapped = self.get_meta("wrapped_data_key")
+        if wrapped is not None:
+            return unwrap_key(master_key, wrapped)
+        with rewrite_lock:
+            return self._wrap_first_data_key(master_key)
+
+    def _wrap_first_data_key(self, master_key):
+        """Store the wrapped data key of a new or pre-envelope vault"""
+        wrapped = self.get_meta("wrapped_data_key")
+        if wrapped is not None:
+            return unwrap_key(master_key, wrapped)
+
+        if self.get_meta("key_check") is None and not self._fetch_one(
+            "SELECT 1 FROM logins LIMIT 1"
+        ):
+            data_key = os.urandom(32)
+            meta = {"data_key_created": self._now()}
+        elif self.is_active_key(master_key) or self.get_meta("key_check") is None:
+            data_key = master_key
+            meta = {}
+        else:
+            raise InvalidToken()
+        meta["wrapped_data_key"] = wrap_key(master_key, data_key)
+        meta["key_check"] = key_check(data_key)
+        self._set_meta_values(meta)
+        return data_key
+
+    def rewrap_data_key(self, old_master_key, new_master_key):
+        """Wrap the data key under new_master_key; no entry is re-encrypted.
+
+        Raises InvalidToken if old_master_key does not open the vault.
+        """
+        with rewrite_lock:
+            data_key = self._unwrap_data_key(old_master_key)
+            self._set_meta_values(
+                {"wrapped_data_key": wrap_key(new_master_key, data_key)}
             )
-            """
+
+    def refresh_data_key(self):
+        """Pick up a data key another connection rotated.
+
+        Returns True if the key changed.
+        """
+        master_key = (self._owner or self).master_key
+        if master_key is None:
+            return False
+        data_key = self._unwrap_data_key(master_key)
+        if data_key == self.key:
+            return False
+        if self._owner is None:
+            self.set_encryption_key(data_key)
+        else:
+            self.adopt_key(data_key)
+        return True
+
+    def _ensure_current_key(self):
+        """Refresh the data key if the vault was rotated since it was read.
+
+        Writers call this inside their transaction, before encrypting, so
+        nothing is stored under a data key the vault no longer uses.
+        """
+        if self.key is None or self.is_active_key(self.key):
+            return False
+        return self.refresh_data_key()
+
+    def data_key_rotation_due(self):
+        """Return True if the data key is older than "keys/rotation_days".
+
+        Data keys carried over from before envelope encryption are the old
+        master key and always due.
+        """
+        created = self.get_meta("data_key_created")
+        if created is None:
+            return True
+        max_age_days = int(
+            self.settings.value("keys/rotation_days", self.DATA_KEY_MAX_AGE_DAYS)
+        )
+        if not max_age_days:
+            return False
+        row = self._fetch_one(
+            "SELECT julianday('now') - julianday(?) > ?", created, max_age_days
         )
-        # Remove password history table creation
-    
+        return bool(row and row[0])
+
+    def rotate_data_key(self, progress_callback=None, is_cancelled=None):
+        """Re-encrypt every entry under a new random data key.
+
+        Unlike a master password change this rewrites the whole vault, so
+        it runs in the background. The new wrapped key is committed
+        together with the new ciphertexts. Returns the ReencryptionEngine
+        statistics.
+        """
+        with self.batch(), rewrite_lock:
+            master_key = (self._owner or self).master_key
+            if master_key is None or self.key is None:
+                raise RuntimeError("Encryption key not set")
+            self._ensure_current_key()
+            # The master password may have changed since this view was unlocked
+            if self._unwrap_data_key(master_key) != self.key:
+                raise RuntimeError("The master password changed, unlock again")
+
+            new_key = os.urandom(32)
+            retired = self._retired_data_keys(
+                self.key, self.get_meta("retired_data_keys")
+            )
+            retired[key_check(self.key)] = self.key
+            meta = {
+                "wrapped_data_key": wrap_key(master_key, new_key),
+                "data_key_created": self._now(),
+                "retired_data_keys": self._wrap_retired_keys(new_key, retired),
+            }
+            try:
+                # The vault stays writable, so entries edited meanwhile are
+                # restaged from the checkpoint
+                for attempt in range(self.ROTATION_ATTEMPTS):
+                    try:
+                        stats = ReencryptionEngine(self).run(
+                            self.key, new_key, progress_callback, is_cancelled, meta
+                        )
+                        break
+                    except StaleRowsError:
+                        if attempt == self.ROTATION_ATTEMPTS - 1:
+                            raise
+            except BaseException:
+                # Nobody else knows new_key, so the staged rows cannot be resumed
+                self.discard_reencryption()
+                raise
+        print(
+            f"Rotated the data key of {stats['rows']} entries in "
+            f"{stats['seconds']:.2f}s"
+        )
+        self.refresh_data_key()
+        return stats
+
+    @staticmethod
+    def _retired_data_keys(data_key, stored):
+        """Return {key_check: key} of the data keys used before data_key.
+
+        Rotation keeps them wrapped under the current data key in the
+        "retired_data_keys" meta value stored, so backups made before it
+        can be restored.
+        """
+        if not stored:
+            return {}
+        return {
+            check: unwrap_key(data_key, wrapped)
+            for check, wrapped in json.loads(stored).items()
+        }
+
+    @staticmethod
+    def _wrap_retired_keys(data_key, keys):
+        return json.dumps(
+            {check: wrap_key(data_key, key) for check, key in keys.items()}
+        )
+
+    def _set_meta_values(self, values):
+        """Write several vault_meta values in one transaction"""
+        if not self.db.transaction():
+            raise RuntimeError(self.db.lastError().text())
+        try:
+            for name, value in values.items():
+                if not self.set_meta(name, value):
+                    raise RuntimeError(f"Could not store {name}")
+            if not self.db.commit():
+                raise RuntimeError(self.db.lastError().text())
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _now(self):
+        row = self._fetch_one("SELECT datetime('now')")
+        return row[0]
+
     def set_encryption_key(self, key):
-        """Initialize cipher with the master key"""
-        key = base64.urlsafe_b64encode(key)
-        self.cipher = Fernet(key)
+        """Initialize cipher with the data key"""
+        self.key = key
+        self.cipher = VaultCipher(key)
+        self.fingerprint_key = fingerprint_key(key)
+        self._fingerprints_ready = False
+        self.password_cache.clear()
+        self.similarity_index.reset()
+        if self.get_meta("key_check") is None:
+            self.set_meta("key_check", key_check(key))
+
+    def adopt_key(self, key):
+        """Use key in a worker view without touching the caches it shares"""
+        if key == self.key:
+            return
+        self.key = key
+        self.cipher = VaultCipher(key) if key else None
+        self.fingerprint_key = fingerprint_key(key) if key else None
+        self._fingerprints_ready = False
+
+    def get_meta(self, name):
+        row = self._fetch_one("SELECT value FROM vault_meta WHERE name = ?", name)
+        return row[0] if row else None
+
+    def set_meta(self, name, value):
+        success, _ = self._run(
+            "INSERT OR REPLACE INTO vault_meta (name, value) VALUES (?, ?)", name, value
+        )
+        return success
+
+    def is_active_key(self, key):
+        """Return True if the stored passwords are encrypted with key"""
+        return self.get_meta("key_check") == key_check(key)
+
+    def lock(self):
+        """Forget the cipher and wipe every cached plaintext password"""
+        self.cipher = None
+        self.key = None
+        self.master_key = None
+        self.fingerprint_key = None
+        self.password_cache.clear()
+        self.similarity_index.reset()
+        clear_strength_cache()
+
+    def fingerprint(self, password):
+        """Keyed fingerprint of password, comparable without decrypting anything"""
+        return password_fingerprint(self.fingerprint_key, password)
 
     def initialize_encryption(self):
         master_key = self.settings.value("password_key")
@@ -52,286 +413,547 @@ class DatabaseManager(DatabaseSubject):
         # Ensure key is properly formatted
         try:
             # Check if key is already in the correct format
-            if len(master_key) == 32:
-                master_key = base64.urlsafe_b64encode(master_key)
-            elif len(master_key) != 44 or not isinstance(master_key, bytes):
+            if len(master_key) == 44 and isinstance(master_key, bytes):
+                master_key = base64.urlsafe_b64decode(master_key)
+            elif len(master_key) != 32:
                 # If it's not 32 bytes (raw) or 44 bytes (base64 encoded), it's invalid
                 raise ValueError("Invalid key length or type")
 
-            self.cipher = Fernet(master_key)
+            self.unlock(master_key)
         except Exception as e:
             raise ValueError(f"Invalid master key format: {e}")
 
     def add_new_login(self, website, username, password):
-        encrypted_password = self.cipher.encrypt(password.encode()).decode()
-        query = QSqlQuery()
-        query.prepare(
-            "INSERT INTO logins (website, username, encrypted_password) VALUES (?, ?, ?)"
-        )
-        query.addBindValue(website)
-        query.addBindValue(username)
-        query.addBindValue(encrypted_password)
-        success = query.exec()
+        if not self.db.transaction():
+            return False
+        try:
+            self._ensure_current_key()
+            success, query = self._run(
+                """
+                INSERT INTO logins (website, username, encrypted_password, fingerprint)
+                VALUES (?, ?, ?, ?)
+                """,
+                website,
+                username,
+                to_column(self.cipher.encrypt(password)),
+                self.fingerprint(password),
+            )
+            if not success:
+                raise RuntimeError(query.lastError().text())
+            if not self.db.commit():
+                raise RuntimeError(self.db.lastError().text())
+        except Exception as e:
+            print(f"Error adding entry: {str(e)}")
+            self.db.rollback()
+            success = False
         if success:
+            row_id = query.lastInsertId()
+            self.similarity_index.add(row_id, password)
             self.notify(DatabaseEvent.ENTRY_ADDED, {
+                "id": row_id,
                 "website": website,
                 "username": username
             })
         return success
-        # Remove add_password_to_history call
 
     def delete_login(self, row_id):
-        query = QSqlQuery()
-        query.prepare("DELETE FROM logins WHERE id = ?")
-        query.addBindValue(row_id)
-        success = query.exec()
+        if not self.db.transaction():
+            return False
+        success, _ = self._run("DELETE FROM password_history WHERE login_id = ?", row_id)
         if success:
-            self.notify(DatabaseEvent.ENTRY_DELETED, {"id": row_id})
-        return success
+            success, _ = self._run("DELETE FROM logins WHERE id = ?", row_id)
+        if not success or not self.db.commit():
+            self.db.rollback()
+            return False
+        self.password_cache.invalidate(row_id)
+        self.similarity_index.remove(row_id)
+        self.notify(DatabaseEvent.ENTRY_DELETED, {"id": row_id})
+        return True
 
     def edit_login_password(self, row_id, password):
-        """Update password for an existing entry"""
+        """Update password for an existing entry, moving the old one to its history"""
         try:
-            encrypted_password = self.cipher.encrypt(password.encode()).decode()
-            query = QSqlQuery()
-            query.prepare("UPDATE logins SET encrypted_password = ? WHERE id = ?")
-            query.addBindValue(encrypted_password)
-            query.addBindValue(row_id)
-            return query.exec()
+            self.password_cache.invalidate(row_id)
+            if not self.db.transaction():
+                return False
+            try:
+                self._ensure_current_key()
+                encrypted_password = self.cipher.encrypt(password)
+                fingerprint = self.fingerprint(password)
+                # Saving the same password again does not add history
+                statements = [
+                    (
+                        """
+                        INSERT INTO password_history
+                            (login_id, encrypted_password, fingerprint, date_used)
+                        SELECT id, encrypted_password, fingerprint, CURRENT_TIMESTAMP
+                        FROM logins
+                        WHERE id = ? AND fingerprint IS NOT ?
+                        """,
+                        (row_id, fingerprint),
+                    ),
+                    (
+                        "UPDATE logins SET encrypted_password = ?, fingerprint = ?, "
+                        "updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                        (to_column(encrypted_password), fingerprint, row_id),
+                    ),
+                ]
+                for sql, values in statements:
+                    success, query = self._run(sql, *values)
+                    if not success:
+                        raise RuntimeError(query.lastError().text())
+                self._prune_history_for(row_id)
+                if not self.db.commit():
+                    raise RuntimeError(self.db.lastError().text())
+            except Exception:
+                self.db.rollback()
+                raise
+            self.similarity_index.add(row_id, password)
+            entry = self.get_entry(row_id)
+            if entry is not None:
+                self.notify(DatabaseEvent.ENTRY_MODIFIED, entry)
+            return True
         except Exception as e:
             print(f"Error updating password: {str(e)}")
             return False
 
+    def get_entry(self, row_id):
+        """Return the metadata of a single entry, as load_table does for all"""
+        row = self._fetch_one(
+            "SELECT id, website, username FROM logins WHERE id = ?", row_id
+        )
+        if row:
+            return {"id": row[0], "website": row[1], "username": row[2]}
+        return None
+
     def load_table(self):
+        """Load entry metadata only; passwords are decrypted on demand"""
         if not self.cipher:
             raise RuntimeError("Encryption key not set")
-            
-        entries = []
-        query = QSqlQuery("SELECT id, website, username, encrypted_password FROM logins")
-        
-        while query.next():
-            try:
-                entries.append({
-                    "id": query.value(0),
-                    "website": query.value(1),
-                    "username": query.value(2),
-                    "password": self.cipher.decrypt(query.value(3).encode()).decode()
-                })
-            except Exception as e:
-                print(f"Error decrypting entry {query.value(0)}: {str(e)}")
-                continue
-                
-        return entries
+
+        query = QSqlQuery("SELECT id, website, username FROM logins", self.db)
+        return self._process_query_results(query)
+
+    def iter_encrypted_chunks(self, chunk_size):
+        """Yield lists of (id, website, username, token) rows in id order"""
+        last_id = -1
+        while True:
+            query = QSqlQuery(self.db)
+            query.prepare(
+                """
+                SELECT id, website, username, encrypted_password
+                FROM logins
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+                """
+            )
+            query.addBindValue(last_id)
+            query.addBindValue(chunk_size)
+            if not query.exec():
+                raise RuntimeError(f"Failed to read entries: {query.lastError().text()}")
+
+            rows = []
+            while query.next():
+                rows.append(
+                    (
+                        query.value(0),
+                        query.value(1),
+                        query.value(2),
+                        from_column(query.value(3)),
+                    )
+                )
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def iter_decrypted_entries(self, progress_callback=None, is_cancelled=None):
+        """Yield every entry with its password, decrypting chunks in worker processes"""
+        if not self.cipher:
+            raise RuntimeError("Encryption key not set")
+
+        decrypted = map_batches(
+            decrypt_tokens,
+            self.key,
+            self.iter_encrypted_chunks(self.EXPORT_CHUNK_SIZE),
+            lambda rows: [row[3] for row in rows],
+        )
+        done = 0
+        try:
+            for rows, passwords in decrypted:
+                if is_cancelled and is_cancelled():
+                    raise OperationCancelled()
+                for row, password in zip(rows, passwords):
+                    yield {
+                        "id": row[0],
+                        "website": row[1],
+                        "username": row[2],
+                        "password": password,
+                    }
+                done += len(rows)
+                if progress_callback:
+                    progress_callback(done)
+        finally:
+            decrypted.close()
 
     def get_password(self, row_id):
-        query = QSqlQuery()
-        query.prepare("SELECT encrypted_password FROM logins WHERE id = ?")
-        query.addBindValue(row_id)
-        if query.exec() and query.next():
-            encrypted_password = query.value(0)
-            decrypted_password = self.cipher.decrypt(
-                encrypted_password.encode()
-            ).decode()
+        cached = self.password_cache.get(row_id)
+        if cached is not None:
+            return cached
+
+        row = self._fetch_one(
+            "SELECT encrypted_password FROM logins WHERE id = ?", row_id
+        )
+        if row:
+            try:
+                decrypted_password = self.cipher.decrypt(from_column(row[0]))
+            except InvalidToken:
+                # The data key may have been rotated by another connection
+                if not self.refresh_data_key():
+                    raise
+                decrypted_password = self.cipher.decrypt(from_column(row[0]))
+            self.password_cache.put(row_id, decrypted_password)
             return decrypted_password
         return None
 
-    def export_data(self):
-        entries = self.load_table()
+    def export_to_file(self, file_path, progress_callback=None, is_cancelled=None):
+        """Stream the decrypted vault to file_path.
 
-        file_path, file_type = QFileDialog.getSaveFileName(
-            None,
-            "Export File",
-            "",
-            "CSV Files (*.csv);;JSON Files (*.json);;XML Files (*.xml)",
-        )
-
-        if not file_path:
-            QMessageBox.warning(
-                None, "Export Cancelled", "Export was cancelled by the user."
-            )
-            return False
+        The format follows the extension; a trailing .gz or .xz compresses
+        the output. A partially written file is removed on failure.
+        """
+        exporters = {
+            "csv": self.export_to_csv,
+            "json": self.export_to_json,
+            "xml": self.export_to_xml,
+        }
+        file_format = export_format(file_path)
+        if file_format not in exporters:
+            raise ValueError("Unsupported file format")
 
+        entries = self.iter_decrypted_entries(progress_callback, is_cancelled)
         try:
-            if file_path.endswith(".csv"):
-                self.export_to_csv(file_path, entries)
-            elif file_path.endswith(".json"):
-                self.export_to_json(file_path, entries)
-            elif file_path.endswith(".xml"):
-                self.export_to_xml(file_path, entries)
-            else:
-                raise ValueError("Unsupported file format")
-
-            QMessageBox.information(
-                None, "Export Success", f"Data exported successfully to {file_path}"
-            )
-            return True
-
-        except PermissionError:
-            QMessageBox.critical(
-                None,
-                "Export Failed",
-                "Permission denied. The file may be open in another program.",
-            )
-            return False
-        except Exception as e:
-            QMessageBox.critical(
-                None,
-                "Export Failed",
-                f"An error occurred while saving the file: {str(e)}",
-            )
-            return False
+            return exporters[file_format](file_path, entries)
+        except BaseException:
+            entries.close()
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
 
     def export_to_csv(self, file_path, entries):
-        with open(file_path, "w", newline="", encoding="utf-8") as csvfile:
-            csv_writer = csv.writer(csvfile)
-            csv_writer.writerow(["Website", "Username", "Password"])
-            csv_writer.writerows(
-                [entry["website"], entry["username"], entry["password"]]
-                for entry in entries
-            )
+        with open_export_file(file_path) as csvfile:
+            return write_csv(csvfile, entries)
 
     def export_to_json(self, file_path, entries):
-        data = [
-            {
-                "Website": entry["website"],
-                "Username": entry["username"],
-                "Password": entry["password"],
-            }
-            for entry in entries
-        ]
-        with open(file_path, "w", encoding="utf-8") as jsonfile:
-            json.dump(data, jsonfile, indent=2)
+        with open_export_file(file_path) as jsonfile:
+            return write_json(jsonfile, entries)
 
     def export_to_xml(self, file_path, entries):
-        root = ET.Element("passwords")
-        for entry in entries:
-            entry_elem = ET.SubElement(root, "entry")
-            ET.SubElement(entry_elem, "Website").text = entry["website"]
-            ET.SubElement(entry_elem, "Username").text = entry["username"]
-            ET.SubElement(entry_elem, "Password").text = entry["password"]
+        with open_export_file(file_path) as xmlfile:
+            return write_xml(xmlfile, entries)
 
-        tree = ET.ElementTree(root)
-        tree.write(file_path, encoding="utf-8", xml_declaration=True)
+    def import_file(self, file_path, progress_callback=None, is_cancelled=None):
+        """Import a CSV, JSON or XML file, choosing the reader by extension"""
+        importers = {
+            ".csv": self.import_from_csv,
+            ".json": self.import_from_json,
+            ".xml": self.import_from_xml,
+        }
+        importer = importers.get(os.path.splitext(file_path)[1].lower())
+        if importer is None:
+            raise ValueError("Unsupported file format")
+        return importer(file_path, progress_callback, is_cancelled)
 
-    def import_data(self):
-        file_path, file_type = QFileDialog.getOpenFileName(
-            None,
-            "Import File",
-            "",
-            "CSV Files (*.csv);;JSON Files (*.json);;XML Files (*.xml)",
+    def import_from_csv(self, file_path, progress_callback=None, is_cancelled=None):
+        return self.import_records(
+            iter_csv_batches(file_path, self.IMPORT_BATCH_SIZE),
+            progress_callback,
+            is_cancelled,
         )
 
-        if not file_path:
-            return False
+    def import_from_json(self, file_path, progress_callback=None, is_cancelled=None):
+        return self.import_records(
+            iter_json_batches(file_path, self.IMPORT_BATCH_SIZE),
+            progress_callback,
+            is_cancelled,
+        )
 
-        try:
-            if file_path.endswith(".csv"):
-                self.import_from_csv(file_path)
-            elif file_path.endswith(".json"):
-                self.import_from_json(file_path)
-            elif file_path.endswith(".xml"):
-                self.import_from_xml(file_path)
-            else:
-                raise ValueError("Unsupported file format")
-
-            QMessageBox.information(
-                None, "Import Success", "Data imported successfully"
-            )
-            return True
+    def import_from_xml(self, file_path, progress_callback=None, is_cancelled=None):
+        return self.import_records(
+            iter_xml_batches(file_path, self.IMPORT_BATCH_SIZE),
+            progress_callback,
+            is_cancelled,
+        )
 
-        except Exception as e:
-            QMessageBox.critical(None, "Import Failed", f"An error occurred: {str(e)}")
-            return False
+    def import_records(self, batches, progress_callback=None, is_cancelled=None):
+        """Import batches of (website, username, password) records.
+
+        Passwords are encrypted in worker processes while earlier batches are
+        inserted, and every row is written inside a single transaction. A
+        single DATABASE_IMPORTED event is emitted once the transaction commits.
+        Raises OperationCancelled, after rolling back, when is_cancelled()
+        returns True. Returns the number of imported entries.
+        """
+        with self.batch():
+            if not self.cipher:
+                raise RuntimeError("Encryption key not set")
 
-    def import_from_csv(self, file_path):
-        with open(file_path, "r", newline="", encoding="utf-8") as csvfile:
-            csv_reader = csv.DictReader(csvfile)
-            for row in csv_reader:
-                self.add_new_login(row["Website"], row["Username"], row["Password"])
-
-    def import_from_json(self, file_path):
-        with open(file_path, "r", encoding="utf-8") as jsonfile:
-            data = json.load(jsonfile)
-            for entry in data:
-                self.add_new_login(
-                    entry["Website"], entry["Username"], entry["Password"]
+            if not self.db.transaction():
+                raise RuntimeError(
+                    f"Could not start transaction: {self.db.lastError().text()}"
                 )
 
-    def import_from_xml(self, file_path):
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        for entry in root.findall("entry"):
-            website = entry.find("Website").text
-            username = entry.find("Username").text
-            password = entry.find("Password").text
-            self.add_new_login(website, username, password)
-
-    def backup_database(self):
-        if not self.db.isOpen():
-            QMessageBox.critical(None, "Backup Error", "Database is not open")
-            return False
+            try:
+                self._ensure_current_key()
+            except Exception:
+                self.db.rollback()
+                raise
 
-        backup_dir = QFileDialog.getExistingDirectory(None, "Select Backup Directory")
-        if not backup_dir:
-            return False
+            imported = 0
+            encrypted_batches = self._encrypt_batches(batches)
+            try:
+                for records, encrypted in encrypted_batches:
+                    if is_cancelled and is_cancelled():
+                        raise OperationCancelled()
+                    self._insert_batch(records, encrypted)
+                    imported += len(records)
+                    if progress_callback:
+                        progress_callback(imported)
+
+                if not self.db.commit():
+                    raise RuntimeError(
+                        f"Could not commit import: {self.db.lastError().text()}"
+                    )
+            except BaseException:
+                encrypted_batches.close()
+                self.db.rollback()
+                raise
+
+            # Cheaper to rebuild on the next search than to decrypt the import again
+            self.similarity_index.reset()
+            self.notify(DatabaseEvent.DATABASE_IMPORTED, {"count": imported})
+            return imported
+
+    def _encrypt_batches(self, batches):
+        """Yield (records, [(encrypted_password, fingerprint), ...]) in input order"""
+        return map_batches(
+            encrypt_passwords,
+            self.key,
+            batches,
+            lambda records: [record[2] for record in records],
+        )
+
+    def _insert_batch(self, records, encrypted):
+        query = QSqlQuery(self.db)
+        query.prepare(
+            """
+            INSERT INTO logins (website, username, encrypted_password, fingerprint)
+            VALUES (?, ?, ?, ?)
+            """
+        )
+        query.addBindValue([record[0] for record in records])
+        query.addBindValue([record[1] for record in records])
+        query.addBindValue([to_column(token) for token, _ in encrypted])
+        query.addBindValue([fingerprint for _, fingerprint in encrypted])
+        if not query.execBatch():
+            raise RuntimeError(f"Failed to insert entries: {query.lastError().text()}")
 
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"password_backup_{timestamp}.db"
-        backup_path = os.path.join(backup_dir, backup_filename)
+    def backup_to_file(self, file_path, is_cancelled=None):
+        """Write a verified copy of the open vault to file_path.
 
+        VACUUM INTO copies a single read snapshot through this connection,
+        so the vault stays usable and writes made meanwhile cannot tear the
+        copy; in WAL mode it never blocks a writer. The copy is checked
+        under a temporary name and only then renamed to file_path.
+        """
+        if os.path.exists(file_path):
+            raise FileExistsError(f"{file_path} already exists")
+        part_path = f"{file_path}.part"
+        vault_backup.remove_quietly(part_path)
+        # VACUUM refuses to run while a statement on this connection is active
+        for statement in self._statements.values():
+            statement.finish()
+        success, query = self._run("VACUUM INTO ?", part_path)
+        if not success:
+            raise RuntimeError(f"Backup failed: {query.lastError().text()}")
         try:
-            self.db.close()
-            shutil.copy2(self.db_name, backup_path)
-            self.db.open()
-            QMessageBox.information(
-                None, "Backup Success", f"Database backed up to {backup_path}"
-            )
-            return True
-        except Exception as e:
-            QMessageBox.critical(None, "Backup Error", f"An error occurred: {str(e)}")
-            self.db.open()
-            return False
+            if is_cancelled and is_cancelled():
+                raise OperationCancelled()
+            vault_backup.verify(part_path)
+            vault_backup.publish(part_path, file_path)
+        except BaseException:
+            vault_backup.remove_quietly(part_path)
+            raise
+        return file_path
 
-    def restore_database(self):
-        if self.db.isOpen():
-            self.db.close()
+    def prepare_restore(self, backup_path, progress_callback=None, is_cancelled=None):
+        """Copy backup_path next to the vault and verify it for replace_database.
 
-        backup_file, _ = QFileDialog.getOpenFileName(
-            None, "Select Backup File", "", "Database Files (*.db)"
+        The open vault is not touched, so this runs on a worker.
+        progress_callback(done, total) reports copied pages. Raises
+        BackupError if the backup is damaged, is not a vault, or needs
+        another master password. Returns the path of the verified copy.
+        """
+        restored_path = f"{self.db_name}.restore"
+        vault_backup.copy_database(
+            backup_path, restored_path, progress_callback, is_cancelled
         )
-        if not backup_file:
-            self.db.open()
-            return False
+        self._verify_restore(restored_path)
+        return restored_path
 
+    def prepare_snapshot_restore(
+        self, snapshot_id, progress_callback=None, is_cancelled=None
+    ):
+        """Rebuild a snapshot next to the vault and verify it for replace_database.
+
+        Like prepare_restore, but progress_callback(done, total) reports
+        restored entries. Returns the path of the rebuilt vault.
+        """
+        restored_path = f"{self.db_name}.restore"
+        self.snapshot_store().restore(
+            snapshot_id, restored_path, progress_callback, is_cancelled
+        )
+        self._verify_restore(restored_path)
+        return restored_path
+
+    def _verify_restore(self, restored_path):
+        """Check a vault about to be restored, removing it if it does not pass.
+
+        A backup made before the master password changed or the data key
+        was rotated is re-keyed: its data key is looked up among the keys
+        this vault knows and wrapped under the current master key.
+        """
         try:
-            shutil.copy2(backup_file, self.db_name)
-            self.db.open()
-            QMessageBox.information(
-                None, "Restore Success", "Database restored successfully"
+            vault_backup.verify(restored_path)
+            meta = vault_backup.read_meta(restored_path)
+            master_key = (self._owner or self).master_key
+            if master_key is None or self._opens(
+                master_key, meta.get("wrapped_data_key"), meta.get("key_check")
+            ):
+                return
+            known = self._known_data_keys()
+            data_key = known.get(meta.get("key_check"))
+            if data_key is None:
+                raise BackupError(
+                    "The backup is encrypted with a vault key this vault has "
+                    "never used, so it belongs to another vault and cannot be "
+                    "opened with the current master password"
+                )
+            # Keep every key either side knows, so later backups of both
+            # can still be restored
+            retired = self._retired_data_keys(
+                data_key, meta.get("retired_data_keys")
             )
-            return True
-        except Exception as e:
-            QMessageBox.critical(None, "Restore Error", f"An error occurred: {str(e)}")
-            self.db.open()
-            return False
+            retired.update(known)
+            retired.pop(meta.get("key_check"))
+            vault_backup.write_meta(
+                restored_path,
+                {
+                    "wrapped_data_key": wrap_key(master_key, data_key),
+                    "key_check": key_check(data_key),
+                    "retired_data_keys": self._wrap_retired_keys(data_key, retired),
+                },
+            )
+        except BaseException:
+            vault_backup.remove_quietly(restored_path)
+            raise
+
+    def _known_data_keys(self):
+        """Return {key_check: key} of the current and every retired data key"""
+        data_key = (self._owner or self).key
+        if data_key is None:
+            return {}
+        known = self._retired_data_keys(data_key, self.get_meta("retired_data_keys"))
+        known[key_check(data_key)] = data_key
+        return known
+
+    def snapshot_store(self):
+        """Return the SnapshotStore in "snapshots/directory", by default next to the vault"""
+        directory = self.settings.value("snapshots/directory") or os.path.join(
+            os.path.dirname(os.path.abspath(self.db_name)), "snapshots"
+        )
+        return SnapshotStore(directory)
+
+    def snapshot_interval_minutes(self):
+        return int(
+            self.settings.value(
+                "snapshots/interval_minutes", self.SNAPSHOT_INTERVAL_MINUTES
+            )
+        )
+
+    def create_snapshot(self, progress_callback=None, is_cancelled=None):
+        """Snapshot the vault and thin out old snapshots.
+
+        Only chunks that changed since the latest snapshot are written.
+        Returns the new manifest, or None if nothing changed.
+        """
+        store = self.snapshot_store()
+        manifest = store.create(self.db, progress_callback, is_cancelled)
+        retention = {
+            rule: int(self.settings.value(f"snapshots/keep_{rule}", count))
+            for rule, count in SnapshotStore.RETENTION.items()
+        }
+        store.prune(retention)
+        return manifest
+
+    def list_snapshots(self):
+        """Return the manifests of the stored snapshots, newest first"""
+        return self.snapshot_store().snapshots()
+
+    def replace_database(self, restored_path):
+        """Swap the vault for a copy made by prepare_restore and reopen it.
+
+        Every other connection to the vault must be closed first, see
+        AsyncDatabaseManager.close_connections. The file is renamed into
+        place, so a crash leaves either the old or the restored vault.
+        """
+        with self.batch():
+            master_key = self.master_key
+            # Fold the WAL into the file; closing the last connection removes it
+            query = QSqlQuery(self.db)
+            query.exec("PRAGMA wal_checkpoint(TRUNCATE)")
+            query.finish()
+            self._close_connection()
+            try:
+                if os.path.exists(f"{self.db_name}-wal"):
+                    raise BackupError("The vault is still open in another program")
+                vault_backup.publish(restored_path, self.db_name)
+                # Cached passwords and indexes belong to the old vault
+                self.lock()
+            except BaseException:
+                vault_backup.remove_quietly(restored_path)
+                raise
+            finally:
+                # Reopened and unlocked on every path, so a refused restore
+                # leaves the old vault usable
+                if not self._open_connection():
+                    raise RuntimeError(
+                        f"Could not reopen the vault: {self.db.lastError().text()}"
+                    )
+                if master_key is not None:
+                    self.unlock(master_key)
+            self.notify(DatabaseEvent.DATABASE_RESTORED, {})
 
     def sort_by_website(self):
         query = QSqlQuery(
             """
-            SELECT id, website, username, encrypted_password 
-            FROM logins 
-            ORDER BY website
-            """
+            SELECT id, website, username
+            FROM logins
+            ORDER BY website COLLATE NOCASE
+            """,
+            self.db,
         )
         return self._process_query_results(query)
 
     def sort_by_username(self):
         query = QSqlQuery(
             """
-            SELECT id, website, username, encrypted_password 
-            FROM logins 
-            ORDER BY username
-            """
+            SELECT id, website, username
+            FROM logins
+            ORDER BY username COLLATE NOCASE
+            """,
+            self.db,
         )
         return self._process_query_results(query)
 
@@ -343,128 +965,363 @@ class DatabaseManager(DatabaseSubject):
                     "id": query.value(0),
                     "website": query.value(1),
                     "username": query.value(2),
-                    "password": self.cipher.decrypt(query.value(3).encode()).decode(),
                 }
             )
         return entries
 
-    def is_password_previously_used(self, login_id, password):
-        encrypted_password = self.cipher.encrypt(password.encode()).decode()
-        query = QSqlQuery()
-        query.prepare(
-            "SELECT COUNT(*) FROM password_history WHERE login_id = ? AND encrypted_password = ?"
+    def history_limits(self):
+        """Return (max entries per login, max age in days) from the settings"""
+        max_entries = int(
+            self.settings.value("history/max_entries_per_login", self.HISTORY_MAX_ENTRIES)
+        )
+        max_age_days = int(
+            self.settings.value("history/max_age_days", self.HISTORY_MAX_AGE_DAYS)
         )
-        query.addBindValue(login_id)
-        query.addBindValue(encrypted_password)
+        return max_entries, max_age_days
 
-        if query.exec() and query.next():
-            return query.value(0) > 0
-        return False
+    def is_password_previously_used(self, login_id, password):
+        """Return True if password is the current or an earlier password of login_id"""
+        self.ensure_fingerprints()
+        fingerprint = self.fingerprint(password)
+        row = self._fetch_one(
+            """
+            SELECT EXISTS (
+                SELECT 1 FROM password_history WHERE login_id = ? AND fingerprint = ?
+            ) OR EXISTS (
+                SELECT 1 FROM logins WHERE id = ? AND fingerprint = ?
+            )
+            """,
+            login_id,
+            fingerprint,
+            login_id,
+            fingerprint,
+        )
+        return bool(row and row[0])
 
     def get_password_history(self, login_id):
-        query = QSqlQuery()
-        query.prepare("""
-            SELECT encrypted_password, date_used 
-            FROM password_history 
-            WHERE login_id = ? 
-            ORDER BY date_used DESC
-        """)
-        query.addBindValue(login_id)
-        
-        history = []
-        if query.exec():
+        """Return the earlier passwords of login_id, newest first"""
+        success, query = self._run(
+            """
+            SELECT encrypted_password, date_used
+            FROM password_history
+            WHERE login_id = ?
+            ORDER BY date_used DESC, id DESC
+            """,
+            login_id,
+        )
+        rows = []
+        if success:
             while query.next():
-                encrypted_password = query.value(0)
-                date = query.value(1)
-                password = self.cipher.decrypt(encrypted_password.encode()).decode()
-                history.append({"password": password, "date": date})
+                rows.append((from_column(query.value(0)), query.value(1)))
+
+        history = []
+        for encrypted_password, date in rows:
+            try:
+                password = self.cipher.decrypt(encrypted_password)
+            except Exception:
+                # Left over from a key that is no longer in use
+                continue
+            history.append({"password": password, "date": date})
         return history
 
+    def prune_password_history(self):
+        """Apply the retention limits to the history of every entry"""
+        max_entries, max_age_days = self.history_limits()
+        statements = [
+            (
+                "DELETE FROM password_history "
+                "WHERE login_id IS NULL OR login_id NOT IN (SELECT id FROM logins)",
+                (),
+            ),
+            (
+                """
+                DELETE FROM password_history WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY login_id ORDER BY date_used DESC, id DESC
+                        ) AS position
+                        FROM password_history
+                    )
+                    WHERE position > ?
+                )
+                """,
+                (max_entries,),
+            ),
+        ]
+        if max_age_days > 0:
+            statements.append(
+                (
+                    "DELETE FROM password_history WHERE date_used < datetime('now', ?)",
+                    (f"-{max_age_days} days",),
+                )
+            )
+        for sql, values in statements:
+            success, query = self._run(sql, *values)
+            if not success:
+                print(f"Could not prune password history: {query.lastError().text()}")
+                return False
+        return True
+
+    def _prune_history_for(self, login_id):
+        max_entries, max_age_days = self.history_limits()
+        success, query = self._run(
+            """
+            DELETE FROM password_history
+            WHERE login_id = ? AND id NOT IN (
+                SELECT id FROM password_history
+                WHERE login_id = ?
+                ORDER BY date_used DESC, id DESC
+                LIMIT ?
+            )
+            """,
+            login_id,
+            login_id,
+            max_entries,
+        )
+        if success and max_age_days > 0:
+            success, query = self._run(
+                "DELETE FROM password_history "
+                "WHERE login_id = ? AND date_used < datetime('now', ?)",
+                login_id,
+                f"-{max_age_days} days",
+            )
+        if not success:
+            raise RuntimeError(query.lastError().text())
+
+    def ensure_fingerprints(self):
+        """Compute fingerprints for passwords stored before fingerprints existed"""
+        if self._fingerprints_ready:
+            return
+        for table in ("logins", "password_history"):
+            if self._fetch_one(
+                f"SELECT 1 FROM {table} WHERE fingerprint IS NULL LIMIT 1"
+            ):
+                self._backfill_fingerprints(table)
+        self._fingerprints_ready = True
+
+    def _backfill_fingerprints(self, table):
+        chunks = self._iter_unfingerprinted_chunks(table)
+        if not self.db.transaction():
+            raise RuntimeError(self.db.lastError().text())
+        try:
+            for rows, fingerprints in map_batches(
+                fingerprint_tokens, self.key, chunks, lambda rows: [r[1] for r in rows]
+            ):
+                query = QSqlQuery(self.db)
+                query.prepare(f"UPDATE {table} SET fingerprint = ? WHERE id = ?")
+                query.addBindValue(fingerprints)
+                query.addBindValue([row[0] for row in rows])
+                if not query.execBatch():
+                    raise RuntimeError(query.lastError().text())
+            if not self.db.commit():
+                raise RuntimeError(self.db.lastError().text())
+        except BaseException:
+            self.db.rollback()
+            raise
+
+    def _iter_unfingerprinted_chunks(self, table):
+        last_id = -1
+        while True:
+            query = QSqlQuery(self.db)
+            query.prepare(
+                f"""
+                SELECT id, encrypted_password FROM {table}
+                WHERE fingerprint IS NULL AND id > ?
+                ORDER BY id
+                LIMIT ?
+                """
+            )
+            query.addBindValue(last_id)
+            query.addBindValue(self.EXPORT_CHUNK_SIZE)
+            if not query.exec():
+                raise RuntimeError(query.lastError().text())
+            rows = []
+            while query.next():
+                rows.append((query.value(0), from_column(query.value(1))))
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def count_password_uses(self, password, exclude_id=None):
+        """Count the entries that store password, through the fingerprint index"""
+        self.ensure_fingerprints()
+        row = self._fetch_one(
+            "SELECT COUNT(*) FROM logins WHERE fingerprint = ? AND id IS NOT ?",
+            self.fingerprint(password),
+            exclude_id,
+        )
+        return row[0] if row else 0
+
     def find_duplicate_passwords(self):
-        """Find passwords that are used multiple times"""
-        # First get all entries
-        query = QSqlQuery("SELECT id, website, encrypted_password FROM logins")
-        
-        # Dictionary to store decrypted passwords and their occurrences
-        password_map = {}
-        
+        """Find passwords that are used multiple times.
+
+        Groups are found by fingerprint with one indexed GROUP BY; only one
+        representative entry per group is decrypted for display.
+        """
+        self.ensure_fingerprints()
+        query = QSqlQuery(
+            """
+            SELECT MIN(id), COUNT(*), GROUP_CONCAT(website, char(31))
+            FROM logins
+            WHERE fingerprint IS NOT NULL
+            GROUP BY fingerprint
+            HAVING COUNT(*) > 1
+            """,
+            self.db,
+        )
+
+        duplicates = []
         while query.next():
+            duplicates.append(
+                {
+                    "id": query.value(0),
+                    "count": query.value(1),
+                    "websites": query.value(2).split("\x1f"),
+                }
+            )
+
+        for duplicate in duplicates:
             try:
-                entry_id = query.value(0)
-                website = query.value(1)
-                encrypted_pwd = query.value(2)
-                
-                # Decrypt the password
-                decrypted_pwd = self.cipher.decrypt(encrypted_pwd.encode()).decode()
-                
-                # Add to password map
-                if decrypted_pwd in password_map:
-                    password_map[decrypted_pwd]["count"] += 1
-                    password_map[decrypted_pwd]["websites"].append(website)
-                else:
-                    password_map[decrypted_pwd] = {
-                        "count": 1,
-                        "websites": [website]
-                    }
-            
+                duplicate["password"] = self.get_password(duplicate["id"])
             except Exception as e:
-                print(f"Error processing entry {entry_id}: {str(e)}")
-                continue
-        
-        # Filter only passwords used multiple times
-        duplicates = [
-            {
-                "password": pwd,
-                "count": data["count"],
-                "websites": data["websites"]
-            }
-            for pwd, data in password_map.items()
-            if data["count"] > 1
-        ]
-        
+                print(f"Error decrypting entry {duplicate['id']}: {str(e)}")
+                duplicate["password"] = "(could not be decrypted)"
+
         return duplicates
 
-    def close(self):
-        if self.db.isOpen():
-            self.db.close()
+    def find_reused_passwords(self, progress_callback=None, is_cancelled=None):
+        """Return (find_duplicate_passwords(), find_similar_passwords())"""
+        return (
+            self.find_duplicate_passwords(),
+            self.find_similar_passwords(
+                progress_callback=progress_callback, is_cancelled=is_cancelled
+            ),
+        )
+
+    def similarity_max_distance(self):
+        return int(
+            self.settings.value(
+                "duplicates/max_distance", self.SIMILARITY_MAX_DISTANCE
+            )
+        )
+
+    def find_similar_passwords(self, max_distance=None, progress_callback=None,
+                               is_cancelled=None):
+        """Return clusters of distinct passwords a few edits apart, largest first.
 
-    def reencrypt_database(self, old_key, new_key):
-        """Re-encrypt all passwords with new key"""
+        Each cluster is a list of {"password", "count", "websites"} dicts.
+        The first call of a session decrypts the vault into a segment index
+        (see app/utils/similarity.py); later calls reuse it.
+        """
+        if not self.cipher:
+            raise RuntimeError("Encryption key not set")
+        if max_distance is None:
+            max_distance = self.similarity_max_distance()
+
+        websites = {}
+        query = QSqlQuery("SELECT id, website FROM logins", self.db)
+        while query.next():
+            websites[query.value(0)] = query.value(1)
+
+        index = self.similarity_index
+        clusters = []
+        with index.lock:
+            if not index.ready:
+                entries = self.iter_decrypted_entries(progress_callback, is_cancelled)
+                index.populate((entry["id"], entry["password"]) for entry in entries)
+            for passwords in index.clusters(max_distance):
+                cluster = []
+                for password in sorted(passwords):
+                    ids = index.ids(password)
+                    cluster.append(
+                        {
+                            "password": password,
+                            "count": len(ids),
+                            "websites": [websites.get(i, "") for i in ids],
+                        }
+                    )
+                clusters.append(cluster)
+        clusters.sort(key=lambda cluster: -sum(item["count"] for item in cluster))
+        return clusters
+
+    def find_breached_passwords(self, progress_callback=None, is_cancelled=None):
+        """Return the entries whose password is in the breach corpus, most seen first.
+
+        Passwords are decrypted and hashed in worker processes; only their
+        SHA-1 digests reach this process for the corpus lookups.
+        """
+        if not self.cipher:
+            raise RuntimeError("Encryption key not set")
+        corpus = default_corpus()
+        if corpus is None:
+            raise CorpusError("No breach corpus is configured")
+
+        breached = []
+        chunks = map_batches(
+            breach_hashes,
+            self.key,
+            self.iter_encrypted_chunks(self.EXPORT_CHUNK_SIZE),
+            lambda rows: [row[3] for row in rows],
+        )
+        done = 0
         try:
-            # Create ciphers for both keys
-            old_cipher = Fernet(base64.urlsafe_b64encode(old_key))
-            new_cipher = Fernet(base64.urlsafe_b64encode(new_key))
-            
-            # Get all passwords
-            query = QSqlQuery("SELECT id, encrypted_password FROM logins")
-            success = True
-            
-            while query.next():
-                try:
-                    login_id = query.value(0)
-                    encrypted_pwd = query.value(1)
-                    
-                    # Decrypt with old key
-                    decrypted = old_cipher.decrypt(encrypted_pwd.encode())
-                    # Re-encrypt with new key
-                    new_encrypted = new_cipher.encrypt(decrypted)
-                    
-                    # Update database
-                    update = QSqlQuery()
-                    update.prepare("UPDATE logins SET encrypted_password = ? WHERE id = ?")
-                    update.addBindValue(new_encrypted.decode())
-                    update.addBindValue(login_id)
-                    
-                    if not update.exec():
-                        print(f"Failed to update password for ID {login_id}")
-                        success = False
-                        
-                except Exception as e:
-                    print(f"Error processing entry {login_id}: {str(e)}")
-                    success = False
-                    
-            return success
-            
-        except Exception as e:
-            print(f"Database re-encryption failed: {str(e)}")
-            return False
+            for rows, digests in chunks:
+                if is_cancelled and is_cancelled():
+                    raise OperationCancelled()
+                for row, digest in zip(rows, digests):
+                    count = corpus.lookup_hash(digest) if digest else 0
+                    if count:
+                        breached.append(
+                            {
+                                "id": row[0],
+                                "website": row[1],
+                                "username": row[2],
+                                "count": count,
+                            }
+                        )
+                done += len(rows)
+                if progress_callback:
+                    progress_callback(done)
+        finally:
+            chunks.close()
+
+        breached.sort(key=lambda entry: entry["count"], reverse=True)
+        return breached
+
+    def audit_vault(self, progress_callback=None, is_cancelled=None):
+        """Score every entry and return (report, statistics), see SecurityAudit"""
+        if not self.cipher:
+            raise RuntimeError("Encryption key not set")
+        path = corpus_path(self.settings)
+        max_age_days = int(
+            self.settings.value("audit/max_age_days", self.AUDIT_MAX_AGE_DAYS)
+        )
+        audit = SecurityAudit(
+            self, path if os.path.isfile(path) else None, max_age_days
+        )
+        report, stats = audit.run(progress_callback, is_cancelled)
+        print(
+            f"Audited {stats['scored']} entries, {stats['cached']} from cache, "
+            f"in {stats['seconds']:.2f}s"
+        )
+        return report
+
+    def migrate_legacy_tokens(self, progress_callback=None, is_cancelled=None):
+        """Rewrite Fernet tokens in the binary format, see TokenMigration"""
+        if not self.cipher:
+            raise RuntimeError("Encryption key not set")
+        stats = TokenMigration(self).run(progress_callback, is_cancelled)
+        if stats["rows"] or stats["skipped"]:
+            print(
+                f"Converted {stats['rows']} stored passwords to the binary format "
+                f"in {stats['seconds']:.2f}s, {stats['skipped']} could not be read"
+            )
+        return stats
+
+    def close(self):
+        self.lock()
+        self._close_connection()
+
+    def discard_reencryption(self):
+        ReencryptionEngine(self).rollback()
@@ -0,0 +1,2 @@
+class OperationCancelled(Exception):
+    """Raised when the user cancels a long running database operation"""
@@ -0,0 +1,74 @@
+"""Streaming writers for vault exports.
+
+Writers consume an iterable of entry dicts and write each one as soon as it
+arrives, so an export never holds more than one entry in memory.
+"""
+import csv
+import gzip
+import json
+import lzma
+import textwrap
+import xml.etree.ElementTree as ET
+
+COMPRESSED_SUFFIXES = {".gz": gzip.open, ".xz": lzma.open}
+
+
+def export_format(file_path):
+    """Return "csv", "json" or "xml" for a path, ignoring a compression suffix"""
+    name = file_path.lower()
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+            break
+    return name.rsplit(".", 1)[-1] if "." in name else ""
+
+
+def open_export_file(file_path):
+    """Open a text file for writing, compressing it when the name ends in .gz or .xz"""
+    for suffix, opener in COMPRESSED_SUFFIXES.items():
+        if file_path.lower().endswith(suffix):
+            return opener(file_path, "wt", encoding="utf-8", newline="")
+    return open(file_path, "w", newline="", encoding="utf-8")
+
+
+def write_csv(csvfile, entries):
+    csv_writer = csv.writer(csvfile)
+    csv_writer.writerow(["Website", "Username", "Password"])
+    count = 0
+    for entry in entries:
+        csv_writer.writerow([entry["website"], entry["username"], entry["password"]])
+        count += 1
+    return count
+
+
+def write_json(jsonfile, entries):
+    """Write a JSON array laid out like json.dump(..., indent=2)"""
+    count = 0
+    for entry in entries:
+        item = json.dumps(
+            {
+                "Website": entry["website"],
+                "Username": entry["username"],
+                "Password": entry["password"],
+            },
+            indent=2,
+        )
+        jsonfile.write("[\n" if count == 0 else ",\n")
+        jsonfile.write(textwrap.indent(item, "  "))
+        count += 1
+    jsonfile.write("\n]" if count else "[]")
+    return count
+
+
+def write_xml(xmlfile, entries):
+    xmlfile.write("<?xml version='1.0' encoding='utf-8'?>\n<passwords>")
+    count = 0
+    for entry in entries:
+        entry_elem = ET.Element("entry")
+        ET.SubElement(entry_elem, "Website").text = entry["website"]
+        ET.SubElement(entry_elem, "Username").text = entry["username"]
+        ET.SubElement(entry_elem, "Password").text = entry["password"]
+        xmlfile.write(ET.tostring(entry_elem, encoding="unicode"))
+        count += 1
+    xmlfile.write("</passwords>")
+    return count
@@ -0,0 +1,131 @@
+"""Streaming readers for import files.
+
+Each reader yields lists of (website, username, password) tuples and only
+keeps the current batch in memory, whatever the size of the file.
+"""
+import csv
+import json
+import re
+import xml.etree.ElementTree as ET
+
+from app.utils.bulk_crypto import chunked
+
+JSON_READ_SIZE = 64 * 1024
+# Where a number or literal item must have ended
+JSON_SCALAR_END = re.compile(r"[\s,\]]")
+
+
+def iter_csv_batches(file_path, batch_size):
+    with open(file_path, "r", newline="", encoding="utf-8") as csvfile:
+        records = (
+            (row["Website"], row["Username"], row["Password"])
+            for row in csv.DictReader(csvfile)
+        )
+        yield from chunked(records, batch_size)
+
+
+def iter_json_batches(file_path, batch_size, read_size=JSON_READ_SIZE):
+    with open(file_path, "r", encoding="utf-8") as jsonfile:
+        records = (
+            (entry["Website"], entry["Username"], entry["Password"])
+            for entry in _iter_json_array(jsonfile, read_size)
+        )
+        yield from chunked(records, batch_size)
+
+
+def iter_xml_batches(file_path, batch_size):
+    yield from chunked(_iter_xml_entries(file_path), batch_size)
+
+
+def _iter_json_array(jsonfile, read_size):
+    """Decode the items of a top-level JSON array one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        data = jsonfile.read(read_size)
+        if not data:
+            eof = True
+        buffer = buffer[pos:] + data
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if pos >= len(buffer) or buffer[pos] != "[":
+        raise ValueError("JSON import file must contain an array of entries")
+    pos += 1
+
+    expect_item = True
+    after_comma = False
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Unexpected end of JSON import file")
+        if buffer[pos] == "]":
+            if after_comma:
+                raise ValueError("Trailing ',' in JSON import file")
+            return
+        if not expect_item:
+            if buffer[pos] != ",":
+                raise ValueError(f"Expected ',' in JSON import file near {buffer[pos:pos + 20]!r}")
+            pos += 1
+            expect_item = True
+            after_comma = True
+            continue
+
+        while True:
+            # A number or literal running to the end of the buffer may go on
+            # in the next read ("1." then "5"), even where it already decodes
+            if (
+                not eof
+                and buffer[pos] not in '{["'
+                and JSON_SCALAR_END.search(buffer, pos) is None
+            ):
+                fill()
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            break
+
+        pos = end
+        expect_item = False
+        after_comma = False
+        yield item
+
+
+def _iter_xml_entries(file_path):
+    """Yield records from <entry> elements, clearing each one once read"""
+    root = None
+    for event, elem in ET.iterparse(file_path, events=("start", "end")):
+        if root is None:
+            root = elem
+            continue
+        if event != "end" or elem.tag != "entry":
+            continue
+
+        record = (
+            elem.findtext("Website"),
+            elem.findtext("Username"),
+            elem.findtext("Password"),
+        )
+        elem.clear()
+        root.clear()
+        if None in record:
+            raise ValueError("XML entry is missing a Website, Username or Password")
+        yield record
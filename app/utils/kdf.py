@@ -0,0 +1,161 @@
+"""Master password key derivation with parameters calibrated to the host.
+
+A fixed iteration count is too slow on old laptops and far too cheap on
+fast machines. calibrate() instead times the chosen algorithm and picks
+the cost that takes about the target unlock time ("kdf/target_ms"), never
+less than the MIN_* floors. The parameters are stored as JSON next to the
+salt so each vault is derived with the cost it was set up with; vaults
+below the floors, or on another algorithm than "kdf/algorithm", report
+needs_upgrade() and are moved to fresh parameters on the next login.
+
+scrypt is preferred because it is memory hard; PBKDF2-HMAC-SHA256 is used
+where Python's OpenSSL has no scrypt.
+"""
+import hashlib
+import json
+import time
+
+PBKDF2 = "pbkdf2-sha256"
+SCRYPT = "scrypt"
+KEY_LENGTH = 32
+
+# How every vault created before calibration was derived
+LEGACY_PARAMS = {"algorithm": PBKDF2, "iterations": 100000}
+
+TARGET_MS = 500  # unlock time to calibrate for, overridable via "kdf/target_ms"
+MIN_PBKDF2_ITERATIONS = 600000
+PBKDF2_PROBE_ITERATIONS = 50000
+MIN_SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_MAX_MEMORY = 256 * 1024 * 1024
+
+_calibrated = {}
+
+
+class KdfError(Exception):
+    """Raised for unknown algorithms or unusable parameters"""
+
+
+def available_algorithms():
+    if hasattr(hashlib, "scrypt"):
+        return [SCRYPT, PBKDF2]
+    return [PBKDF2]
+
+
+def _settings(settings):
+    if settings is None:
+        # Imported here so the module can be used without Qt
+        from PyQt6.QtCore import QSettings
+
+        settings = QSettings("YourCompany", "YourApp")
+    return settings
+
+
+def preferred_algorithm(settings=None):
+    configured = _settings(settings).value("kdf/algorithm")
+    if configured in available_algorithms():
+        return configured
+    return available_algorithms()[0]
+
+
+def target_seconds(settings=None):
+    return int(_settings(settings).value("kdf/target_ms", TARGET_MS)) / 1000
+
+
+def _scrypt_memory(n, r, p):
+    # Bytes OpenSSL allocates for these parameters, plus some slack
+    return 128 * r * (n + p + 2) + 1024 * 1024
+
+
+def derive_key(password, salt, params):
+    """Return the KEY_LENGTH byte key for password under params"""
+    if isinstance(password, str):
+        password = password.encode("utf-8")
+    algorithm = params.get("algorithm")
+    if algorithm == PBKDF2:
+        return hashlib.pbkdf2_hmac(
+            "sha256", password, salt, int(params["iterations"]), KEY_LENGTH
+        )
+    if algorithm == SCRYPT:
+        if not hasattr(hashlib, "scrypt"):
+            raise KdfError("This Python has no scrypt support")
+        n, r, p = int(params["n"]), int(params["r"]), int(params["p"])
+        return hashlib.scrypt(
+            password, salt=salt, n=n, r=r, p=p,
+            maxmem=_scrypt_memory(n, r, p), dklen=KEY_LENGTH,
+        )
+    raise KdfError(f"Unknown key derivation algorithm: {algorithm}")
+
+
+def _time(params):
+    started = time.perf_counter()
+    derive_key(b"calibration", b"\0" * 32, params)
+    return time.perf_counter() - started
+
+
+def calibrate(algorithm=None, seconds=None, settings=None):
+    """Return parameters for algorithm that take about seconds on this host.
+
+    The result is cached for the process, since timing takes about as long
+    as a derivation.
+    """
+    algorithm = algorithm or preferred_algorithm(settings)
+    seconds = seconds or target_seconds(settings)
+    if algorithm not in available_algorithms():
+        raise KdfError(f"Unknown key derivation algorithm: {algorithm}")
+    if (algorithm, seconds) not in _calibrated:
+        if algorithm == PBKDF2:
+            params = _calibrate_pbkdf2(seconds)
+        else:
+            params = _calibrate_scrypt(seconds)
+        _calibrated[(algorithm, seconds)] = params
+    return dict(_calibrated[(algorithm, seconds)])
+
+
+def _calibrate_pbkdf2(seconds):
+    # Iterations cost the same each, so one probe scales linearly
+    probe = {"algorithm": PBKDF2, "iterations": PBKDF2_PROBE_ITERATIONS}
+    elapsed = _time(probe)
+    iterations = int(PBKDF2_PROBE_ITERATIONS * seconds / max(elapsed, 1e-6))
+    iterations = max(MIN_PBKDF2_ITERATIONS, iterations // 1000 * 1000)
+    return {"algorithm": PBKDF2, "iterations": iterations}
+
+
+def _calibrate_scrypt(seconds):
+    # Time and memory double with n; stop before the next step overshoots
+    params = {"algorithm": SCRYPT, "n": MIN_SCRYPT_N, "r": SCRYPT_R, "p": SCRYPT_P}
+    elapsed = _time(params)
+    while (
+        elapsed * 2 <= seconds
+        and _scrypt_memory(params["n"] * 2, SCRYPT_R, SCRYPT_P) <= SCRYPT_MAX_MEMORY
+    ):
+        params["n"] *= 2
+        elapsed = _time(params)
+    return params
+
+
+def needs_upgrade(params, settings=None):
+    """Return True if params are below the floors or not the preferred algorithm"""
+    if params.get("algorithm") != preferred_algorithm(settings):
+        return True
+    if params["algorithm"] == PBKDF2:
+        return int(params["iterations"]) < MIN_PBKDF2_ITERATIONS
+    return int(params["n"]) < MIN_SCRYPT_N
+
+
+def dumps(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def loads(text):
+    """Parse stored parameters; vaults without any use LEGACY_PARAMS"""
+    if not text:
+        return dict(LEGACY_PARAMS)
+    try:
+        params = json.loads(text)
+    except ValueError as e:
+        raise KdfError(f"Invalid key derivation parameters: {e}")
+    if params.get("algorithm") not in (PBKDF2, SCRYPT):
+        raise KdfError(f"Unknown key derivation algorithm: {params.get('algorithm')}")
+    return params
@@ -1,9 +1,23 @@
 from PyQt6.QtCore import QSettings
-import hashlib
+from cryptography.fernet import InvalidToken
+import hmac
 import os
 
+from app.utils import kdf
+from app.utils.errors import OperationCancelled
+
 
 class MasterLogin:
+    """Master password verification and the master key derived from it.
+
+    The master key only wraps the vault's data key (see
+    DatabaseManager.unlock), so changing the password never touches the
+    stored entries. Deriving a key takes about "kdf/target_ms" on purpose,
+    so dialogs run check_password, unlock and change_password on a worker
+    thread. Those only touch the database through the db_manager they are
+    given; the GUI thread then activates the key with use_key().
+    """
+
     def __init__(self):
         self.settings = QSettings("PyQtPasswordManager", "MasterPassword")
         self.db_manager = None
@@ -11,72 +25,158 @@ class MasterLogin:
     def set_db_manager(self, db_manager):
         self.db_manager = db_manager
         if self.password_exists():
-            key = self.settings.value("password_key")
-            self.db_manager.set_encryption_key(key)
+            self.recover_password_reset()
+            self.use_key(self.settings.value("password_key"))
+
+    def recover_password_reset(self):
+        """Finish or undo a master password reset that was interrupted.
+
+        If the data key was already wrapped under the new key, the pending
+        credentials are promoted. Otherwise they are dropped, along with a
+        re-encryption left behind by versions that re-encrypted the vault.
+        """
+        pending_key = self.settings.value("pending_password_key")
+        if pending_key is None or not self.db_manager:
+            return
+
+        if self.db_manager.can_unlock(pending_key):
+            self._promote_pending_password()
+            return
+        print("Interrupted password reset did not complete, rolling back")
+        self.db_manager.discard_reencryption()
+        self._clear_pending_password()
+
+    def _promote_pending_password(self):
+        self.settings.setValue(
+            "password_salt", self.settings.value("pending_password_salt")
+        )
+        self.settings.setValue(
+            "password_kdf", self.settings.value("pending_password_kdf")
+        )
+        self.settings.setValue(
+            "password_key", self.settings.value("pending_password_key")
+        )
+        self._clear_pending_password()
+
+    def _clear_pending_password(self):
+        self.settings.remove("pending_password_salt")
+        self.settings.remove("pending_password_kdf")
+        self.settings.remove("pending_password_key")
+
+    def kdf_params(self):
+        """Return how the stored key was derived"""
+        return kdf.loads(self.settings.value("password_kdf"))
+
+    def derive_new_key(self, password):
+        """Return (key, salt, params) for password with freshly calibrated parameters"""
+        salt = os.urandom(32)
+        params = kdf.calibrate()
+        return kdf.derive_key(password, salt, params), salt, params
 
     def create_password(self, password):
         """Create new master password"""
-        salt = os.urandom(32)
-        key = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, 100000)
+        self.store_password(*self.derive_new_key(password))
+        return True
 
+    def store_password(self, key, salt, params):
+        """Save credentials made by derive_new_key and start using key"""
         self.settings.setValue("password_salt", salt)
+        self.settings.setValue("password_kdf", kdf.dumps(params))
         self.settings.setValue("password_key", key)
+        self.use_key(key)
 
-        if self.db_manager:
-            self.db_manager.set_encryption_key(key)
-        return True
+    def use_key(self, key):
+        """Unlock the GUI thread's db_manager with master key"""
+        if not self.db_manager or key == self.db_manager.master_key:
+            return
+        try:
+            self.db_manager.unlock(key)
+        except InvalidToken:
+            print("The master key does not open this vault")
 
     def check_password(self, password):
         stored_salt = self.settings.value("password_salt")
         stored_key = self.settings.value("password_key")
         if stored_salt is None or stored_key is None:
             return False
-        key = hashlib.pbkdf2_hmac(
-            "sha256", password.encode("utf-8"), stored_salt, 100000
-        )
-        return key == stored_key
-
-    def password_reset(self, old_password, new_password):
-        """Reset master password and re-encrypt database"""
-        if not self.check_password(old_password):
-            print("Old password verification failed")
+        try:
+            key = kdf.derive_key(password, stored_salt, self.kdf_params())
+        except kdf.KdfError as e:
+            print(f"Could not verify password: {str(e)}")
             return False
+        return hmac.compare_digest(key, stored_key)
+
+    def unlock(self, password, is_cancelled=None, db_manager=None):
+        """Verify password and return the master key, or None if it is wrong.
+
+        A key derived with outdated parameters is moved to freshly
+        calibrated ones, re-wrapping the data key through db_manager. If
+        that fails the old key is kept and upgraded on a later login.
+        Cancelling before the password is verified raises OperationCancelled.
+        """
+        if not self.check_password(password):
+            return None
+        if is_cancelled and is_cancelled():
+            raise OperationCancelled()
+
+        key = self.settings.value("password_key")
+        if kdf.needs_upgrade(self.kdf_params()):
+            print("Upgrading master key derivation parameters")
+            new_key = self.change_password(password, db_manager)
+            if new_key is not None:
+                key = new_key
+        return key
+
+    def change_password(self, new_password, db_manager=None):
+        """Wrap the vault's data key under a new key for new_password.
+
+        The caller must have verified the current password. Only the
+        wrapped data key is rewritten, so this takes as long as deriving
+        the key whatever the vault size. Returns the new key, which the
+        caller passes to use_key(), or None on failure.
+        """
+        db_manager = db_manager or self.db_manager
+        if not db_manager:
+            print("Database manager not initialized")
+            return None
 
         try:
-            # Get old key
             old_key = self.settings.value("password_key")
             if not old_key:
                 print("Could not retrieve old encryption key")
-                return False
-
-            # Generate new key
-            new_salt = os.urandom(32)
-            new_key = hashlib.pbkdf2_hmac(
-                "sha256", 
-                new_password.encode(), 
-                new_salt, 
-                100000
-            )
-
-            # Verify database manager exists
-            if not self.db_manager:
-                print("Database manager not initialized")
-                return False
-
-            # Re-encrypt database
-            if not self.db_manager.reencrypt_database(old_key, new_key):
-                print("Database re-encryption failed")
-                return False
+                return None
+
+            new_key, new_salt, params = self.derive_new_key(new_password)
+
+            # Remember the new credentials first so a change interrupted
+            # after re-wrapping can be recovered on the next start
+            self.settings.setValue("pending_password_salt", new_salt)
+            self.settings.setValue("pending_password_kdf", kdf.dumps(params))
+            self.settings.setValue("pending_password_key", new_key)
+            self.settings.sync()
+
+            db_manager.rewrap_data_key(old_key, new_key)
 
             # Save new credentials
-            self.settings.setValue("password_salt", new_salt)
-            self.settings.setValue("password_key", new_key)
-            self.db_manager.set_encryption_key(new_key)
-            return True
+            self._promote_pending_password()
+            return new_key
 
         except Exception as e:
-            print(f"Password reset failed: {str(e)}")
+            print(f"Password change failed: {str(e)}")
+            self._clear_pending_password()
+            return None
+
+    def password_reset(self, old_password, new_password):
+        """Reset master password, re-wrapping the vault's data key"""
+        if not self.check_password(old_password):
+            print("Old password verification failed")
+            return False
+
+        new_key = self.change_password(new_password)
+        if new_key is None:
             return False
+        self.use_key(new_key)
+        return True
 
     def password_exists(self):
         return self.settings.contains("password_key")
@@ -1,38 +1,158 @@
+import time
+import weakref
+from contextlib import contextmanager
 from enum import Enum, auto
-from typing import Any, Dict
-from threading import Lock
+from typing import Any, Dict, Iterable, Optional
+from threading import RLock, local
 
 class DatabaseEvent(Enum):
     """Events that can occur in the password database"""
-    ENTRY_ADDED = auto()
-    ENTRY_MODIFIED = auto()
-    ENTRY_DELETED = auto()
-    DATABASE_IMPORTED = auto()
-    DATABASE_ENCRYPTED = auto()
+    ENTRY_ADDED = auto()  # data: id, website, username of the new entry
+    ENTRY_MODIFIED = auto()  # data: id, website, username after the change
+    ENTRY_DELETED = auto()  # data: id
+    DATABASE_IMPORTED = auto()  # data: count; reload everything
+    DATABASE_RESTORED = auto()  # data: empty; the vault file was replaced, reload everything
+    # data: events, the (event, data) pairs of a batch() this observer subscribed to
+    BATCH = auto()
 
 class DatabaseObserver:
     """Interface for database observers"""
     def update(self, event: DatabaseEvent, data: Dict[str, Any]) -> None:
         pass
 
+class DispatchStats:
+    """Counters for how much work notify() does"""
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.events = 0  # events passed to notify()
+        self.deliveries = 0  # observer.update() calls
+        self.coalesced = 0  # events merged into BATCH notifications
+        self.seconds = 0.0  # time spent inside observer.update()
+        self.by_event = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "events": self.events,
+            "deliveries": self.deliveries,
+            "coalesced": self.coalesced,
+            "fan_out": self.deliveries / self.events if self.events else 0.0,
+            "seconds_per_delivery": (
+                self.seconds / self.deliveries if self.deliveries else 0.0
+            ),
+            "by_event": {event.name: count for event, count in self.by_event.items()},
+        }
+
+class _BatchState(local):
+    """The batch() nesting and held back events of one thread"""
+    def __init__(self):
+        self.depth = 0
+        self.events = []
+
 class DatabaseSubject:
-    """Base class for database subjects"""
+    """Base class for database subjects.
+
+    Observers are held through weak references, so a window that is
+    garbage collected without calling detach() stops receiving events.
+    """
     def __init__(self):
+        # [weak reference, set of events or None for every event]
         self._observers = []
-        self._lock = Lock()
+        self._lock = RLock()
+        # Per thread, so a batch on a worker never holds back GUI events
+        self._batch_state = _BatchState()
+        self.dispatch_stats = DispatchStats()
 
-    def attach(self, observer: DatabaseObserver) -> None:
+    def attach(self, observer: DatabaseObserver,
+               events: Optional[Iterable[DatabaseEvent]] = None) -> None:
+        """Subscribe observer to events, or to every event when events is None"""
+        topics = frozenset(events) if events is not None else None
         with self._lock:
-            if observer not in self._observers:
-                self._observers.append(observer)
+            for subscription in self._observers:
+                if subscription[0]() is observer:
+                    subscription[1] = topics
+                    return
+            self._observers.append([weakref.ref(observer), topics])
 
     def detach(self, observer: DatabaseObserver) -> None:
         with self._lock:
-            if observer in self._observers:
-                self._observers.remove(observer)
+            self._observers = [
+                subscription for subscription in self._observers
+                if subscription[0]() not in (observer, None)
+            ]
+
+    @contextmanager
+    def batch(self):
+        """Hold back events this thread raises until its outermost batch ends.
+
+        Each observer then gets the events it subscribed to in one BATCH
+        notification, or the event itself if only one matched.
+        """
+        state = self._batch_state
+        state.depth += 1
+        try:
+            yield
+        finally:
+            state.depth -= 1
+            if not state.depth:
+                batched, state.events = state.events, []
+                self._flush(batched)
 
     def notify(self, event: DatabaseEvent, data: Dict[str, Any] = None) -> None:
+        if event == DatabaseEvent.BATCH:
+            # A batch forwarded from another subject is split up again by
+            # the topics of this subject's observers
+            with self.batch():
+                for batched, batched_data in data["events"]:
+                    self.notify(batched, batched_data)
+            return
+        with self._lock:
+            stats = self.dispatch_stats
+            stats.events += 1
+            stats.by_event[event] = stats.by_event.get(event, 0) + 1
+        state = self._batch_state
+        if state.depth:
+            state.events.append((event, data))
+            return
+        for observer, _ in self._subscribers(event):
+            self._deliver(observer, event, data)
+
+    def _subscribers(self, event):
+        """Return the live (observer, topics) pairs subscribed to event"""
+        subscribers = []
         with self._lock:
-            observers = self._observers.copy()
-        for observer in observers:
-            observer.update(event, data)
\ No newline at end of file
+            alive = []
+            for subscription in self._observers:
+                observer = subscription[0]()
+                if observer is None:
+                    continue
+                alive.append(subscription)
+                topics = subscription[1]
+                if event is None or topics is None or event in topics:
+                    subscribers.append((observer, topics))
+            self._observers = alive
+        return subscribers
+
+    def _flush(self, batched):
+        if not batched:
+            return
+        for observer, topics in self._subscribers(None):
+            events = [
+                (event, data) for event, data in batched
+                if topics is None or event in topics
+            ]
+            if len(events) == 1:
+                self._deliver(observer, *events[0])
+            elif events:
+                self.dispatch_stats.coalesced += len(events)
+                self._deliver(observer, DatabaseEvent.BATCH, {"events": events})
+
+    def _deliver(self, observer, event, data):
+        started = time.perf_counter()
+        try:
+            observer.update(event, data)
+        finally:
+            stats = self.dispatch_stats
+            stats.deliveries += 1
+            stats.seconds += time.perf_counter() - started
@@ -0,0 +1,217 @@
+"""Diceware-style passphrases drawn from a memory-mapped wordlist.
+
+The wordlist is never read into Python objects. A sidecar index stores the
+byte offsets of every usable word, so opening a wordlist maps two files and
+picking a word is two integer reads and a slice, whatever the list's size.
+The index is built with one pass over the wordlist the first time it is
+used, and again whenever the wordlist changes.
+"""
+import hashlib
+import math
+import mmap
+import os
+import secrets
+import string
+import struct
+import tempfile
+
+DEFAULT_WORDLISTS = [
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "wordlists",
+        "words.txt",
+    ),
+    "/usr/share/dict/words",
+]
+
+# Separator choices offered by the generator; several characters mean one is
+# picked at random for every gap between words
+SEPARATORS = {
+    "Hyphen (-)": "-",
+    "Space": " ",
+    "Period (.)": ".",
+    "Underscore (_)": "_",
+    "Random digit": string.digits,
+    "Random symbol": "!#$%&*+=?@^~",
+}
+
+INDEX_MAGIC = b"WLIDX001"
+# magic, wordlist size, wordlist mtime in ns, word count
+INDEX_HEADER = struct.Struct("<8sQQQ")
+# start and end offset of one word
+INDEX_ENTRY = struct.Struct("<QQ")
+
+
+class WordlistError(Exception):
+    """Raised when a wordlist cannot be used for passphrases"""
+
+
+def find_wordlist(settings=None):
+    """Return the configured wordlist, else the first default that exists"""
+    candidates = list(DEFAULT_WORDLISTS)
+    if settings is not None:
+        configured = settings.value("passphrase/wordlist")
+        if configured:
+            candidates.insert(0, configured)
+    for path in candidates:
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _usable_word(line):
+    """Return the (start, end) span of the word on line, or None to skip it.
+
+    Lines may carry diceware dice numbers before the word. Only lowercase
+    alphabetic words are used so every word is typed the same way.
+    """
+    stripped = line.rstrip(b"\r\n")
+    start = max(stripped.rfind(b"\t"), stripped.rfind(b" ")) + 1
+    word = stripped[start:]
+    try:
+        text = word.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    if not text.isalpha() or not text.islower():
+        return None
+    return start, len(stripped)
+
+
+def build_index(path, index_path):
+    """Write the offset index of path to index_path and return the word count"""
+    stat = os.stat(path)
+    seen = set()
+    count = 0
+    temporary = f"{index_path}.tmp"
+    with open(path, "rb") as source, open(temporary, "wb") as index:
+        index.write(INDEX_HEADER.pack(INDEX_MAGIC, 0, 0, 0))
+        offset = 0
+        for line in source:
+            span = _usable_word(line)
+            if span is not None:
+                word = line[span[0]:span[1]]
+                # Duplicates would skew the distribution and the entropy
+                digest = hashlib.blake2b(word, digest_size=8).digest()
+                if digest not in seen:
+                    seen.add(digest)
+                    index.write(INDEX_ENTRY.pack(offset + span[0], offset + span[1]))
+                    count += 1
+            offset += len(line)
+        index.seek(0)
+        index.write(INDEX_HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, count))
+    os.replace(temporary, index_path)
+    return count
+
+
+def index_path_for(path):
+    """Return where the index of path is kept: next to it, or in the temp dir"""
+    directory = os.path.dirname(os.path.abspath(path))
+    if os.access(directory, os.W_OK):
+        return f"{path}.idx"
+    digest = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"wordlist-{digest}.idx")
+
+
+class Wordlist:
+    """Random access to the usable words of a wordlist file"""
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or index_path_for(path)
+        self._files = []
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        stat = os.stat(self.path)
+        # mmap refuses empty files
+        if stat.st_size == 0:
+            raise WordlistError(f"{self.path} is empty")
+        if not self._index_matches(stat):
+            build_index(self.path, self.index_path)
+
+        with open(self.index_path, "rb") as index:
+            header = index.read(INDEX_HEADER.size)
+        if len(header) != INDEX_HEADER.size:
+            raise WordlistError(f"{self.index_path} is not a wordlist index")
+        _, _, _, self.count = INDEX_HEADER.unpack(header)
+        if self.count < 2:
+            raise WordlistError(f"{self.path} has fewer than two usable words")
+
+        self._data = self._map(self.path)
+        self._index = self._map(self.index_path)
+
+    def _index_matches(self, stat):
+        try:
+            with open(self.index_path, "rb") as index:
+                header = index.read(INDEX_HEADER.size)
+                index_size = os.fstat(index.fileno()).st_size
+        except OSError:
+            return False
+        if len(header) != INDEX_HEADER.size:
+            return False
+        magic, size, mtime_ns, count = INDEX_HEADER.unpack(header)
+        return (
+            magic == INDEX_MAGIC
+            and size == stat.st_size
+            and mtime_ns == stat.st_mtime_ns
+            and index_size == INDEX_HEADER.size + count * INDEX_ENTRY.size
+        )
+
+    def _map(self, path):
+        handle = open(path, "rb")
+        self._files.append(handle)
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._files.append(mapped)
+        return mapped
+
+    def __len__(self):
+        return self.count
+
+    def word(self, position):
+        if not 0 <= position < self.count:
+            raise IndexError(position)
+        start, end = INDEX_ENTRY.unpack_from(
+            self._index, INDEX_HEADER.size + position * INDEX_ENTRY.size
+        )
+        return self._data[start:end].decode("utf-8")
+
+    def random_word(self):
+        return self.word(secrets.randbelow(self.count))
+
+    def close(self):
+        for handle in reversed(self._files):
+            handle.close()
+        self._files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def generate_passphrase(wordlist, word_count=6, separators="-"):
+    """Join word_count random words, picking each separator from separators"""
+    if word_count < 1:
+        raise ValueError("A passphrase needs at least one word")
+    separators = "".join(sorted(set(separators))) or " "
+    parts = [wordlist.random_word()]
+    for _ in range(word_count - 1):
+        parts.append(secrets.choice(separators))
+        parts.append(wordlist.random_word())
+    return "".join(parts)
+
+
+def passphrase_combinations(wordlist_size, word_count, separators="-"):
+    """Return how many distinct passphrases the generator can produce"""
+    separator_choices = len(set(separators)) or 1
+    return wordlist_size**word_count * separator_choices ** max(word_count - 1, 0)
+
+
+def passphrase_entropy(wordlist_size, word_count, separators="-"):
+    """Return the entropy in bits of a passphrase from generate_passphrase"""
+    return math.log2(passphrase_combinations(wordlist_size, word_count, separators))
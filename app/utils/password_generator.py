@@ -0,0 +1,103 @@
+"""Random password generation backed by the operating system's CSPRNG.
+
+Characters are drawn in bulk: a batch of random bytes is mapped onto the
+alphabet with bytes.translate, dropping the bytes above the largest multiple
+of the alphabet size so every character stays equally likely. Each selected
+character class is guaranteed by placing one character of that class at a
+random position, which gives the same distribution as shuffling it into the
+password but needs only a few random numbers per password.
+"""
+import secrets
+import string
+from functools import lru_cache
+
+LOWERCASE = string.ascii_lowercase
+UPPERCASE = string.ascii_uppercase
+DIGITS = string.digits
+SYMBOLS = string.punctuation
+
+
+def character_classes(uppercase=False, digits=False, symbols=False):
+    """Return the character classes a password must draw from"""
+    classes = [LOWERCASE]
+    if uppercase:
+        classes.append(UPPERCASE)
+    if digits:
+        classes.append(DIGITS)
+    if symbols:
+        classes.append(SYMBOLS)
+    return classes
+
+
+class _Sampler:
+    """Draws uniformly distributed symbols of an alphabet of up to 256 bytes"""
+
+    def __init__(self, alphabet):
+        size = len(alphabet)
+        if not 0 < size <= 256 or len(set(alphabet)) != size:
+            raise ValueError("Alphabet must hold 1 to 256 distinct symbols")
+        limit = 256 - 256 % size
+        self.table = bytes(
+            alphabet[value % size] if value < limit else 0 for value in range(256)
+        )
+        self.rejected = bytes(range(limit, 256))
+        self.acceptance = limit / 256
+
+    def draw(self, count):
+        """Return count random symbols as bytes"""
+        drawn = b""
+        while len(drawn) < count:
+            # Ask for a little more than needed so one round is almost always enough
+            needed = count - len(drawn)
+            raw = secrets.token_bytes(int(needed / self.acceptance) + 16)
+            drawn += raw.translate(self.table, self.rejected)
+        return drawn[:count]
+
+
+@lru_cache(maxsize=64)
+def _sampler(alphabet):
+    return _Sampler(alphabet)
+
+
+def _random_indexes(bound, count):
+    """Return count random integers in range(bound)"""
+    if bound <= 256:
+        return _sampler(bytes(range(bound))).draw(count)
+    return [secrets.randbelow(bound) for _ in range(count)]
+
+
+def generate_passwords(count, length=12, uppercase=False, digits=False, symbols=False):
+    """Generate count passwords that each contain every selected character class"""
+    classes = character_classes(uppercase, digits, symbols)
+    if length < len(classes):
+        raise ValueError(
+            f"A password needs at least {len(classes)} characters to cover every "
+            "selected character class"
+        )
+    if count <= 0:
+        return []
+
+    body = _sampler("".join(classes).encode("ascii")).draw(count * length)
+    required = [_sampler(chars.encode("ascii")).draw(count) for chars in classes]
+    # Slot j of a password is an index among the length - j positions still free
+    slots = [_random_indexes(length - j, count) for j in range(len(classes))]
+
+    passwords = []
+    for index in range(count):
+        password = bytearray(body[index * length:(index + 1) * length])
+        taken = []
+        for chars, free_slots in zip(required, slots):
+            position = free_slots[index]
+            for used in taken:
+                if position >= used:
+                    position += 1
+            taken.append(position)
+            taken.sort()
+            password[position] = chars[index]
+        passwords.append(password.decode("ascii"))
+    return passwords
+
+
+def generate_password(length=12, uppercase=False, digits=False, symbols=False):
+    """Generate a single password, see generate_passwords"""
+    return generate_passwords(1, length, uppercase, digits, symbols)[0]
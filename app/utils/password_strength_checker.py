@@ -1,63 +1,669 @@
+"""Guess-count based password strength estimation.
+
+The password is searched for patterns an attacker would try first:
+dictionary words (also reversed and with l33t substitutions), keyboard
+walks, repeats, sequences and dates. Each match gets a guess estimate and
+the cheapest way to cover the whole password with matches and brute force
+decides the strength, in the spirit of zxcvbn.
+
+Dictionary words are found in one pass by the precompiled automaton in
+app/utils/strength_automaton.py, which is loaded on first use or ahead of
+it by preload_automaton. Dates and years are scored by their distance
+from the current year. Results are
+memoized under a keyed hash so plaintext passwords are never kept as cache
+keys.
+"""
+import datetime
+import hashlib
+import hmac
+import math
+import os
 import re
+import threading
+from collections import OrderedDict
+from itertools import product
 
+from app.utils.breach_checker import CorpusError, default_corpus
+from app.utils.strength_automaton import DictionaryAutomaton
+
+MIN_YEAR_SPACE = 20
+BRUTEFORCE_CARDINALITY = 10
+MIN_GUESSES_BEFORE_GROWING_SEQUENCE = 10000
+MIN_SUBMATCH_GUESSES_SINGLE_CHAR = 10
+MIN_SUBMATCH_GUESSES_MULTI_CHAR = 50
+# Longer passwords are analysed in windows of this length, up to
+# MAX_ANALYSED_WINDOWS of them; a repeat ending a window is followed past
+# it and whatever is left after the last window counts as brute force
+MAX_ANALYSED_LENGTH = 64
+MAX_ANALYSED_WINDOWS = 2
+CACHE_SIZE = 512
+
+STRENGTHS = [
+    ("Very Weak", "red"),
+    ("Weak", "orange"),
+    ("Medium", "yellow"),
+    ("Strong", "lightgreen"),
+    ("Very Strong", "green"),
+]
+# Upper guess bounds of the first four strengths
+SCORE_THRESHOLDS = [1e3 + 5, 1e6 + 5, 1e8 + 5, 1e10 + 5]
+
+L33T_TABLE = {
+    "4": "a",
+    "@": "a",
+    "8": "b",
+    "(": "c",
+    "{": "c",
+    "[": "c",
+    "<": "c",
+    "3": "e",
+    "6": "g",
+    "9": "g",
+    "1": "il",
+    "!": "i",
+    "|": "il",
+    "7": "lt",
+    "0": "o",
+    "$": "s",
+    "5": "s",
+    "+": "t",
+    "%": "x",
+    "2": "z",
+}
+
+# US keyboard rows; each key lists its unshifted and shifted character
+KEYBOARD_ROWS = [
+    ["`~", "1!", "2@", "3#", "4$", "5%", "6^", "7&", "8*", "9(", "0)", "-_", "=+"],
+    ["qQ", "wW", "eE", "rR", "tT", "yY", "uU", "iI", "oO", "pP", "[{", "]}", "\\|"],
+    ["aA", "sS", "dD", "fF", "gG", "hH", "jJ", "kK", "lL", ";:", "'\""],
+    ["zZ", "xX", "cC", "vV", "bB", "nN", "mM", ",<", ".>", "/?"],
+]
+# Neighbour offsets on the slanted keyboard, in a fixed order so a change of
+# index is a change of direction
+KEYBOARD_DIRECTIONS = [(-1, 0), (0, -1), (1, -1), (1, 0), (0, 1), (-1, 1)]
+
+SEQUENCE_ALPHABETS = [
+    "abcdefghijklmnopqrstuvwxyz",
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    "0123456789",
+]
+
+DATE_WITH_SEPARATOR = re.compile(r"(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})")
+YEAR = re.compile(r"19\d\d|20\d\d")
+
+# Guards _automaton; the estimator runs in the GUI thread while the
+# preload thread or the security audit may be loading it
+_automaton_lock = threading.Lock()
+_automaton = None
+_cache = OrderedDict()
+_cache_key = os.urandom(32)
+
+
+def _load_automaton():
+    global _automaton
+    with _automaton_lock:
+        if _automaton is None:
+            _automaton = DictionaryAutomaton.load()
+        return _automaton
+
+
+def preload_automaton():
+    """Load the dictionary automaton on a background thread.
+
+    Loading takes around a second; doing it ahead of the first estimate
+    keeps that out of the first keystroke in a password field.
+    """
+    threading.Thread(target=_load_automaton, daemon=True).start()
+
+
+def _reference_year():
+    return datetime.date.today().year
+
+
+def _keyboard_graph():
+    positions = {}
+    for row, keys in enumerate(KEYBOARD_ROWS):
+        for column, key in enumerate(keys):
+            for shifted, char in enumerate(key):
+                positions[char] = (column, row, shifted)
+    graph = {}
+    by_position = {
+        (column, row): key
+        for row, keys in enumerate(KEYBOARD_ROWS)
+        for column, key in enumerate(keys)
+    }
+    for char, (column, row, _) in positions.items():
+        graph[char] = [
+            by_position.get((column + dx, row + dy))
+            for dx, dy in KEYBOARD_DIRECTIONS
+        ]
+    return positions, graph
+
+
+KEYBOARD_POSITIONS, KEYBOARD_GRAPH = _keyboard_graph()
+KEYBOARD_STARTING_POSITIONS = len(KEYBOARD_GRAPH) // 2
+KEYBOARD_AVERAGE_DEGREE = sum(
+    sum(1 for key in neighbours if key) for neighbours in KEYBOARD_GRAPH.values()
+) / len(KEYBOARD_GRAPH)
+
+
+def _match(pattern, i, j, password, guesses, **details):
+    return {
+        "pattern": pattern,
+        "i": i,
+        "j": j,
+        "token": password[i:j + 1],
+        "guesses": guesses,
+        **details,
+    }
+
+
+def _combinations(n, k):
+    return math.comb(n, k) if 0 <= k <= n else 0
+
+
+def _uppercase_variations(word):
+    if word.islower() or not any(char.isalpha() for char in word):
+        return 1
+    if word.isupper() or (word[0].isupper() and word[1:].islower()) or (
+        word[-1].isupper() and word[:-1].islower()
+    ):
+        return 2
+    upper = sum(1 for char in word if char.isupper())
+    lower = sum(1 for char in word if char.islower())
+    return sum(_combinations(upper + lower, k) for k in range(1, min(upper, lower) + 1))
+
+
+def _l33t_variations(token, substitutions):
+    variations = 1
+    for leet, letter in substitutions.items():
+        substituted = token.count(leet)
+        unsubstituted = token.lower().count(letter)
+        if not unsubstituted:
+            variations *= 2
+        else:
+            variations *= sum(
+                _combinations(substituted + unsubstituted, k)
+                for k in range(1, min(substituted, unsubstituted) + 1)
+            )
+    return variations
+
+
+def _dictionary_matches(password):
+    automaton = _load_automaton()
+    lower = password.lower()
+    length = len(password)
+    matches = []
+
+    for i, j, dictionary, rank in automaton.find(lower):
+        token = password[i:j + 1]
+        matches.append(
+            _match(
+                "dictionary", i, j, password,
+                rank * _uppercase_variations(token),
+                dictionary=dictionary, rank=rank,
+            )
+        )
+
+    for i, j, dictionary, rank in automaton.find(lower[::-1]):
+        i, j = length - 1 - j, length - 1 - i
+        token = password[i:j + 1]
+        if token.lower() == token.lower()[::-1]:
+            continue  # palindromes are already found forwards
+        matches.append(
+            _match(
+                "dictionary", i, j, password,
+                rank * _uppercase_variations(token) * 2,
+                dictionary=dictionary, rank=rank, reversed=True,
+            )
+        )
+
+    leets = sorted({char for char in lower if char in L33T_TABLE})
+    for letters in product(*(L33T_TABLE[char] for char in leets)):
+        table = dict(zip(leets, letters))
+        translated = "".join(table.get(char, char) for char in lower)
+        for i, j, dictionary, rank in automaton.find(translated):
+            token = password[i:j + 1]
+            used = {leet: table[leet] for leet in leets if leet in token}
+            if not used:
+                continue  # the same word without substitutions
+            matches.append(
+                _match(
+                    "dictionary", i, j, password,
+                    rank * _uppercase_variations(token) * _l33t_variations(token, used),
+                    dictionary=dictionary, rank=rank, l33t=True,
+                )
+            )
+    return matches
+
+
+def _spatial_guesses(length, turns, shifted, unshifted):
+    guesses = 0
+    for i in range(2, length + 1):
+        for j in range(1, min(turns, i - 1) + 1):
+            guesses += (
+                _combinations(i - 1, j - 1)
+                * KEYBOARD_STARTING_POSITIONS
+                * KEYBOARD_AVERAGE_DEGREE**j
+            )
+    if shifted:
+        if not unshifted:
+            guesses *= 2
+        else:
+            guesses *= sum(
+                _combinations(shifted + unshifted, k)
+                for k in range(1, min(shifted, unshifted) + 1)
+            )
+    return guesses
+
+
+def _spatial_matches(password):
+    matches = []
+    i = 0
+    while i < len(password) - 2:
+        j = i
+        turns = 0
+        last_direction = None
+        shifted = 1 if password[i] in KEYBOARD_POSITIONS and KEYBOARD_POSITIONS[
+            password[i]
+        ][2] else 0
+        while j + 1 < len(password):
+            neighbours = KEYBOARD_GRAPH.get(password[j])
+            following = password[j + 1]
+            direction = None
+            if neighbours:
+                for index, key in enumerate(neighbours):
+                    if key and following in key:
+                        direction = index
+                        break
+            if direction is None:
+                break
+            if direction != last_direction:
+                turns += 1
+                last_direction = direction
+            if KEYBOARD_POSITIONS[following][2]:
+                shifted += 1
+            j += 1
+        if j - i >= 2:
+            length = j - i + 1
+            matches.append(
+                _match(
+                    "spatial", i, j, password,
+                    _spatial_guesses(length, turns, shifted, length - shifted),
+                )
+            )
+            i = j
+        else:
+            i += 1
+    return matches
+
+
+def _sequence_matches(password):
+    matches = []
+    i = 0
+    while i < len(password) - 2:
+        alphabet = next((a for a in SEQUENCE_ALPHABETS if password[i] in a), None)
+        if alphabet is None or password[i + 1] not in alphabet:
+            i += 1
+            continue
+        delta = alphabet.index(password[i + 1]) - alphabet.index(password[i])
+        if delta == 0 or abs(delta) > 5:
+            i += 1
+            continue
+        j = i + 1
+        while (
+            j + 1 < len(password)
+            and password[j + 1] in alphabet
+            and alphabet.index(password[j + 1]) - alphabet.index(password[j]) == delta
+        ):
+            j += 1
+        if j - i >= 2:
+            first = password[i]
+            if first in "aAzZ019":
+                base = 4
+            elif first.isdigit():
+                base = 10
+            else:
+                base = 26
+            if delta < 0:
+                base *= 2
+            matches.append(
+                _match("sequence", i, j, password, base * (j - i + 1) * abs(delta))
+            )
+            i = j
+        else:
+            i += 1
+    return matches
+
+
+def _repeat_matches(password):
+    matches = []
+    position = 0
+    greedy = re.compile(r"(.+)\1+")
+    lazy = re.compile(r"(.+?)\1+")
+    anchored = re.compile(r"^(.+?)\1+$")
+    while position < len(password):
+        greedy_match = greedy.search(password, position)
+        if not greedy_match:
+            break
+        lazy_match = lazy.search(password, position)
+        if len(greedy_match.group(0)) > len(lazy_match.group(0)):
+            found = greedy_match
+            base = anchored.match(found.group(0)).group(1)
+        else:
+            found = lazy_match
+            base = found.group(1)
+        i, j = found.start(), found.end() - 1
+        base_guesses = _estimate(base)["guesses"]
+        repeats = len(found.group(0)) // len(base)
+        matches.append(
+            _match("repeat", i, j, password, base_guesses * repeats, base=base)
+        )
+        position = j + 1
+    return matches
 
-def check_password_strength(password):
-    score = 0
-    feedback = []
 
-    # Check length
+def _year_guesses(year):
+    return max(abs(year - _reference_year()), MIN_YEAR_SPACE)
+
+
+def _full_year(year):
+    if year >= 100:
+        return year
+    return year + (1900 if year > 50 else 2000)
+
+
+def _valid_date(day, month, year):
+    if not (1000 <= year <= 2050 or year < 100):
+        return False
+    return 1 <= month <= 12 and 1 <= day <= 31
+
+
+def _date_candidates(digits):
+    """Yield (day, month, year) readings of a run of 4 to 8 digits"""
+    length = len(digits)
+    for year_length in (4, 2):
+        if year_length >= length:
+            continue
+        for year_first in (True, False):
+            if year_first:
+                year, rest = digits[:year_length], digits[year_length:]
+            else:
+                year, rest = digits[-year_length:], digits[:-year_length]
+            for split in range(1, len(rest)):
+                first, second = rest[:split], rest[split:]
+                if len(first) > 2 or len(second) > 2:
+                    continue
+                for day, month in ((first, second), (second, first)):
+                    yield int(day), int(month), int(year)
+
+
+def _date_matches(password):
+    matches = []
+    for found in DATE_WITH_SEPARATOR.finditer(password):
+        first, second, third = (int(found.group(k)) for k in (1, 3, 4))
+        for day, month, year in ((first, second, third), (second, first, third),
+                                 (third, second, first)):
+            if _valid_date(day, month, year):
+                matches.append(
+                    _match(
+                        "date", found.start(), found.end() - 1, password,
+                        _year_guesses(_full_year(year)) * 365 * 4,
+                    )
+                )
+                break
+
+    for i in range(len(password)):
+        for j in range(i + 3, min(i + 8, len(password))):
+            token = password[i:j + 1]
+            if not token.isdigit():
+                break
+            best = None
+            reference = _reference_year()
+            for day, month, year in _date_candidates(token):
+                if _valid_date(day, month, year):
+                    distance = abs(_full_year(year) - reference)
+                    if best is None or distance < best:
+                        best = distance
+            if best is not None:
+                matches.append(
+                    _match("date", i, j, password, max(best, MIN_YEAR_SPACE) * 365)
+                )
+
+    for found in YEAR.finditer(password):
+        matches.append(
+            _match(
+                "year", found.start(), found.end() - 1, password,
+                _year_guesses(int(found.group(0))),
+            )
+        )
+    return matches
+
+
+def _bruteforce(password, i, j):
+    length = j - i + 1
+    guesses = BRUTEFORCE_CARDINALITY**length
+    minimum = (
+        MIN_SUBMATCH_GUESSES_SINGLE_CHAR + 1
+        if length == 1
+        else MIN_SUBMATCH_GUESSES_MULTI_CHAR + 1
+    )
+    return _match("bruteforce", i, j, password, max(guesses, minimum))
+
+
+def _all_matches(password):
+    return (
+        _dictionary_matches(password)
+        + _spatial_matches(password)
+        + _sequence_matches(password)
+        + _repeat_matches(password)
+        + _date_matches(password)
+    )
+
+
+def _match_guesses(match, password_length):
+    if match["pattern"] == "bruteforce" or len(match["token"]) == password_length:
+        return match["guesses"]
+    minimum = (
+        MIN_SUBMATCH_GUESSES_SINGLE_CHAR
+        if len(match["token"]) == 1
+        else MIN_SUBMATCH_GUESSES_MULTI_CHAR
+    )
+    return max(match["guesses"], minimum)
+
+
+def _most_guessable_sequence(password, matches):
+    """Return (guesses, matches) of the cheapest cover of password"""
+    n = len(password)
+    by_end = [[] for _ in range(n)]
+    for match in matches:
+        by_end[match["j"]].append(match)
+
+    # For each end position and sequence length l: best last match, product
+    # of guesses and total guesses
+    last = [{} for _ in range(n)]
+    products = [{} for _ in range(n)]
+    totals = [{} for _ in range(n)]
+
+    def update(match, length):
+        k = match["j"]
+        guesses = _match_guesses(match, n)
+        if length > 1:
+            guesses *= products[match["i"] - 1][length - 1]
+        total = math.factorial(length) * guesses
+        total += MIN_GUESSES_BEFORE_GROWING_SEQUENCE ** (length - 1)
+        for other_length, other_total in totals[k].items():
+            if other_length <= length and other_total <= total:
+                return
+        last[k][length] = match
+        products[k][length] = guesses
+        totals[k][length] = total
+
+    for k in range(n):
+        for match in by_end[k]:
+            if match["i"] > 0:
+                for length in list(last[match["i"] - 1]):
+                    update(match, length + 1)
+            else:
+                update(match, 1)
+        update(_bruteforce(password, 0, k), 1)
+        for i in range(1, k + 1):
+            candidate = _bruteforce(password, i, k)
+            for length, previous in list(last[i - 1].items()):
+                # Two adjacent brute force matches are never better than one
+                if previous["pattern"] != "bruteforce":
+                    update(candidate, length + 1)
+
+    length, total = min(totals[n - 1].items(), key=lambda item: item[1])
+    sequence = []
+    k = n - 1
+    while k >= 0:
+        match = last[k][length]
+        sequence.insert(0, match)
+        k = match["i"] - 1
+        length -= 1
+    return total, sequence
+
+
+def _feedback(password, score, sequence):
+    feedback = []
     if len(password) < 8:
         feedback.append("Password is too short")
-    elif len(password) >= 12:
-        score += 2
-        feedback.append("Good length")
-    else:
-        score += 1
 
-    # Check for uppercase letters
-    if re.search(r"[A-Z]", password):
-        score += 1
-    else:
-        feedback.append("Add uppercase letters")
+    patterns = [match for match in sequence if match["pattern"] != "bruteforce"]
+    if patterns and score <= 2:
+        longest = max(patterns, key=lambda match: len(match["token"]))
+        pattern = longest["pattern"]
+        if pattern == "dictionary":
+            if longest["dictionary"] == "passwords":
+                feedback.append("This is a commonly used password")
+            elif longest["dictionary"] == "names":
+                feedback.append("Names and surnames are easy to guess")
+            else:
+                feedback.append("Common words are easy to guess")
+            if longest.get("l33t"):
+                feedback.append("Predictable substitutions like '@' for 'a' don't help much")
+            if longest.get("reversed"):
+                feedback.append("Reversed words aren't much harder to guess")
+            if longest["token"][:1].isupper():
+                feedback.append("Capitalization doesn't help very much")
+        elif pattern == "spatial":
+            feedback.append("Avoid keyboard patterns like qwerty")
+        elif pattern == "repeat":
+            feedback.append("Avoid repeating characters")
+        elif pattern == "sequence":
+            feedback.append("Avoid sequences like abc or 123")
+        elif pattern in ("date", "year"):
+            feedback.append("Avoid dates and years that are associated with you")
 
-    # Check for lowercase letters
-    if re.search(r"[a-z]", password):
-        score += 1
-    else:
-        feedback.append("Add lowercase letters")
+    if score <= 2:
+        feedback.append("Add more words or characters")
+    return feedback
 
-    # Check for numbers
-    if re.search(r"\d", password):
-        score += 1
-    else:
-        feedback.append("Add numbers")
 
-    # Check for special characters
-    if re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
-        score += 1
-    else:
-        feedback.append("Add special characters")
-
-    # Check for repeating characters
-    if re.search(r"(.)\1\1", password):
-        score -= 1
-        feedback.append("Avoid repeating characters")
-
-    # Strength based on score
-    if score < 2:
-        strength = "Very Weak"
-        color = "red"
-    elif score < 4:
-        strength = "Weak"
-        color = "orange"
-    elif score < 6:
-        strength = "Medium"
-        color = "yellow"
-    elif score < 8:
-        strength = "Strong"
-        color = "lightgreen"
+def _estimate(password):
+    """Return {"guesses", "score", "sequence"} without touching the cache"""
+    if not password:
+        return {"guesses": 1, "score": 0, "sequence": []}
+    guesses, sequence = 1, None
+    rest = password
+    for _ in range(MAX_ANALYSED_WINDOWS):
+        analysed = rest[:MAX_ANALYSED_LENGTH]
+        window_guesses, window_sequence = _most_guessable_sequence(
+            analysed, _all_matches(analysed)
+        )
+        rest = rest[len(analysed):]
+        if rest:
+            window_guesses, rest = _extend_repeat(
+                analysed + rest, len(analysed), window_guesses, window_sequence
+            )
+        guesses *= window_guesses
+        # Feedback only looks at the first window
+        sequence = sequence or window_sequence
+        if not rest:
+            break
+    guesses *= BRUTEFORCE_CARDINALITY ** len(rest)
+    score = sum(1 for threshold in SCORE_THRESHOLDS if guesses >= threshold)
+    return {"guesses": guesses, "score": score, "sequence": sequence}
+
+
+def _extend_repeat(password, analysed_length, guesses, sequence):
+    """Carry a repeat that ends the analysed prefix on past it.
+
+    Returns the guesses with the extra repeats counted and the part of
+    password the repeat does not cover, which is estimated separately.
+    """
+    repeat = sequence[-1] if sequence[-1]["pattern"] == "repeat" else None
+    if repeat is None:
+        # A repeat cut short by the prefix leaves its partial base behind it
+        repeats = [match for match in sequence if match["pattern"] == "repeat"]
+        repeat = repeats[-1] if repeats else None
+    if repeat is None:
+        return guesses, password[analysed_length:]
+    period = len(repeat["base"])
+    end = repeat["j"] + 1
+    while end < len(password) and password[end] == password[end - period]:
+        end += 1
+    if end <= analysed_length:
+        return guesses, password[analysed_length:]
+    # Whatever followed the repeat in the prefix was part of it after all
+    covered = [match for match in sequence if match["i"] > repeat["j"]]
+    for match in covered:
+        guesses //= max(_match_guesses(match, analysed_length), 1)
+    old_repeats = len(repeat["token"]) // period
+    new_repeats = (end - repeat["i"]) // period
+    guesses = guesses * new_repeats // old_repeats
+    return max(guesses, 1), password[end:]
+
+
+def score_password(password, corpus=None):
+    """Return {"guesses", "score", "breached", "feedback"} for password.
+
+    score runs from 0 (guessed within a thousand tries) to 4 (more than ten
+    billion). A password found in corpus always scores 0; breached is how
+    often it was seen there.
+    """
+    estimate = _estimate(password)
+    breached = corpus.lookup(password) if corpus is not None and password else 0
+    feedback = _feedback(password, estimate["score"], estimate["sequence"])
+    if breached:
+        estimate["score"] = 0
+        times = "once" if breached == 1 else f"{breached:,} times"
+        feedback.insert(0, f"This password appeared in a data breach ({times})")
+    return {
+        "guesses": estimate["guesses"],
+        "score": estimate["score"],
+        "breached": breached,
+        "feedback": feedback,
+    }
+
+
+def estimate_strength(password):
+    """Memoized score_password against the configured breach corpus"""
+    key = hmac.new(_cache_key, password.encode(), hashlib.sha256).digest()
+    result = _cache.get(key)
+    if result is None:
+        try:
+            corpus = default_corpus()
+        except CorpusError:
+            # Reported by the breached password scan, not on every keystroke
+            corpus = None
+        result = score_password(password, corpus)
+        result["feedback"] = tuple(result["feedback"])
+        _cache[key] = result
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
     else:
-        strength = "Very Strong"
-        color = "green"
+        _cache.move_to_end(key)
+    return dict(result, feedback=list(result["feedback"]))
+
+
+def clear_strength_cache():
+    _cache.clear()
 
-    return strength, color, feedback
+
+def check_password_strength(password):
+    """Return (strength, color, feedback) for display next to a password field"""
+    estimate = estimate_strength(password)
+    strength, color = STRENGTHS[estimate["score"]]
+    return strength, color, estimate["feedback"]
@@ -0,0 +1,58 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+
+class PlaintextCache:
+    """Size-bounded LRU cache of decrypted passwords with time-based expiry"""
+
+    def __init__(self, max_size=256, ttl=120.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def purge_expired(self):
+        """Drop every expired entry and return how many were removed"""
+        now = self._clock()
+        with self._lock:
+            expired = [
+                key
+                for key, (_, expires_at) in self._entries.items()
+                if expires_at <= now
+            ]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
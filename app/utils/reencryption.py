@@ -0,0 +1,266 @@
+import hashlib
+import hmac
+import threading
+import time
+
+from PyQt6.QtSql import QSqlQuery
+
+from app.utils.bulk_crypto import (
+    map_batches,
+    reencrypt_history_tokens,
+    reencrypt_tokens,
+)
+from app.utils.errors import OperationCancelled
+from app.utils.vault_cipher import from_column, to_column
+
+
+# Held by anything that rewrites stored ciphertexts or the wrapped data key,
+# so a re-encryption never races TokenMigration or a master password change
+rewrite_lock = threading.RLock()
+
+
+def key_check(key):
+    """Return a value that identifies key without revealing it"""
+    return hmac.new(key, b"password-manager key check", hashlib.sha256).hexdigest()
+
+
+class ReencryptionError(Exception):
+    """Raised when the vault cannot be switched to the new key"""
+
+
+class StaleRowsError(ReencryptionError):
+    """Raised when rows changed after being staged; running again restages them"""
+
+
+class ReencryptionEngine:
+    """Re-encrypts every stored password under a new key.
+
+    Rows are converted in chunks by a process pool and staged in a staging
+    table per source table, committing after each chunk so an interrupted
+    run can resume where it stopped. Only once every row is staged are the
+    new ciphertexts swapped in, together with the new key check, in a single
+    transaction. The vault therefore never holds a mix of old and new keys.
+    """
+
+    CHUNK_SIZE = 2000
+
+    # (source table, staging table, worker function, rows may be dropped)
+    # Password history is advisory: entries that no longer decrypt are
+    # dropped instead of blocking the whole run.
+    TABLES = [
+        ("logins", "reencrypt_staging", reencrypt_tokens, False),
+        (
+            "password_history",
+            "reencrypt_history_staging",
+            reencrypt_history_tokens,
+            True,
+        ),
+    ]
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.db = db_manager.db
+
+    def pending_key_check(self):
+        """Return the key check of an interrupted run, or None"""
+        query = QSqlQuery(self.db)
+        query.exec("SELECT target_key_check FROM reencrypt_checkpoint WHERE id = 1")
+        return query.value(0) if query.next() else None
+
+    def run(self, old_key, new_key, progress_callback=None, is_cancelled=None,
+            meta=None):
+        """Re-encrypt the vault, resuming a checkpoint made for the same new key.
+
+        progress_callback(done, total, rows_per_second) is called after each
+        chunk. meta holds vault_meta values written in the same transaction
+        as the new ciphertexts. Returns a dict with the row count, duration
+        and throughput.
+        """
+        with rewrite_lock:
+            return self._run(old_key, new_key, progress_callback, is_cancelled, meta)
+
+    def _run(self, old_key, new_key, progress_callback, is_cancelled, meta):
+        target = key_check(new_key)
+        pending = self.pending_key_check()
+        if pending is not None and pending != target:
+            self.rollback()
+
+        total = sum(
+            self._scalar(f"SELECT COUNT(*) FROM {table}")
+            for table, _, _, _ in self.TABLES
+        )
+        self._exec(
+            """
+            INSERT OR REPLACE INTO reencrypt_checkpoint (id, target_key_check, total)
+            VALUES (1, ?, ?)
+            """,
+            [target, total],
+        )
+
+        started = time.perf_counter()
+        done = sum(
+            self._scalar(
+                f"""
+                SELECT COUNT(*) FROM {table} t
+                JOIN {staging} s
+                    ON s.id = t.id AND s.old_password = t.encrypted_password
+                """
+            )
+            for table, staging, _, _ in self.TABLES
+        )
+        converted = 0
+        for table, staging, worker, _ in self.TABLES:
+            chunks = map_batches(
+                worker,
+                (old_key, new_key),
+                self._iter_unstaged_chunks(table, staging),
+                lambda rows: [row[1] for row in rows],
+            )
+            try:
+                for rows, encrypted in chunks:
+                    if is_cancelled and is_cancelled():
+                        raise OperationCancelled()
+                    self._stage(staging, rows, encrypted)
+                    done += len(rows)
+                    converted += len(rows)
+                    if progress_callback:
+                        elapsed = time.perf_counter() - started
+                        progress_callback(
+                            done, total, converted / elapsed if elapsed else 0.0
+                        )
+            finally:
+                chunks.close()
+
+        self._swap(target, meta or {})
+        elapsed = time.perf_counter() - started
+        return {
+            "rows": done,
+            "seconds": elapsed,
+            "rows_per_second": converted / elapsed if elapsed else 0.0,
+        }
+
+    def rollback(self):
+        """Discard an interrupted run; the vault still holds the old ciphertexts"""
+        if not self.db.transaction():
+            raise ReencryptionError(self.db.lastError().text())
+        try:
+            for _, staging, _, _ in self.TABLES:
+                self._exec(f"DELETE FROM {staging}")
+            self._exec("DELETE FROM reencrypt_checkpoint")
+        except Exception:
+            self.db.rollback()
+            raise
+        self.db.commit()
+
+    def _iter_unstaged_chunks(self, table, staging):
+        """Yield (id, token) rows that have no up-to-date staged ciphertext"""
+        last_id = -1
+        while True:
+            query = QSqlQuery(self.db)
+            query.prepare(
+                f"""
+                SELECT t.id, t.encrypted_password
+                FROM {table} t
+                LEFT JOIN {staging} s
+                    ON s.id = t.id AND s.old_password = t.encrypted_password
+                WHERE s.id IS NULL AND t.id > ?
+                ORDER BY t.id
+                LIMIT ?
+                """
+            )
+            query.addBindValue(last_id)
+            query.addBindValue(self.CHUNK_SIZE)
+            if not query.exec():
+                raise ReencryptionError(query.lastError().text())
+
+            rows = []
+            while query.next():
+                rows.append((query.value(0), from_column(query.value(1))))
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def _stage(self, staging, rows, encrypted):
+        if not self.db.transaction():
+            raise ReencryptionError(self.db.lastError().text())
+        try:
+            query = QSqlQuery(self.db)
+            query.prepare(
+                f"""
+                INSERT OR REPLACE INTO {staging}
+                    (id, old_password, encrypted_password, fingerprint)
+                VALUES (?, ?, ?, ?)
+                """
+            )
+            query.addBindValue([row[0] for row in rows])
+            query.addBindValue([to_column(row[1]) for row in rows])
+            query.addBindValue([to_column(token) for token, _ in encrypted])
+            query.addBindValue([fingerprint for _, fingerprint in encrypted])
+            if not query.execBatch():
+                raise ReencryptionError(query.lastError().text())
+            if not self.db.commit():
+                raise ReencryptionError(self.db.lastError().text())
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _swap(self, target, meta):
+        if not self.db.transaction():
+            raise ReencryptionError(self.db.lastError().text())
+        try:
+            for table, staging, _, droppable in self.TABLES:
+                stale = self._scalar(
+                    f"""
+                    SELECT COUNT(*) FROM {table} t
+                    LEFT JOIN {staging} s
+                        ON s.id = t.id AND s.old_password = t.encrypted_password
+                    WHERE s.id IS NULL
+                    """
+                )
+                if stale:
+                    raise StaleRowsError(
+                        f"{stale} rows of {table} changed during re-encryption"
+                    )
+                if droppable:
+                    self._exec(
+                        f"""
+                        DELETE FROM {table} WHERE id IN (
+                            SELECT id FROM {staging} WHERE encrypted_password IS NULL
+                        )
+                        """
+                    )
+                self._exec(
+                    f"""
+                    UPDATE {table} SET (encrypted_password, fingerprint) = (
+                        SELECT s.encrypted_password, s.fingerprint
+                        FROM {staging} s
+                        WHERE s.id = {table}.id
+                    )
+                    """
+                )
+                self._exec(f"DELETE FROM {staging}")
+            for name, value in {**meta, "key_check": target}.items():
+                self._exec(
+                    "INSERT OR REPLACE INTO vault_meta (name, value) VALUES (?, ?)",
+                    [name, value],
+                )
+            self._exec("DELETE FROM reencrypt_checkpoint")
+            if not self.db.commit():
+                raise ReencryptionError(self.db.lastError().text())
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _exec(self, sql, values=()):
+        query = QSqlQuery(self.db)
+        query.prepare(sql)
+        for value in values:
+            query.addBindValue(value)
+        if not query.exec():
+            raise ReencryptionError(query.lastError().text())
+        return query
+
+    def _scalar(self, sql):
+        query = self._exec(sql)
+        return query.value(0) if query.next() else None
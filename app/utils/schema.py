@@ -0,0 +1,204 @@
+"""Versioned schema steps for password.db.
+
+The applied version is kept in PRAGMA user_version. Each step runs in its
+own transaction, so a failing step leaves the database at the previous
+version. New steps are appended to MIGRATIONS and never edited once shipped.
+"""
+from PyQt6.QtSql import QSqlQuery
+
+MIGRATIONS = [
+    (
+        1,
+        "Base tables",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS logins (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                website TEXT NOT NULL,
+                username TEXT NOT NULL,
+                encrypted_password TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS vault_meta (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+            """,
+            # Bookkeeping for resumable re-encryption, see ReencryptionEngine
+            """
+            CREATE TABLE IF NOT EXISTS reencrypt_checkpoint (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                target_key_check TEXT NOT NULL,
+                total INTEGER NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS reencrypt_staging (
+                id INTEGER PRIMARY KEY,
+                old_password TEXT NOT NULL,
+                encrypted_password TEXT NOT NULL
+            )
+            """,
+        ],
+    ),
+    (
+        2,
+        "Case-insensitive indexes for sorting by website and username",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_logins_website "
+            "ON logins (website COLLATE NOCASE)",
+            "CREATE INDEX IF NOT EXISTS idx_logins_username "
+            "ON logins (username COLLATE NOCASE)",
+        ],
+    ),
+    (
+        3,
+        "Full-text index over website and username",
+        [
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS logins_fts USING fts5(
+                website,
+                username,
+                content='logins',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='1 2 3'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS logins_fts_insert AFTER INSERT ON logins
+            BEGIN
+                INSERT INTO logins_fts (rowid, website, username)
+                VALUES (new.id, new.website, new.username);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS logins_fts_delete AFTER DELETE ON logins
+            BEGIN
+                INSERT INTO logins_fts (logins_fts, rowid, website, username)
+                VALUES ('delete', old.id, old.website, old.username);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS logins_fts_update
+            AFTER UPDATE OF website, username ON logins
+            BEGIN
+                INSERT INTO logins_fts (logins_fts, rowid, website, username)
+                VALUES ('delete', old.id, old.website, old.username);
+                INSERT INTO logins_fts (rowid, website, username)
+                VALUES (new.id, new.website, new.username);
+            END
+            """,
+            "INSERT INTO logins_fts (logins_fts) VALUES ('rebuild')",
+        ],
+    ),
+    (
+        4,
+        "Keyed password fingerprints for duplicate detection",
+        [
+            "ALTER TABLE logins ADD COLUMN fingerprint TEXT",
+            "CREATE INDEX IF NOT EXISTS idx_logins_fingerprint ON logins (fingerprint)",
+            "ALTER TABLE reencrypt_staging ADD COLUMN fingerprint TEXT",
+        ],
+    ),
+    (
+        5,
+        "Password history with fingerprints",
+        [
+            # Same shape as the table older versions created, so existing
+            # history is kept
+            """
+            CREATE TABLE IF NOT EXISTS password_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                login_id INTEGER,
+                encrypted_password TEXT NOT NULL,
+                date_used DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (login_id) REFERENCES logins(id)
+            )
+            """,
+            "ALTER TABLE password_history ADD COLUMN fingerprint TEXT",
+            "CREATE INDEX IF NOT EXISTS idx_history_login_fingerprint "
+            "ON password_history (login_id, fingerprint)",
+            "CREATE INDEX IF NOT EXISTS idx_history_login_date "
+            "ON password_history (login_id, date_used)",
+            "CREATE INDEX IF NOT EXISTS idx_history_date ON password_history (date_used)",
+            # encrypted_password is NULL for history that no longer decrypts
+            """
+            CREATE TABLE IF NOT EXISTS reencrypt_history_staging (
+                id INTEGER PRIMARY KEY,
+                old_password TEXT NOT NULL,
+                encrypted_password TEXT,
+                fingerprint TEXT
+            )
+            """,
+        ],
+    ),
+    (
+        6,
+        "Password age and cached audit results",
+        [
+            # Set when a password is stored or changed, not by re-encryption
+            "ALTER TABLE logins ADD COLUMN updated_at DATETIME",
+            """
+            UPDATE logins SET updated_at = COALESCE(
+                (SELECT MAX(date_used) FROM password_history h WHERE h.login_id = logins.id),
+                CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS logins_updated_at AFTER INSERT ON logins
+            WHEN new.updated_at IS NULL
+            BEGIN
+                UPDATE logins SET updated_at = CURRENT_TIMESTAMP WHERE id = new.id;
+            END
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_logins_updated_at ON logins (updated_at)",
+            """
+            CREATE TABLE IF NOT EXISTS audit_cache (
+                fingerprint TEXT PRIMARY KEY,
+                scorer TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                guesses REAL NOT NULL,
+                breached INTEGER NOT NULL,
+                feedback TEXT NOT NULL
+            )
+            """,
+        ],
+    ),
+]
+
+
+class MigrationError(Exception):
+    """Raised when a schema step cannot be applied"""
+
+
+def schema_version(db):
+    query = QSqlQuery(db)
+    if query.exec("PRAGMA user_version") and query.next():
+        return query.value(0)
+    return 0
+
+
+def migrate(db):
+    """Apply every schema step newer than the database and return its version"""
+    version = schema_version(db)
+    for step_version, description, statements in MIGRATIONS:
+        if step_version <= version:
+            continue
+        if not db.transaction():
+            raise MigrationError(db.lastError().text())
+        query = QSqlQuery(db)
+        for statement in statements:
+            if not query.exec(statement):
+                error = query.lastError().text()
+                db.rollback()
+                raise MigrationError(
+                    f"Schema step {step_version} ({description}) failed: {error}"
+                )
+        # PRAGMA does not accept bound parameters
+        query.exec(f"PRAGMA user_version = {int(step_version)}")
+        if not db.commit():
+            raise MigrationError(db.lastError().text())
+        version = step_version
+    return version
@@ -0,0 +1,263 @@
+"""Vault-wide security audit with results cached per password fingerprint.
+
+Scoring a password is expensive, so results are stored in audit_cache
+keyed by the entry's keyed fingerprint. A re-audit only decrypts and
+scores the entries whose fingerprint has no cached result, which after a
+few edits is a few rows regardless of the vault's size. Cached results
+are dropped when the scorer or the breach corpus changes.
+"""
+import json
+import time
+
+from PyQt6.QtSql import QSqlQuery
+
+from app.utils.breach_checker import BreachCorpus, CorpusError, corpus_signature
+from app.utils.bulk_crypto import map_batches
+from app.utils.errors import OperationCancelled
+from app.utils.password_strength_checker import STRENGTHS, score_password
+from app.utils.vault_cipher import VaultCipher, from_column
+
+# Bump whenever score_password changes its results
+SCORER_VERSION = 1
+WEAK_SCORE = 2
+
+_worker_corpus = {}
+
+
+def _corpus_for(path):
+    if path not in _worker_corpus:
+        try:
+            _worker_corpus[path] = BreachCorpus(path) if path else None
+        except (OSError, CorpusError):
+            _worker_corpus[path] = None
+    return _worker_corpus[path]
+
+
+def audit_tokens(job, tokens):
+    """Score each token in a worker process.
+
+    Returns (score, guesses, breached, feedback) per token, or None for
+    tokens that do not decrypt.
+    """
+    key, corpus_path = job
+    cipher = VaultCipher(key)
+    corpus = _corpus_for(corpus_path)
+    results = []
+    for token in tokens:
+        try:
+            password = cipher.decrypt(token)
+        except Exception:
+            results.append(None)
+            continue
+        result = score_password(password, corpus)
+        results.append(
+            (
+                result["score"],
+                float(min(result["guesses"], 1e300)),
+                result["breached"],
+                result["feedback"],
+            )
+        )
+    return results
+
+
+class AuditError(Exception):
+    """Raised when the audit cannot read or write the vault"""
+
+
+class SecurityAudit:
+    """Scores every entry and reports weak, breached, reused and old passwords"""
+
+    CHUNK_SIZE = 1000
+
+    def __init__(self, db_manager, corpus_path=None, max_age_days=365):
+        self.db_manager = db_manager
+        self.db = db_manager.db
+        self.corpus_path = corpus_path
+        self.max_age_days = max_age_days
+        self.scorer = f"{SCORER_VERSION}:{corpus_signature(corpus_path or '')}"
+
+    def run(self, progress_callback=None, is_cancelled=None):
+        """Bring the cache up to date and return (report, statistics).
+
+        progress_callback(scored, total) is called after each scored chunk.
+        """
+        started = time.perf_counter()
+        self.db_manager.ensure_fingerprints()
+        self._exec(
+            """
+            DELETE FROM audit_cache
+            WHERE scorer != ?
+               OR fingerprint NOT IN (
+                   SELECT fingerprint FROM logins WHERE fingerprint IS NOT NULL
+               )
+            """,
+            [self.scorer],
+        )
+        total = self._scalar(
+            """
+            SELECT COUNT(*) FROM logins l
+            LEFT JOIN audit_cache a ON a.fingerprint = l.fingerprint
+            WHERE a.fingerprint IS NULL AND l.fingerprint IS NOT NULL
+            """
+        )
+
+        scored = 0
+        chunks = map_batches(
+            audit_tokens,
+            (self.db_manager.key, self.corpus_path),
+            self._iter_unscored_chunks(),
+            lambda rows: [row[1] for row in rows],
+        )
+        try:
+            for rows, results in chunks:
+                if is_cancelled and is_cancelled():
+                    raise OperationCancelled()
+                self._store(rows, results)
+                scored += len(rows)
+                if progress_callback:
+                    progress_callback(scored, total)
+        finally:
+            chunks.close()
+
+        report = self.report()
+        return report, {
+            "scored": scored,
+            "cached": self._scalar("SELECT COUNT(*) FROM logins") - scored,
+            "seconds": time.perf_counter() - started,
+        }
+
+    def report(self):
+        """Return the entries with at least one issue, most severe first"""
+        # Only flagged entries reach Python; CROSS JOIN makes SQLite scan the
+        # small cache rows and probe logins by fingerprint instead of the reverse
+        query = self._exec(
+            """
+            WITH reused AS (
+                SELECT fingerprint, COUNT(*) AS uses FROM logins
+                WHERE fingerprint IS NOT NULL
+                GROUP BY fingerprint
+                HAVING COUNT(*) > 1
+            ),
+            flagged AS (
+                SELECT l.id FROM audit_cache a
+                CROSS JOIN logins l ON l.fingerprint = a.fingerprint
+                WHERE a.score <= ? OR a.breached > 0
+                UNION
+                SELECT l.id FROM reused r
+                CROSS JOIN logins l ON l.fingerprint = r.fingerprint
+                UNION
+                SELECT id FROM logins WHERE ? > 0 AND updated_at < datetime('now', ?)
+            )
+            SELECT l.id, l.website, l.username, a.score, a.breached, a.feedback,
+                   COALESCE(r.uses, 1),
+                   CAST(julianday('now') - julianday(l.updated_at) AS INTEGER)
+            FROM flagged f
+            JOIN logins l ON l.id = f.id
+            JOIN audit_cache a ON a.fingerprint = l.fingerprint
+            LEFT JOIN reused r ON r.fingerprint = l.fingerprint
+            """,
+            [WEAK_SCORE, self.max_age_days, f"-{self.max_age_days} days"],
+        )
+        report = []
+        while query.next():
+            score = query.value(3)
+            breached = query.value(4)
+            uses = query.value(6)
+            age_days = query.value(7) or 0
+            issues = []
+            if breached:
+                issues.append("Breached")
+            if score <= WEAK_SCORE:
+                issues.append("Weak")
+            if uses > 1:
+                issues.append("Reused")
+            if self.max_age_days and age_days > self.max_age_days:
+                issues.append("Old")
+            report.append(
+                {
+                    "id": query.value(0),
+                    "website": query.value(1),
+                    "username": query.value(2),
+                    "score": score,
+                    "strength": STRENGTHS[score][0],
+                    "breached": breached,
+                    "uses": uses,
+                    "age_days": age_days,
+                    "issues": issues,
+                    "feedback": json.loads(query.value(5)),
+                }
+            )
+        report.sort(key=lambda entry: (-len(entry["issues"]), entry["score"]))
+        return report
+
+    def _iter_unscored_chunks(self):
+        """Yield (id, token, fingerprint) rows without a cached result"""
+        last_id = -1
+        while True:
+            query = self._exec(
+                """
+                SELECT l.id, l.encrypted_password, l.fingerprint
+                FROM logins l
+                LEFT JOIN audit_cache a ON a.fingerprint = l.fingerprint
+                WHERE a.fingerprint IS NULL AND l.fingerprint IS NOT NULL AND l.id > ?
+                ORDER BY l.id
+                LIMIT ?
+                """,
+                [last_id, self.CHUNK_SIZE],
+            )
+            rows = []
+            while query.next():
+                rows.append(
+                    (query.value(0), from_column(query.value(1)), query.value(2))
+                )
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def _store(self, rows, results):
+        stored = [(row[2], result) for row, result in zip(rows, results) if result]
+        if not stored:
+            return
+        if not self.db.transaction():
+            raise AuditError(self.db.lastError().text())
+        try:
+            query = self._prepare(
+                """
+                INSERT OR REPLACE INTO audit_cache
+                    (fingerprint, scorer, score, guesses, breached, feedback)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """
+            )
+            query.addBindValue([fingerprint for fingerprint, _ in stored])
+            query.addBindValue([self.scorer] * len(stored))
+            query.addBindValue([result[0] for _, result in stored])
+            query.addBindValue([result[1] for _, result in stored])
+            query.addBindValue([result[2] for _, result in stored])
+            query.addBindValue([json.dumps(result[3]) for _, result in stored])
+            if not query.execBatch():
+                raise AuditError(query.lastError().text())
+            if not self.db.commit():
+                raise AuditError(self.db.lastError().text())
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _prepare(self, sql):
+        query = QSqlQuery(self.db)
+        if not query.prepare(sql):
+            raise AuditError(query.lastError().text())
+        return query
+
+    def _exec(self, sql, values=()):
+        query = self._prepare(sql)
+        for value in values:
+            query.addBindValue(value)
+        if not query.exec():
+            raise AuditError(query.lastError().text())
+        return query
+
+    def _scalar(self, sql):
+        query = self._exec(sql)
+        return query.value(0) if query.next() else None
@@ -0,0 +1,182 @@
+"""Near-duplicate password detection with a segment n-gram index.
+
+Comparing every pair of passwords is O(n^2) edit distances. Instead each
+password is cut into max_distance + 1 segments: k edits can touch at most
+k of them, so two passwords within k edits always share one segment
+verbatim, at most k characters from where it started. Indexing the
+segments turns the search into a few dictionary lookups per password,
+and only passwords sharing a segment get the exact edit distance check.
+Unlike a BK-tree this stays fast on random, high-entropy passwords, which
+are all roughly the same distance from each other.
+"""
+from threading import RLock
+
+
+def levenshtein(a, b, limit=None):
+    """Return the edit distance of a and b, or limit + 1 once it exceeds limit"""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def segments(length, parts):
+    """Split range(length) into parts near-equal (start, width) segments"""
+    width, extra = divmod(length, parts)
+    bounds = []
+    start = 0
+    for part in range(parts):
+        size = width + (part >= parts - extra)
+        bounds.append((start, size))
+        start += size
+    return bounds
+
+
+class SimilarityIndex:
+    """Passwords of the unlocked vault, grouped for near-duplicate search.
+
+    Holds plaintext, so the owner must reset it when the vault is locked.
+    Clusters are cached per distance until a password is added or removed.
+    The index may be shared with background workers: every method takes
+    lock, and add/remove do nothing until populate() has filled the index,
+    since populate() reads the vault after they were committed.
+    """
+
+    def __init__(self):
+        self.lock = RLock()
+        self.ready = False
+        self.ids_by_password = {}
+        self.password_by_id = {}
+        self._clusters = {}
+
+    def reset(self):
+        with self.lock:
+            self.ready = False
+            self.ids_by_password = {}
+            self.password_by_id = {}
+            self._clusters = {}
+
+    def populate(self, entries):
+        """Fill the index from (id, password) pairs and mark it ready"""
+        with self.lock:
+            self.reset()
+            try:
+                for entry_id, password in entries:
+                    self._add(entry_id, password)
+            except BaseException:
+                self.reset()
+                raise
+            self.ready = True
+
+    def add(self, entry_id, password):
+        with self.lock:
+            if self.ready:
+                self._add(entry_id, password)
+
+    def _add(self, entry_id, password):
+        self._remove(entry_id)
+        self.ids_by_password.setdefault(password, []).append(entry_id)
+        self.password_by_id[entry_id] = password
+        self._clusters.clear()
+
+    def remove(self, entry_id):
+        with self.lock:
+            self._remove(entry_id)
+
+    def _remove(self, entry_id):
+        password = self.password_by_id.pop(entry_id, None)
+        if password is None:
+            return
+        ids = self.ids_by_password[password]
+        ids.remove(entry_id)
+        if not ids:
+            del self.ids_by_password[password]
+        self._clusters.clear()
+
+    def ids(self, password):
+        with self.lock:
+            return list(self.ids_by_password.get(password, []))
+
+    def similar_pairs(self, max_distance, skip=None):
+        """Yield each pair of distinct passwords within max_distance once.
+
+        Candidates for which skip(password, other) is true are not checked.
+        """
+        parts = max_distance + 1
+        # (length, segment number, segment text) -> passwords indexed so far
+        index = {}
+        # length -> its segments, for the lengths indexed so far
+        bounds = {}
+        for password in sorted(self.ids_by_password, key=len):
+            length = len(password)
+            candidates = set()
+            for other_length, other_bounds in bounds.items():
+                if length - other_length > max_distance:
+                    continue
+                for number, (start, width) in enumerate(other_bounds):
+                    first = max(0, start - max_distance)
+                    last = min(length - width, start + max_distance)
+                    for position in range(first, last + 1):
+                        found = index.get(
+                            (other_length, number, password[position:position + width])
+                        )
+                        if found:
+                            candidates.update(found)
+            for other in candidates:
+                if skip and skip(password, other):
+                    continue
+                if levenshtein(password, other, max_distance) <= max_distance:
+                    yield password, other
+
+            if length not in bounds:
+                bounds[length] = segments(length, parts)
+            for number, (start, width) in enumerate(bounds[length]):
+                key = (length, number, password[start:start + width])
+                index.setdefault(key, []).append(password)
+
+    def clusters(self, max_distance):
+        """Return lists of distinct passwords within max_distance of each other.
+
+        Clusters are the connected components of the "within max_distance"
+        relation, so a chain like a ~ b ~ c lands in one cluster.
+        """
+        with self.lock:
+            if max_distance not in self._clusters:
+                self._clusters[max_distance] = self._find_clusters(max_distance)
+            return self._clusters[max_distance]
+
+    def _find_clusters(self, max_distance):
+        parent = {password: password for password in self.ids_by_password}
+
+        def find(password):
+            while parent[password] != password:
+                parent[password] = parent[parent[password]]
+                password = parent[password]
+            return password
+
+        # Pairs already joined through other passwords need no distance check
+        joined = lambda password, other: find(password) == find(other)
+        for password, other in self.similar_pairs(max_distance, joined):
+            root, other_root = find(password), find(other)
+            if root != other_root:
+                parent[other_root] = root
+
+        groups = {}
+        for password in self.ids_by_password:
+            groups.setdefault(find(password), []).append(password)
+        return [group for group in groups.values() if len(group) > 1]
@@ -0,0 +1,361 @@
+"""Incremental, deduplicated snapshots of the vault.
+
+A snapshot stores the rows of the tables that hold user data, cut into
+chunks of CHUNK_ROWS consecutive ids. Each chunk is compressed and saved
+under the SHA-256 of its contents, so a chunk that did not change since
+an earlier snapshot is never written again: a snapshot costs the chunks
+its changes touched plus a small manifest listing its chunks. Derived
+tables (the full-text index, caches, re-encryption staging) are rebuilt
+on restore instead of being stored.
+
+Layout of a store directory:
+
+    chunks/ab/abcdef...    zlib compressed JSON rows
+    manifests/<id>.json    schema version, columns and chunk hashes
+
+Rows are read through the caller's QtSql connection in one read
+transaction, so a snapshot is consistent and never blocks writers.
+"""
+import base64
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+from PyQt6.QtCore import QByteArray
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+from app.utils.errors import OperationCancelled
+from app.utils.schema import MIGRATIONS, migrate, schema_version
+from app.utils.vault_backup import remove_quietly
+from app.utils.vault_cipher import to_column
+
+# Held while writing, pruning or reading the store, so garbage collection
+# never removes a chunk a snapshot in progress is about to reference
+_store_lock = threading.Lock()
+
+# How each retention rule groups snapshots; one is kept per period
+_PERIODS = {
+    "hourly": lambda created: created.strftime("%Y-%m-%d %H"),
+    "daily": lambda created: created.strftime("%Y-%m-%d"),
+    "weekly": lambda created: created.isocalendar()[:2],
+}
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot cannot be written or read back"""
+
+
+def _encode(value):
+    if isinstance(value, QByteArray):
+        value = bytes(value)
+    if isinstance(value, bytes):
+        return {"b": base64.b64encode(value).decode()}
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        return to_column(base64.b64decode(value["b"]))
+    return value
+
+
+class SnapshotStore:
+    CHUNK_ROWS = 512
+    # (table, integer column that orders the rows and picks their chunk)
+    TABLES = [("logins", "id"), ("password_history", "id"), ("vault_meta", None)]
+    # Snapshots kept per rule, see "snapshots/keep_<rule>"
+    RETENTION = {"hourly": 24, "daily": 7, "weekly": 8}
+    # Unreferenced chunks younger than this survive garbage collection, in
+    # case another process is writing a snapshot that uses them
+    GC_GRACE_SECONDS = 3600
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.chunk_directory = os.path.join(directory, "chunks")
+        self.manifest_directory = os.path.join(directory, "manifests")
+
+    def create(self, db, progress_callback=None, is_cancelled=None):
+        """Snapshot the vault open on db and return the new manifest.
+
+        Returns None without writing anything if the vault did not change
+        since the latest snapshot. progress_callback(rows) is called after
+        each chunk.
+        """
+        with _store_lock:
+            os.makedirs(self.chunk_directory, exist_ok=True)
+            os.makedirs(self.manifest_directory, exist_ok=True)
+
+            tables = {}
+            rows = 0
+            if not db.transaction():
+                raise SnapshotError(db.lastError().text())
+            try:
+                version = schema_version(db)
+                for table, order_column in self.TABLES:
+                    columns = self._columns(db, table)
+                    chunks = []
+                    for chunk in self._iter_chunks(db, table, columns, order_column):
+                        if is_cancelled and is_cancelled():
+                            raise OperationCancelled()
+                        chunks.append(self._store_chunk(chunk))
+                        rows += len(chunk)
+                        if progress_callback:
+                            progress_callback(rows)
+                    tables[table] = {"columns": columns, "chunks": chunks}
+                entries = self._scalar(db, "SELECT COUNT(*) FROM logins")
+            finally:
+                # Nothing was written; this only ends the read transaction
+                db.rollback()
+
+            latest = self._latest()
+            if latest is not None and latest["tables"] == tables:
+                return None
+
+            created = datetime.datetime.now(datetime.timezone.utc)
+            manifest = {
+                "id": created.strftime("%Y%m%dT%H%M%S%fZ"),
+                "created": created.isoformat(),
+                "schema_version": version,
+                "entries": entries,
+                "tables": tables,
+            }
+            self._write_file(
+                self._manifest_path(manifest["id"]),
+                json.dumps(manifest, indent=1).encode(),
+            )
+            return manifest
+
+    def snapshots(self):
+        """Return the manifests of every snapshot, newest first"""
+        with _store_lock:
+            return self._snapshots()
+
+    def restore(self, snapshot_id, path, progress_callback=None, is_cancelled=None):
+        """Rebuild snapshot snapshot_id as a new vault file at path.
+
+        progress_callback(done, total) reports restored rows. path is
+        replaced if it exists and removed again on failure.
+        """
+        with _store_lock:
+            try:
+                with open(self._manifest_path(snapshot_id), "rb") as file:
+                    manifest = json.load(file)
+            except (OSError, ValueError) as e:
+                raise SnapshotError(f"Snapshot {snapshot_id} cannot be read: {e}")
+            if manifest["schema_version"] > MIGRATIONS[-1][0]:
+                raise SnapshotError("The snapshot was made by a newer version")
+
+            remove_quietly(path)
+            name = f"snapshot-restore-{threading.get_ident()}"
+            try:
+                self._fill(
+                    QSqlDatabase.addDatabase("QSQLITE", name),
+                    path,
+                    manifest,
+                    progress_callback,
+                    is_cancelled,
+                )
+            except BaseException:
+                remove_quietly(path)
+                raise
+            finally:
+                QSqlDatabase.removeDatabase(name)
+
+    def prune(self, retention=None, now=None):
+        """Delete the snapshots retention no longer keeps and their unused chunks.
+
+        retention maps "hourly", "daily" and "weekly" to how many periods
+        keep their newest snapshot; the newest snapshot is always kept.
+        Returns the ids of the deleted snapshots.
+        """
+        retention = self.RETENTION if retention is None else retention
+        with _store_lock:
+            snapshots = self._snapshots()
+            keep = {snapshot["id"] for snapshot in snapshots[:1]}
+            for rule, count in retention.items():
+                periods = set()
+                for snapshot in snapshots:
+                    if len(periods) >= count:
+                        break
+                    created = datetime.datetime.fromisoformat(snapshot["created"])
+                    period = _PERIODS[rule](created.astimezone())
+                    if period not in periods:
+                        periods.add(period)
+                        keep.add(snapshot["id"])
+
+            deleted = []
+            for snapshot in snapshots:
+                if snapshot["id"] not in keep:
+                    remove_quietly(self._manifest_path(snapshot["id"]))
+                    deleted.append(snapshot["id"])
+            self._collect_garbage(
+                [snapshot for snapshot in snapshots if snapshot["id"] in keep],
+                now or time.time(),
+            )
+            return deleted
+
+    def disk_usage(self):
+        """Return the bytes the store takes on disk"""
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return total
+
+    def _snapshots(self):
+        if not os.path.isdir(self.manifest_directory):
+            return []
+        snapshots = []
+        for name in os.listdir(self.manifest_directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.manifest_directory, name), "rb") as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable snapshot {name}: {str(e)}")
+        snapshots.sort(key=lambda snapshot: snapshot["created"], reverse=True)
+        return snapshots
+
+    def _latest(self):
+        snapshots = self._snapshots()
+        return snapshots[0] if snapshots else None
+
+    def _collect_garbage(self, snapshots, now):
+        referenced = {
+            digest
+            for snapshot in snapshots
+            for table in snapshot["tables"].values()
+            for digest in table["chunks"]
+        }
+        for root, _, files in os.walk(self.chunk_directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name in referenced:
+                    continue
+                if now - os.path.getmtime(path) > self.GC_GRACE_SECONDS:
+                    remove_quietly(path)
+
+    def _columns(self, db, table):
+        query = QSqlQuery(db)
+        if not query.exec(f"PRAGMA table_info({table})"):
+            raise SnapshotError(query.lastError().text())
+        columns = []
+        while query.next():
+            columns.append(query.value(1))
+        return columns
+
+    def _iter_chunks(self, db, table, columns, order_column):
+        """Yield the rows of table, one list per chunk"""
+        query = QSqlQuery(db)
+        query.setForwardOnly(True)
+        order = order_column or columns[0]
+        if not query.exec(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {order}"):
+            raise SnapshotError(query.lastError().text())
+        order_index = columns.index(order)
+        chunk, bucket = [], None
+        while query.next():
+            row = [_encode(query.value(index)) for index in range(len(columns))]
+            row_bucket = row[order_index] // self.CHUNK_ROWS if order_column else 0
+            if chunk and row_bucket != bucket:
+                yield chunk
+                chunk = []
+            bucket = row_bucket
+            chunk.append(row)
+        if chunk:
+            yield chunk
+
+    def _store_chunk(self, rows):
+        data = json.dumps(rows, separators=(",", ":")).encode()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            # Touched so a concurrent garbage collection sees it as in use
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write_file(path, zlib.compress(data, 6))
+        return digest
+
+    def _load_chunk(self, digest):
+        try:
+            with open(self._chunk_path(digest), "rb") as file:
+                data = zlib.decompress(file.read())
+        except (OSError, zlib.error) as e:
+            raise SnapshotError(f"Chunk {digest} cannot be read: {e}")
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise SnapshotError(f"Chunk {digest} is damaged")
+        return json.loads(data)
+
+    def _fill(self, db, path, manifest, progress_callback, is_cancelled):
+        """Create the current schema in path and insert the snapshot's rows"""
+        db.setDatabaseName(path)
+        if not db.open():
+            raise SnapshotError(f"Could not create {path}: {db.lastError().text()}")
+        try:
+            migrate(db)
+            total = manifest["entries"]
+            done = 0
+            if not db.transaction():
+                raise SnapshotError(db.lastError().text())
+            try:
+                for table, _ in self.TABLES:
+                    stored = manifest["tables"].get(table)
+                    if stored is None:
+                        continue
+                    # Columns added since the snapshot keep their defaults
+                    current = self._columns(db, table)
+                    indexes = [
+                        index
+                        for index, column in enumerate(stored["columns"])
+                        if column in current
+                    ]
+                    columns = [stored["columns"][index] for index in indexes]
+                    query = QSqlQuery(db)
+                    query.prepare(
+                        f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' * len(columns))})"
+                    )
+                    for digest in stored["chunks"]:
+                        if is_cancelled and is_cancelled():
+                            raise OperationCancelled()
+                        rows = self._load_chunk(digest)
+                        for index in indexes:
+                            query.addBindValue([_decode(row[index]) for row in rows])
+                        if not query.execBatch():
+                            raise SnapshotError(query.lastError().text())
+                        if table == "logins":
+                            done += len(rows)
+                            if progress_callback:
+                                progress_callback(done, total)
+                if not db.commit():
+                    raise SnapshotError(db.lastError().text())
+            except BaseException:
+                db.rollback()
+                raise
+        finally:
+            db.close()
+
+    def _scalar(self, db, sql):
+        query = QSqlQuery(db)
+        if not query.exec(sql):
+            raise SnapshotError(query.lastError().text())
+        return query.value(0) if query.next() else 0
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunk_directory, digest[:2], digest)
+
+    def _manifest_path(self, snapshot_id):
+        return os.path.join(self.manifest_directory, f"{snapshot_id}.json")
+
+    def _write_file(self, path, data):
+        """Write data to path through a temporary file, so readers never see half of it"""
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
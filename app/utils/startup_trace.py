@@ -0,0 +1,50 @@
+"""Phase timings from process start to an interactive main window.
+
+main.py enables tracing for --trace-startup. Code along the startup path
+calls mark() when a phase ends; marks are free while tracing is off.
+finish() prints how long each phase took and ends the trace.
+"""
+import sys
+import time
+
+# Taken when main.py imports this module, before Qt or the app is loaded
+_started = time.perf_counter()
+_enabled = False
+_phases = []
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def is_enabled():
+    return _enabled
+
+
+def mark(phase):
+    """Record that phase ended now"""
+    if _enabled:
+        _phases.append((phase, time.perf_counter()))
+
+
+def finish(phase=None):
+    """Mark phase, print the timing breakdown to stderr and stop tracing"""
+    global _enabled
+    if not _enabled:
+        return
+    if phase:
+        mark(phase)
+    _enabled = False
+
+    print("Startup trace (ms):", file=sys.stderr)
+    print(f"  {'phase':<28}{'took':>10}{'total':>10}", file=sys.stderr)
+    previous = _started
+    for name, at in _phases:
+        print(
+            f"  {name:<28}{(at - previous) * 1000:>10.1f}"
+            f"{(at - _started) * 1000:>10.1f}",
+            file=sys.stderr,
+        )
+        previous = at
+    _phases.clear()
@@ -0,0 +1,151 @@
+"""Aho-Corasick automaton over the bundled frequency dictionaries.
+
+The word lists in strength_data/ are ranked: the first line is the most
+common entry. They hold the most common 30,000 passwords, 20,000 English
+words and 10,000 first names and surnames of the zxcvbn frequency lists
+(MIT license, see strength_data/LICENSE.zxcvbn); the English and name
+lists merge several source lists by best rank.
+
+They are compiled ahead of time into strength_data/automaton.json, which
+holds every trie node with its transitions, failure link and the
+dictionary words ending there (failure-chain outputs already merged), so
+matching a password is a single left-to-right pass. The file has a header
+line and then one JSON line per node, so loading it is a Python loop that
+lets other threads run instead of one long parse. Rebuild the file after
+editing a word list with:
+
+    python -m app.utils.strength_automaton
+"""
+import json
+import os
+from collections import deque
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "strength_data")
+AUTOMATON_PATH = os.path.join(DATA_DIR, "automaton.json")
+DICTIONARIES = ["passwords", "english", "names"]
+MIN_WORD_LENGTH = 3
+FORMAT_VERSION = 2
+
+
+def read_ranked_words(path):
+    """Return {word: rank} for a ranked word list, keeping the best rank"""
+    ranks = {}
+    with open(path, encoding="utf-8") as wordlist:
+        for line in wordlist:
+            word = line.strip().lower()
+            if len(word) >= MIN_WORD_LENGTH and word not in ranks:
+                ranks[word] = len(ranks) + 1
+    return ranks
+
+
+def compile_automaton(dictionaries):
+    """Build the automaton for {dictionary name: {word: rank}}"""
+    names = list(dictionaries)
+    transitions = [{}]
+    outputs = [[]]
+    for dictionary, ranks in enumerate(dictionaries.values()):
+        for word, rank in ranks.items():
+            node = 0
+            for char in word:
+                following = transitions[node].get(char)
+                if following is None:
+                    following = len(transitions)
+                    transitions[node][char] = following
+                    transitions.append({})
+                    outputs.append([])
+                node = following
+            outputs[node].append([dictionary, rank, len(word)])
+
+    fail = [0] * len(transitions)
+    queue = deque(transitions[0].values())
+    while queue:
+        node = queue.popleft()
+        for char, child in transitions[node].items():
+            queue.append(child)
+            link = fail[node]
+            while link and char not in transitions[link]:
+                link = fail[link]
+            candidate = transitions[link].get(char, 0)
+            fail[child] = candidate if candidate != child else 0
+            outputs[child].extend(outputs[fail[child]])
+
+    return {
+        "version": FORMAT_VERSION,
+        "dictionaries": names,
+        "sizes": [len(ranks) for ranks in dictionaries.values()],
+        "nodes": [
+            [transitions[node], fail[node], outputs[node]]
+            for node in range(len(transitions))
+        ],
+    }
+
+
+def write_automaton(compiled, path=AUTOMATON_PATH):
+    """Write compiled as a header line followed by one line per node"""
+    header = {name: value for name, value in compiled.items() if name != "nodes"}
+    with open(path, "w", encoding="utf-8") as output:
+        output.write(json.dumps(header, separators=(",", ":"), sort_keys=True))
+        output.write("\n")
+        for node in compiled["nodes"]:
+            output.write(json.dumps(node, separators=(",", ":"), sort_keys=True))
+            output.write("\n")
+
+
+def read_automaton(path=AUTOMATON_PATH):
+    """Return the compiled automaton write_automaton stored at path"""
+    with open(path, encoding="utf-8") as compiled:
+        header = json.loads(compiled.readline())
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError("Unsupported automaton format, rebuild it")
+        header["nodes"] = [json.loads(line) for line in compiled]
+    return header
+
+
+class DictionaryAutomaton:
+    """Finds every dictionary word inside a text in one pass"""
+
+    def __init__(self, compiled):
+        if compiled.get("version") != FORMAT_VERSION:
+            raise ValueError("Unsupported automaton format, rebuild it")
+        self.dictionaries = compiled["dictionaries"]
+        self.sizes = compiled["sizes"]
+        nodes = compiled["nodes"]
+        self.transitions = [node[0] for node in nodes]
+        self.fail = [node[1] for node in nodes]
+        self.outputs = [
+            [(self.dictionaries[d], rank, length) for d, rank, length in node[2]]
+            for node in nodes
+        ]
+
+    @classmethod
+    def load(cls, path=AUTOMATON_PATH):
+        return cls(read_automaton(path))
+
+    def find(self, text):
+        """Yield (start, end, dictionary, rank) for every match; end is inclusive"""
+        transitions = self.transitions
+        fail = self.fail
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in transitions[node]:
+                node = fail[node]
+            node = transitions[node].get(char, 0)
+            for dictionary, rank, length in self.outputs[node]:
+                yield position - length + 1, position, dictionary, rank
+
+
+def main():
+    dictionaries = {
+        name: read_ranked_words(os.path.join(DATA_DIR, f"{name}.txt"))
+        for name in DICTIONARIES
+    }
+    compiled = compile_automaton(dictionaries)
+    write_automaton(compiled)
+    print(
+        f"Wrote {AUTOMATON_PATH}: {len(compiled['nodes'])} nodes, "
+        + ", ".join(f"{name} {len(words)}" for name, words in dictionaries.items())
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Background rewrite of Fernet tokens into the binary format of vault_cipher.
+
+Legacy rows are the ones whose encrypted_password is still TEXT. They are
+converted in chunks by a process pool, and each chunk is written back in
+its own short transaction with a compare-and-swap UPDATE: a row edited
+meanwhile keeps its new value, the vault stays usable throughout, and an
+interrupted run simply carries on the next time.
+"""
+import time
+
+from PyQt6.QtSql import QSqlQuery
+
+from app.utils.bulk_crypto import map_batches, upgrade_tokens
+from app.utils.errors import OperationCancelled
+from app.utils.reencryption import rewrite_lock
+from app.utils.vault_cipher import from_column, to_column
+
+
+class TokenMigrationError(Exception):
+    """Raised when converted tokens cannot be written back"""
+
+
+class TokenMigration:
+    CHUNK_SIZE = 2000
+    TABLES = ("logins", "password_history")
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.db = db_manager.db
+
+    def pending(self):
+        """Return how many stored tokens still use the legacy format"""
+        return sum(
+            self._scalar(
+                f"SELECT COUNT(*) FROM {table} "
+                "WHERE typeof(encrypted_password) = 'text'"
+            )
+            for table in self.TABLES
+        )
+
+    def run(self, progress_callback=None, is_cancelled=None):
+        """Convert every legacy token and return a dict of statistics.
+
+        progress_callback(done, total) is called after each chunk. Tokens
+        that do not decrypt under the current key are left alone.
+        """
+        started = time.perf_counter()
+        total = self.pending()
+        done = converted = 0
+        for table in self.TABLES:
+            chunks = map_batches(
+                upgrade_tokens,
+                self.db_manager.key,
+                self._iter_legacy_chunks(table),
+                lambda rows: [row[1] for row in rows],
+            )
+            try:
+                for rows, upgraded in chunks:
+                    if is_cancelled and is_cancelled():
+                        raise OperationCancelled()
+                    converted += self._store(table, rows, upgraded)
+                    done += len(rows)
+                    if progress_callback:
+                        progress_callback(done, total)
+            finally:
+                chunks.close()
+        return {
+            "rows": converted,
+            "skipped": done - converted,
+            "seconds": time.perf_counter() - started,
+        }
+
+    def _iter_legacy_chunks(self, table):
+        """Yield (id, token) rows that still hold a Fernet token"""
+        last_id = -1
+        while True:
+            query = QSqlQuery(self.db)
+            query.prepare(
+                f"""
+                SELECT id, encrypted_password FROM {table}
+                WHERE typeof(encrypted_password) = 'text' AND id > ?
+                ORDER BY id
+                LIMIT ?
+                """
+            )
+            query.addBindValue(last_id)
+            query.addBindValue(self.CHUNK_SIZE)
+            if not query.exec():
+                raise TokenMigrationError(query.lastError().text())
+            rows = []
+            while query.next():
+                rows.append((query.value(0), from_column(query.value(1))))
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def _store(self, table, rows, upgraded):
+        """Write back the converted tokens of rows that did not change since they were read"""
+        stored = [(row, token) for row, token in zip(rows, upgraded) if token]
+        if not stored:
+            return 0
+        with rewrite_lock:
+            if not self.db.transaction():
+                raise TokenMigrationError(self.db.lastError().text())
+            try:
+                query = QSqlQuery(self.db)
+                query.prepare(
+                    f"UPDATE {table} SET encrypted_password = ? "
+                    "WHERE id = ? AND encrypted_password = ?"
+                )
+                query.addBindValue([to_column(token) for _, token in stored])
+                query.addBindValue([row[0] for row, _ in stored])
+                query.addBindValue([row[1] for row, _ in stored])
+                if not query.execBatch():
+                    raise TokenMigrationError(query.lastError().text())
+                if not self.db.commit():
+                    raise TokenMigrationError(self.db.lastError().text())
+            except Exception:
+                self.db.rollback()
+                raise
+        return len(stored)
+
+    def _scalar(self, sql):
+        query = QSqlQuery(self.db)
+        if not query.exec(sql):
+            raise TokenMigrationError(query.lastError().text())
+        return query.value(0) if query.next() else 0
@@ -0,0 +1,127 @@
+"""Verification and atomic placement of vault backups.
+
+Only files no Qt connection has open are touched here. PyQt's SQLite
+driver bundles its own copy of SQLite, and two copies in one process do
+not see each other's POSIX locks, so the live vault is only ever read
+through QtSql (see DatabaseManager.backup_to_file). Files produced here are
+written under a temporary name, checked, synced and then renamed, so a
+crash never leaves a half-written backup or vault behind.
+"""
+import os
+import sqlite3
+
+from app.utils.errors import OperationCancelled
+
+REQUIRED_TABLES = ("logins", "vault_meta")
+STEP_PAGES = 256  # pages copied per step of the backup API
+
+
+class BackupError(Exception):
+    """Raised when a backup or a file to restore fails verification"""
+
+
+def _connect(path, read_only=False):
+    if read_only:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    return sqlite3.connect(path)
+
+
+def verify(path):
+    """Raise BackupError unless path is an intact vault"""
+    try:
+        connection = _connect(path, read_only=True)
+        try:
+            problems = [row[0] for row in connection.execute("PRAGMA integrity_check")]
+            tables = {
+                row[0]
+                for row in connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                )
+            }
+        finally:
+            connection.close()
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"{path} is not a readable database: {e}")
+    if problems != ["ok"]:
+        raise BackupError(f"{path} is damaged: {'; '.join(problems[:5])}")
+    missing = [table for table in REQUIRED_TABLES if table not in tables]
+    if missing:
+        raise BackupError(f"{path} is not a password vault")
+
+
+def read_meta(path):
+    """Return the vault_meta values of the vault at path"""
+    connection = _connect(path, read_only=True)
+    try:
+        return dict(connection.execute("SELECT name, value FROM vault_meta"))
+    finally:
+        connection.close()
+
+
+def write_meta(path, values):
+    """Store vault_meta values in the vault at path, which nothing else has open"""
+    connection = _connect(path)
+    try:
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO vault_meta (name, value) VALUES (?, ?)",
+                values.items(),
+            )
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"Could not update {path}: {e}")
+    finally:
+        connection.close()
+
+
+def copy_database(source, target, progress_callback=None, is_cancelled=None):
+    """Copy the database at source into target with the backup API.
+
+    The copy runs in steps of STEP_PAGES pages; progress_callback(done,
+    total) is called after each. target is replaced if it exists.
+    """
+    if os.path.exists(target):
+        os.remove(target)
+
+    def step(status, remaining, total):
+        if is_cancelled and is_cancelled():
+            raise OperationCancelled()
+        if progress_callback:
+            progress_callback(total - remaining, total)
+
+    source_connection = _connect(source, read_only=True)
+    try:
+        target_connection = _connect(target)
+        try:
+            source_connection.backup(target_connection, pages=STEP_PAGES, progress=step)
+        finally:
+            target_connection.close()
+    except sqlite3.DatabaseError as e:
+        remove_quietly(target)
+        raise BackupError(f"Could not copy {source}: {e}")
+    except BaseException:
+        remove_quietly(target)
+        raise
+    finally:
+        source_connection.close()
+
+
+def publish(temporary_path, path):
+    """Durably rename temporary_path to path, replacing it atomically"""
+    with open(temporary_path, "rb") as file:
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+    if os.name != "posix":
+        return
+    # The rename itself only survives a crash once the directory is synced
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
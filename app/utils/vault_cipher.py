@@ -0,0 +1,124 @@
+"""Encryption of stored passwords.
+
+Passwords are stored as compact binary tokens: a version byte, a 12 byte
+nonce and the AES-256-GCM ciphertext with its 16 byte tag, 29 bytes of
+overhead in a BLOB. Vaults written before this format hold base64 Fernet
+tokens as TEXT (AES-CBC plus HMAC, about 57 bytes of overhead before
+base64 grows everything by a third); those are still read, and
+TokenMigration rewrites them in the background.
+
+The key that encrypts passwords is the vault's random data key, stored in
+vault_meta wrapped under the key derived from the master password (see
+DatabaseManager.unlock), so changing the master password only re-wraps it.
+
+Like bulk_crypto, this module is used by worker processes and must stay
+importable without Qt.
+"""
+import base64
+import hashlib
+import hmac
+import os
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+AES_GCM_V1 = 1
+NONCE_SIZE = 12
+
+
+def fernet_for(key):
+    """Build a Fernet cipher from a raw 32 byte key"""
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def aead_key(key):
+    """Derive the AES-GCM key from the vault key, so Fernet and GCM never share one"""
+    return hmac.new(key, b"password-manager aes-gcm key", hashlib.sha256).digest()
+
+
+def wrapping_key(master_key):
+    """Derive the key that wraps the data key from the master key"""
+    return hmac.new(master_key, b"password-manager key wrap", hashlib.sha256).digest()
+
+
+def wrap_key(master_key, data_key):
+    """Encrypt data_key under master_key, as text for vault_meta"""
+    header = bytes([AES_GCM_V1])
+    nonce = os.urandom(NONCE_SIZE)
+    wrapped = AESGCM(wrapping_key(master_key)).encrypt(nonce, data_key, header)
+    return base64.urlsafe_b64encode(header + nonce + wrapped).decode()
+
+
+def unwrap_key(master_key, wrapped):
+    """Return the data key wrap_key stored, raising InvalidToken for another master key"""
+    try:
+        token = base64.urlsafe_b64decode(wrapped.encode())
+    except ValueError:
+        raise InvalidToken()
+    if len(token) <= 1 + NONCE_SIZE or token[0] != AES_GCM_V1:
+        raise InvalidToken()
+    try:
+        return AESGCM(wrapping_key(master_key)).decrypt(
+            token[1:1 + NONCE_SIZE], token[1 + NONCE_SIZE:], token[:1]
+        )
+    except InvalidTag:
+        raise InvalidToken()
+
+
+def is_legacy_token(token):
+    """Return True for a Fernet token written before the binary format"""
+    return isinstance(token, str)
+
+
+def from_column(value):
+    """Return the token stored in an encrypted_password column.
+
+    Fernet tokens come back as str. Binary tokens come back as QByteArray,
+    which is turned into bytes so it can be sent to worker processes.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    return bytes(value)
+
+
+def to_column(token):
+    """Return token in a form QSqlQuery binds as TEXT or BLOB"""
+    if token is None or isinstance(token, str):
+        return token
+    # Imported here so worker processes never load Qt; binding Python bytes
+    # directly would store their repr as TEXT
+    from PyQt6.QtCore import QByteArray
+
+    return QByteArray(token)
+
+
+class VaultCipher:
+    """Encrypts passwords as binary AES-GCM tokens and decrypts either format"""
+
+    def __init__(self, key):
+        self.key = key
+        self._aead = AESGCM(aead_key(key))
+        self._fernet = None
+
+    def encrypt(self, password):
+        header = bytes([AES_GCM_V1])
+        nonce = os.urandom(NONCE_SIZE)
+        # The header is authenticated so a token cannot be relabelled
+        return header + nonce + self._aead.encrypt(nonce, password.encode(), header)
+
+    def decrypt(self, token):
+        """Return the password in token, raising InvalidToken if it does not decrypt"""
+        if is_legacy_token(token):
+            if self._fernet is None:
+                self._fernet = fernet_for(self.key)
+            return self._fernet.decrypt(token.encode()).decode()
+
+        if len(token) <= 1 + NONCE_SIZE or token[0] != AES_GCM_V1:
+            raise InvalidToken()
+        header = token[:1]
+        nonce = token[1:1 + NONCE_SIZE]
+        try:
+            return self._aead.decrypt(nonce, token[1 + NONCE_SIZE:], header).decode()
+        except InvalidTag:
+            raise InvalidToken()
@@ -0,0 +1,146 @@
+import re
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+from app.utils.connection_profile import thread_connection
+
+CONNECTION_PREFIX = "vault-search"
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching every token as a prefix"""
+    tokens = TOKEN_PATTERN.findall(text)
+    return " ".join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+
+def search_entry_ids(db, text, is_stale=lambda: False):
+    """Return the ids of entries whose website or username match text.
+
+    Returns None when the search was abandoned because is_stale() became true.
+    """
+    match = fts_query(text)
+    if not match:
+        return set()
+
+    query = QSqlQuery(db)
+    query.prepare("SELECT rowid FROM logins_fts WHERE logins_fts MATCH ?")
+    query.addBindValue(match)
+    if not query.exec():
+        print(f"Search failed: {query.lastError().text()}")
+        return set()
+
+    ids = set()
+    while query.next():
+        ids.add(query.value(0))
+        if len(ids) % 1000 == 0 and is_stale():
+            return None
+    return ids
+
+
+class _SearchSignals(QObject):
+    finished = pyqtSignal(int, object)
+
+
+class _SearchJob(QRunnable):
+    def __init__(self, searcher, generation, text):
+        super().__init__()
+        self.db_name = searcher.db_name
+        self.profile = searcher.profile
+        self.signals = searcher.signals
+        self.is_stale = lambda: generation != searcher.generation
+        self.generation = generation
+        self.text = text
+
+    def run(self):
+        if self.is_stale():
+            return
+        db = thread_connection(self.db_name, self.profile, CONNECTION_PREFIX)
+        ids = search_entry_ids(db, self.text, self.is_stale)
+        if ids is not None:
+            self.signals.finished.emit(self.generation, ids)
+
+
+class _CloseJob(QRunnable):
+    """Close the search thread's connection on that thread"""
+
+    def run(self):
+        name = f"{CONNECTION_PREFIX}-{threading.get_ident()}"
+        if not QSqlDatabase.contains(name):
+            return
+        db = QSqlDatabase.database(name, False)
+        db.close()
+        # removeDatabase warns while any QSqlDatabase still refers to it
+        del db
+        QSqlDatabase.removeDatabase(name)
+
+
+class VaultSearcher(QObject):
+    """Debounced full-text search that runs off the GUI thread.
+
+    results_ready carries the set of matching entry ids, or None when the
+    search text is empty and every entry should be shown. Results of a
+    search that was superseded by newer text are dropped.
+    """
+
+    results_ready = pyqtSignal(object)
+
+    DEBOUNCE_MS = 150
+
+    def __init__(self, db_name, profile, parent=None):
+        super().__init__(parent)
+        self.db_name = db_name
+        self.profile = profile
+        self.generation = 0
+        self._text = ""
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self._start_search)
+
+        # One long-lived thread keeps its connection open between searches
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._pool.setExpiryTimeout(-1)
+
+        self.signals = _SearchSignals(self)
+        self.signals.finished.connect(self._on_finished)
+
+    def search(self, text):
+        self._text = text
+        self.generation += 1
+        self._timer.start()
+
+    def refresh(self):
+        """Run the current search again, for example after entries changed"""
+        if self._text.strip():
+            self.search(self._text)
+
+    def _start_search(self):
+        self.generation += 1
+        if not self._text.strip():
+            self.results_ready.emit(None)
+            return
+        self._pool.clear()
+        self._pool.start(_SearchJob(self, self.generation, self._text))
+
+    def _on_finished(self, generation, ids):
+        if generation == self.generation:
+            self.results_ready.emit(ids)
+
+    def close_connections(self):
+        """Drop running searches and close the search thread's connection.
+
+        The next search opens a new one, e.g. to a restored vault file.
+        """
+        self.generation += 1
+        self._pool.clear()
+        self._pool.start(_CloseJob())
+        self._pool.waitForDone()
+
+    def shutdown(self):
+        self._timer.stop()
+        self.close_connections()
@@ -0,0 +1,92 @@
+"""Compare legacy Fernet tokens with the binary AES-GCM format.
+
+Reports the per-row encrypt and decrypt cost, the stored token size, and
+the size in pages of a logins table holding each format, which is what
+the page cache has to hold to scan it.
+
+    python benchmarks/bench_cipher.py [rows]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.vault_cipher import VaultCipher, fernet_for
+
+
+class FernetFormat:
+    """The format vaults used before VaultCipher"""
+
+    def __init__(self, key):
+        self.fernet = fernet_for(key)
+
+    def encrypt(self, password):
+        return self.fernet.encrypt(password.encode()).decode()
+
+    def decrypt(self, token):
+        return self.fernet.decrypt(token.encode()).decode()
+
+
+def table_pages(tokens):
+    """Return (pages, bytes) of a logins-shaped table holding tokens"""
+    with tempfile.TemporaryDirectory() as directory:
+        connection = sqlite3.connect(os.path.join(directory, "bench.db"))
+        connection.execute(
+            "CREATE TABLE logins (id INTEGER PRIMARY KEY, website TEXT, "
+            "username TEXT, encrypted_password TEXT, fingerprint TEXT)"
+        )
+        connection.executemany(
+            "INSERT INTO logins (website, username, encrypted_password, fingerprint) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                (f"site{number}.example.com", f"user{number}", token, "0" * 64)
+                for number, token in enumerate(tokens)
+            ),
+        )
+        connection.commit()
+        connection.execute("VACUUM")
+        pages = connection.execute("PRAGMA page_count").fetchone()[0]
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        connection.close()
+    return pages, pages * page_size
+
+
+def run(name, cipher, passwords):
+    started = time.perf_counter()
+    tokens = [cipher.encrypt(password) for password in passwords]
+    encrypt_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for token in tokens:
+        cipher.decrypt(token)
+    decrypt_seconds = time.perf_counter() - started
+
+    size = sum(len(token) for token in tokens) / len(tokens)
+    pages, total = table_pages(tokens)
+    count = len(passwords)
+    print(
+        f"{name:<10}{encrypt_seconds / count * 1e6:>12.2f}"
+        f"{decrypt_seconds / count * 1e6:>12.2f}{size:>10.1f}"
+        f"{pages:>9}{total / 1024:>11.0f}"
+    )
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    key = os.urandom(32)
+    passwords = [os.urandom(12).hex() for _ in range(rows)]
+
+    print(f"Stored password format benchmark, {rows} rows")
+    print(
+        f"{'format':<10}{'enc us/row':>12}{'dec us/row':>12}{'bytes':>10}"
+        f"{'pages':>9}{'table KiB':>11}"
+    )
+    run("fernet", FernetFormat(key), passwords)
+    run("aes-gcm", VaultCipher(key), passwords)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Measure DatabaseSubject dispatch cost and fan-out.
+
+A burst of single-entry events is sent to a set of observers three ways:
+every observer subscribed to every event (how notify used to work), each
+observer subscribed to one event type, and the same topics with the burst
+wrapped in batch().
+
+    python benchmarks/bench_observer.py [events] [observers]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.observer import DatabaseEvent, DatabaseObserver, DatabaseSubject
+
+ENTRY_EVENTS = [
+    DatabaseEvent.ENTRY_ADDED,
+    DatabaseEvent.ENTRY_MODIFIED,
+    DatabaseEvent.ENTRY_DELETED,
+]
+
+
+class CountingObserver(DatabaseObserver):
+    def __init__(self):
+        self.calls = 0
+
+    def update(self, event, data):
+        self.calls += 1
+
+
+def run(count, observers, topics, batched):
+    subject = DatabaseSubject()
+    attached = [CountingObserver() for _ in range(observers)]
+    for number, observer in enumerate(attached):
+        events = [ENTRY_EVENTS[number % len(ENTRY_EVENTS)]] if topics else None
+        subject.attach(observer, events)
+
+    def burst():
+        for number in range(count):
+            event = ENTRY_EVENTS[number % len(ENTRY_EVENTS)]
+            subject.notify(event, {"id": number, "website": "", "username": ""})
+
+    started = time.perf_counter()
+    if batched:
+        with subject.batch():
+            burst()
+    else:
+        burst()
+    return time.perf_counter() - started, subject.dispatch_stats.snapshot()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    observers = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+    print(f"Observer dispatch benchmark, {count} events, {observers} observers")
+    print(
+        f"{'mode':<22}{'seconds':>10}{'us/event':>10}{'deliveries':>12}"
+        f"{'fan-out':>9}{'coalesced':>11}"
+    )
+    for name, topics, batched in [
+        ("all events", False, False),
+        ("topics", True, False),
+        ("topics + batch", True, True),
+    ]:
+        seconds, stats = run(count, observers, topics, batched)
+        print(
+            f"{name:<22}{seconds:>10.3f}{seconds / count * 1e6:>10.2f}"
+            f"{stats['deliveries']:>12}{stats['fan_out']:>9.2f}"
+            f"{stats['coalesced']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
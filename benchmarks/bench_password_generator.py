@@ -0,0 +1,63 @@
+"""Compare the old per-character generator with the bulk CSPRNG generator.
+
+"before" is the loop the dialogs used to run: random.choice per character,
+then random.shuffle. "after" calls generate_passwords once for the whole
+batch, and "after, one by one" calls generate_password per password like a
+dialog does.
+
+    python benchmarks/bench_password_generator.py [count] [length]
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.password_generator import generate_password, generate_passwords
+
+
+def legacy_password(length):
+    char_sets = [string.ascii_lowercase, string.ascii_uppercase, string.digits,
+                 string.punctuation]
+    required_chars = [random.choice(chars) for chars in char_sets[1:]]
+    all_chars = "".join(char_sets)
+    main_password = "".join(
+        random.choice(all_chars) for _ in range(length - len(required_chars))
+    )
+    password = list(main_password) + required_chars
+    random.shuffle(password)
+    return "".join(password)
+
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    options = {"uppercase": True, "digits": True, "symbols": True}
+
+    results = {
+        "before": timed(lambda: [legacy_password(length) for _ in range(count)]),
+        "after, one by one": timed(
+            lambda: [generate_password(length, **options) for _ in range(count)]
+        ),
+        "after, bulk": timed(lambda: generate_passwords(count, length, **options)),
+    }
+
+    print(f"Password generation benchmark, {count} passwords of {length} characters")
+    print(f"{'generator':<20}{'seconds':>10}{'passwords/s':>14}{'speedup':>10}")
+    for name, seconds in results.items():
+        print(
+            f"{name:<20}{seconds:>10.3f}{count / seconds:>14.0f}"
+            f"{results['before'] / seconds:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Measure what incremental snapshots cost compared to full backup copies.
+
+Builds a vault, snapshots it, then takes more snapshots with a few edits
+between each. Reports the time per snapshot and the size of the snapshot
+store next to one full copy of the vault and to a full copy per snapshot,
+which is what the old password_backup_<timestamp>.db backups cost.
+
+    python benchmarks/bench_snapshots.py [rows] [snapshots] [edits per snapshot]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QCoreApplication
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+from app.utils.connection_profile import ConnectionProfile
+from app.utils.schema import migrate
+from app.utils.snapshots import SnapshotStore
+from app.utils.vault_cipher import to_column
+
+
+def token():
+    # Same size as a stored AES-GCM token of a 16 character password
+    return to_column(os.urandom(45))
+
+
+def fill(db, rows):
+    query = QSqlQuery(db)
+    query.prepare(
+        "INSERT INTO logins (website, username, encrypted_password, fingerprint) "
+        "VALUES (?, ?, ?, ?)"
+    )
+    query.addBindValue([f"site{number}.example.com" for number in range(rows)])
+    query.addBindValue([f"user{number}" for number in range(rows)])
+    query.addBindValue([token() for _ in range(rows)])
+    query.addBindValue([os.urandom(32).hex() for _ in range(rows)])
+    db.transaction()
+    query.execBatch()
+    db.commit()
+
+
+def edit(db, rows, edits):
+    query = QSqlQuery(db)
+    db.transaction()
+    for _ in range(edits):
+        query.prepare("UPDATE logins SET encrypted_password = ? WHERE id = ?")
+        query.addBindValue(token())
+        query.addBindValue(random.randint(1, rows))
+        query.exec()
+    db.commit()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    snapshots = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    edits = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    app = QCoreApplication([])
+    with tempfile.TemporaryDirectory() as directory:
+        db = QSqlDatabase.addDatabase("QSQLITE", "bench")
+        db.setDatabaseName(os.path.join(directory, "password.db"))
+        db.open()
+        ConnectionProfile().apply(db)
+        migrate(db)
+        fill(db, rows)
+
+        copy_path = os.path.join(directory, "copy.db")
+        QSqlQuery(db).exec(f"VACUUM INTO '{copy_path}'")
+        full_copy = os.path.getsize(copy_path)
+
+        store = SnapshotStore(os.path.join(directory, "snapshots"))
+        started = time.perf_counter()
+        store.create(db)
+        first_seconds = time.perf_counter() - started
+        first_size = store.disk_usage()
+
+        started = time.perf_counter()
+        for _ in range(snapshots - 1):
+            edit(db, rows, edits)
+            store.create(db)
+        later_seconds = (time.perf_counter() - started) / max(snapshots - 1, 1)
+        total_size = store.disk_usage()
+
+        print(
+            f"Snapshot benchmark, {rows} rows, {snapshots} snapshots, "
+            f"{edits} edits between snapshots"
+        )
+        print(f"{'full copy of the vault':<34}{full_copy / 1024:>12.0f} KiB")
+        print(f"{'one full copy per snapshot':<34}{full_copy * snapshots / 1024:>12.0f} KiB")
+        print(f"{'first snapshot':<34}{first_size / 1024:>12.0f} KiB{first_seconds:>10.2f} s")
+        print(
+            f"{'all snapshots':<34}{total_size / 1024:>12.0f} KiB"
+            f"{later_seconds:>10.2f} s each"
+        )
+        db.close()
+    del db
+    QSqlDatabase.removeDatabase("bench")
+    del app
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Compare the default SQLite setup with the tuned connection profile.
+
+"before" opens the database with SQLite defaults, has no secondary indexes
+and prepares every statement again on each call, like DatabaseManager used
+to. "after" applies ConnectionProfile, runs the schema migrations (which add
+the NOCASE indexes) and reuses prepared statements.
+
+    python benchmarks/bench_sqlite_profile.py [rows]
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QCoreApplication
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+from app.utils.connection_profile import ConnectionProfile
+from app.utils.schema import MIGRATIONS, migrate
+
+SORT_SQL = "SELECT id, website, username FROM logins ORDER BY website COLLATE NOCASE"
+LOOKUP_SQL = "SELECT encrypted_password FROM logins WHERE id = ?"
+INSERT_SQL = (
+    "INSERT INTO logins (website, username, encrypted_password) VALUES (?, ?, ?)"
+)
+
+
+def random_text(length):
+    return "".join(random.choices(string.ascii_letters, k=length))
+
+
+class Runner:
+    def __init__(self, name, path, tuned):
+        self.db = QSqlDatabase.addDatabase("QSQLITE", name)
+        self.db.setDatabaseName(path)
+        self.db.open()
+        self.tuned = tuned
+        self.statements = {}
+        if tuned:
+            ConnectionProfile().apply(self.db)
+            migrate(self.db)
+        else:
+            query = QSqlQuery(self.db)
+            for statement in MIGRATIONS[0][2]:
+                query.exec(statement)
+
+    def run(self, sql, *values):
+        if self.tuned:
+            query = self.statements.get(sql)
+            if query is None:
+                query = QSqlQuery(self.db)
+                query.prepare(sql)
+                self.statements[sql] = query
+            else:
+                query.finish()
+        else:
+            query = QSqlQuery(self.db)
+            query.prepare(sql)
+        for position, value in enumerate(values):
+            query.bindValue(position, value)
+        query.exec()
+        return query
+
+    def close(self):
+        self.statements.clear()
+        self.db.close()
+
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def benchmark(runner, rows, inserts, lookups, sorts):
+    results = {}
+
+    def seed():
+        runner.db.transaction()
+        for _ in range(rows):
+            runner.run(INSERT_SQL, random_text(12), random_text(10), random_text(100))
+        runner.db.commit()
+
+    seed()
+
+    def insert_autocommit():
+        for _ in range(inserts):
+            runner.run(INSERT_SQL, random_text(12), random_text(10), random_text(100))
+
+    def point_lookups():
+        for _ in range(lookups):
+            query = runner.run(LOOKUP_SQL, random.randint(1, rows))
+            query.next()
+
+    def sorted_loads():
+        for _ in range(sorts):
+            query = runner.run(SORT_SQL)
+            while query.next():
+                pass
+
+    results[f"{inserts} autocommit inserts"] = timed(insert_autocommit)
+    results[f"{lookups} point lookups"] = timed(point_lookups)
+    results[f"{sorts} sorted loads"] = timed(sorted_loads)
+    return results
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    app = QCoreApplication(sys.argv)
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        before = Runner("before", os.path.join(directory, "before.db"), tuned=False)
+        before_results = benchmark(before, rows, 500, 20000, 5)
+        before.close()
+
+        random.seed(1)
+        after = Runner("after", os.path.join(directory, "after.db"), tuned=True)
+        after_results = benchmark(after, rows, 500, 20000, 5)
+        after.close()
+
+    print(f"SQLite profile benchmark, {rows} rows")
+    print(f"{'workload':<28}{'before (s)':>12}{'after (s)':>12}{'speedup':>10}")
+    for workload, before_time in before_results.items():
+        after_time = after_results[workload]
+        print(
+            f"{workload:<28}{before_time:>12.3f}{after_time:>12.3f}"
+            f"{before_time / after_time:>9.1f}x"
+        )
+    del app
+
+
+if __name__ == "__main__":
+    main()
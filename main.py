@@ -1,30 +1,42 @@
-import os
+# Imported first so --trace-startup timings include loading Qt
+from app.utils import startup_trace
 import sys
 from PyQt6.QtWidgets import QApplication, QMessageBox
-from app.ui.login_dialog import LoginDialog
-from app.ui.create_password_dialog import CreatePasswordDialog
-from app.ui.main_window import PasswordManager
 from app.utils.database_manager import DatabaseManager
 from app.utils.master_login import MasterLogin
 
 
 def main():
+    if "--trace-startup" in sys.argv:
+        sys.argv.remove("--trace-startup")
+        startup_trace.enable()
+    startup_trace.mark("imports")
+
     app = QApplication(sys.argv)
-    
+    startup_trace.mark("QApplication")
+
     try:
         db_manager = DatabaseManager()
         password_manager = MasterLogin()
         password_manager.set_db_manager(db_manager)
+        startup_trace.mark("database opened")
 
+        # Only the dialog this start needs is loaded
         if not password_manager.password_exists():
+            from app.ui.create_password_dialog import CreatePasswordDialog
+
             create_dialog = CreatePasswordDialog(password_manager)
             if create_dialog.exec():
+                startup_trace.mark("create password (user input)")
                 show_main_window(app, db_manager)
             else:
                 sys.exit()
         else:
+            from app.ui.login_dialog import LoginDialog
+
             login_dialog = LoginDialog(password_manager)
             if login_dialog.exec():
+                startup_trace.mark("login (user input)")
                 show_main_window(app, db_manager)
             else:
                 sys.exit()
@@ -34,8 +46,16 @@ def main():
 
 
 def show_main_window(app, db_manager):
+    from app.ui.main_window import PasswordManager
+
+    startup_trace.mark("main window imported")
     main_window = PasswordManager(db_manager)  # Now correctly passes db_manager
+    startup_trace.mark("main window built")
     main_window.show()
+    startup_trace.mark("main window shown")
+    from app.utils.password_strength_checker import preload_automaton
+
+    preload_automaton()
     sys.exit(app.exec())
 
 